@@ -0,0 +1,135 @@
+import logging
+import numpy as np
+from pdf2image import convert_from_path
+from image_binarizer import otsu_threshold
+
+logger = logging.getLogger(__name__)
+
+# Resolution used for the cheap first pass over the whole document
+PROBE_DPI = 72
+
+# Tesseract (and the deep learning engines) read best when the x-height of the
+# body text is around 20 pixels; much more than that only costs time
+TARGET_X_HEIGHT_PX = 20
+
+MIN_DPI = 150
+MAX_DPI = 400
+DPI_STEP = 25
+
+
+def estimate_x_height(image):
+    """
+    Estimate the dominant x-height (in pixels) of the text on a page image.
+    Returns None if no text-like rows could be found.
+    """
+    gray = np.asarray(image.convert('L'), dtype=np.uint8)
+    if gray.size == 0:
+        return None
+
+    threshold = otsu_threshold(gray)
+
+    # Treat the minority class as ink so light-on-dark slides work too
+    ink = gray <= threshold
+    if ink.mean() > 0.5:
+        ink = ~ink
+
+    # Rows containing ink form runs, one per text line (column layouts merge,
+    # which is fine for an estimate of the dominant size)
+    row_has_ink = ink.mean(axis=1) > 0.002
+    run_heights = []
+    run_length = 0
+    for has_ink in row_has_ink:
+        if has_ink:
+            run_length += 1
+        elif run_length:
+            run_heights.append(run_length)
+            run_length = 0
+    if run_length:
+        run_heights.append(run_length)
+
+    # Ignore specks and rules, and anything taller than a headline
+    run_heights = [h for h in run_heights if 2 <= h <= gray.shape[0] // 4]
+    if not run_heights:
+        return None
+
+    # A line of mixed-case text is roughly twice its x-height once ascenders
+    # and descenders are included
+    return float(np.median(run_heights)) / 2.0
+
+
+def choose_dpi(x_height, probe_dpi=PROBE_DPI, default_dpi=300,
+               target_x_height=TARGET_X_HEIGHT_PX, min_dpi=MIN_DPI, max_dpi=MAX_DPI):
+    """
+    Pick the rasterization DPI that brings the measured x-height to the target size
+    """
+    if not x_height:
+        return default_dpi
+
+    dpi = probe_dpi * target_x_height / x_height
+    dpi = int(round(dpi / DPI_STEP) * DPI_STEP)
+    return max(min_dpi, min(max_dpi, dpi))
+
+
+def plan_page_dpis(probe_images, probe_dpi=PROBE_DPI, default_dpi=300, **kwargs):
+    """
+    Choose a DPI for every page from its low resolution probe image
+    """
+    page_dpis = []
+    for i, image in enumerate(probe_images):
+        try:
+            x_height = estimate_x_height(image)
+        except Exception as e:
+            logger.warning(f"x-height estimation failed for page {i + 1}: {e}")
+            x_height = None
+        dpi = choose_dpi(x_height, probe_dpi=probe_dpi, default_dpi=default_dpi, **kwargs)
+        page_dpis.append(dpi)
+        logger.debug(f"Page {i + 1}: x-height {x_height} px at {probe_dpi} DPI -> {dpi} DPI")
+
+    if page_dpis:
+        pixel_ratio = sum((dpi / default_dpi) ** 2 for dpi in page_dpis) / len(page_dpis)
+        logger.info(f"Adaptive DPI: {min(page_dpis)}-{max(page_dpis)} DPI, "
+                    f"{pixel_ratio:.2f}x the pixels of a fixed {default_dpi} DPI render")
+    return page_dpis
+
+
+def group_pages_by_dpi(page_dpis):
+    """
+    Group consecutive pages sharing a DPI into (first_page, last_page, dpi) runs (1-based);
+    pages whose DPI is None are skipped
+    """
+    runs = []
+    for page_number, dpi in enumerate(page_dpis, start=1):
+        if dpi is None:
+            continue
+        if runs and runs[-1][2] == dpi and runs[-1][1] == page_number - 1:
+            runs[-1] = (runs[-1][0], page_number, dpi)
+        else:
+            runs.append((page_number, page_number, dpi))
+    return runs
+
+
+def convert_pdf_adaptive(pdf_path, default_dpi=300, probe_dpi=PROBE_DPI, pages=None, **kwargs):
+    """
+    Rasterize a PDF with pdf2image, choosing the DPI of each page from a low DPI probe
+
+    pages: optional sorted 1-based page numbers to render (default: all pages); only
+    these pages are probed
+    """
+    if pages is None:
+        probe_images = convert_from_path(pdf_path, dpi=probe_dpi)
+        page_dpis = plan_page_dpis(probe_images, probe_dpi=probe_dpi, default_dpi=default_dpi, **kwargs)
+        del probe_images
+    else:
+        from page_checkpoints import page_ranges
+        page_dpis = [None] * max(pages, default=0)
+        for first_page, last_page in page_ranges(pages):
+            probe_images = convert_from_path(pdf_path, dpi=probe_dpi, first_page=first_page, last_page=last_page)
+            planned = plan_page_dpis(probe_images, probe_dpi=probe_dpi, default_dpi=default_dpi, **kwargs)
+            del probe_images
+            for offset, dpi in enumerate(planned):
+                page_dpis[first_page - 1 + offset] = dpi
+
+    images = []
+    for first_page, last_page, dpi in group_pages_by_dpi(page_dpis):
+        images.extend(convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page))
+    return images
@@ -1,30 +1,77 @@
-import google.generativeai as genai
 import os
 import json
 import re
+from instrumentation import instrumented
+from profiling import resolve_profiler, maybe_profile
 
 class AIProcessor:
-    def __init__(self):
+    def __init__(self, profile=None):
+        # profile: Profiler, True or False; None enables profiling from STUDY_BUDDY_PROFILE_DIR
+        self.profiler = resolve_profiler(profile)
+        
         # Configure Gemini API
         api_key = os.getenv('GEMINI_API_KEY')
         if not api_key:
             raise ValueError("GEMINI_API_KEY environment variable not set")
         
+        # Imported here: the Gemini client takes a while to import and is not needed to start the apps
+        import google.generativeai as genai
         genai.configure(api_key=api_key)
         self.model = genai.GenerativeModel('gemini-2.0-flash-exp')
     
+    @instrumented('ai.generate')
     def generate_study_materials(self, lecture_text, exam_text):
         """
         Generate study materials using Gemini AI based on lecture notes and past exams
         """
         prompt = self._create_study_prompt(lecture_text, exam_text)
+        profiled = self.profiler.sample_request() if self.profiler else False
         
         try:
-            response = self.model.generate_content(prompt)
-            return self._parse_response(response.text)
+            with maybe_profile(self.profiler, 'ai_request', enabled=profiled):
+                response = self.model.generate_content(prompt)
+                return self._parse_response(response.text)
         except Exception as e:
             raise Exception(f"Error generating study materials: {str(e)}")
     
+    @instrumented('ai.preview')
+    def generate_areas_of_concentration(self, lecture_text, exam_text):
+        """
+        Preliminary areas of concentration from sampled pages of the lecture notes and
+        exams; a much shorter request than the full study materials
+        """
+        prompt = self._create_areas_prompt(lecture_text, exam_text)
+        try:
+            response = self.model.generate_content(prompt)
+            return self._parse_response(response.text)["areas_of_concentration"]
+        except Exception as e:
+            raise Exception(f"Error generating preliminary areas of concentration: {str(e)}")
+    
+    def _create_areas_prompt(self, lecture_text, exam_text):
+        """
+        Prompt for the preview: areas of concentration only, from a sample of the pages
+        """
+        prompt = f"""
+        You are an expert academic tutor. The text below is a SAMPLE of pages from a student's lecture notes and past exams: the table of contents, section title pages and evenly spaced content pages. Pages are marked with "--- Page N ---".
+
+        LECTURE NOTES (sampled pages):
+        {lecture_text}
+
+        PAST EXAM QUESTIONS (sampled pages):
+        {exam_text}
+
+        Identify 6-10 key topic areas the student should focus on, based on the structure of the course (contents and section titles), the emphasis of the sampled lecture pages and the topics of the sampled exam questions. Include page references where possible.
+
+        Format your response EXACTLY as follows:
+
+        AREAS_OF_CONCENTRATION_START
+        • [Area 1]
+        • [Area 2]
+        ...
+        AREAS_OF_CONCENTRATION_END
+        """
+        return prompt
+    
     def _create_study_prompt(self, lecture_text, exam_text):
         """
         Create a comprehensive prompt for generating study materials
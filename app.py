@@ -1,13 +1,28 @@
 import streamlit as st
 import os
+import logging
 from dotenv import load_dotenv
-from ocr_processor import OCRProcessor
 from ai_processor import AIProcessor
+from instrumentation import start_metrics_server
+from streamlit_jobs import submit_study_job, invalidate_stale_job, render_current_job, get_ocr_pool
 from pdf_handler import PDFHandler
-import tempfile
+from capabilities import capabilities
 
 # Load environment variables
 load_dotenv()
+logging.basicConfig(level=logging.INFO)
+
+# Expose pipeline stage metrics for Prometheus if requested
+if os.getenv('STUDY_BUDDY_METRICS_PORT'):
+    start_metrics_server(int(os.getenv('STUDY_BUDDY_METRICS_PORT')))
+
+@st.cache_resource
+def load_processors():
+    """
+    Initialize the processors once per server process (used for validation and system information;
+    the jobs run on the background workers)
+    """
+    return PDFHandler(), AIProcessor()
 
 def main():
     st.set_page_config(
@@ -21,15 +36,23 @@ def main():
     
     # Initialize processors
     try:
+        # The OCR workers load and warm up their engines in the background
+        ocr_pool = get_ocr_pool()
         with st.spinner("Initializing OCR engines..."):
-            ocr_processor = OCRProcessor()
-            pdf_handler = PDFHandler()
-            ai_processor = AIProcessor()
+            pdf_handler, ai_processor = load_processors()
+            if ocr_pool:
+                health = ocr_pool.health()
+                available_engines = health['engines']
+            else:
+                # Installed engines, without loading their models just for this panel
+                available_engines = capabilities().ocr_engines()
         
         # Display available engines
         with st.expander("📋 System Information", expanded=False):
+            if ocr_pool and not health['ready']:
+                st.write(f"⏳ OCR workers warming up ({health['ready_workers']}/{health['workers']} ready)")
             st.write("**Available OCR Engines:**")
-            for engine in ocr_processor.available_engines:
+            for engine in available_engines:
                 st.write(f"✅ {engine.replace('_', ' ').title()}")
             
             st.write("**Available PDF Conversion Methods:**")
@@ -49,52 +72,32 @@ def main():
     with col1:
         st.subheader("📄 Lecture Notes")
         lecture_notes = st.file_uploader(
-            "Upload your lecture notes (PDF)",
+            "Upload your lecture notes (PDFs)",
             type=['pdf'],
+            accept_multiple_files=True,
             key="lecture_notes"
         )
     
     with col2:
         st.subheader("❓ Past Exam Questions")
         past_exams = st.file_uploader(
-            "Upload past exam questions (PDF)",
+            "Upload past exam questions (PDFs)",
             type=['pdf'],
+            accept_multiple_files=True,
             key="past_exams"
         )
     
+    # Results for different files or settings must not be shown as current
+    invalidate_stale_job('multi_engine', lecture_notes, past_exams)
+    
     if st.button("🚀 Generate Study Materials", type="primary"):
         if lecture_notes and past_exams:
-            with st.spinner("Processing your files... This may take a few minutes."):
-                try:
-                    # Process lecture notes
-                    st.info("📄 Extracting text from lecture notes...")
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_lecture:
-                        tmp_lecture.write(lecture_notes.read())
-                        lecture_images = pdf_handler.convert_pdf_to_images(tmp_lecture.name)
-                        lecture_text = ocr_processor.extract_text_from_images(lecture_images)
-                    
-                    # Process past exam questions
-                    st.info("❓ Extracting text from past exam questions...")
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_exam:
-                        tmp_exam.write(past_exams.read())
-                        exam_images = pdf_handler.convert_pdf_to_images(tmp_exam.name)
-                        exam_text = ocr_processor.extract_text_from_images(exam_images)
-                    
-                    # Generate AI insights
-                    st.info("🤖 Generating study materials with AI...")
-                    study_materials = ai_processor.generate_study_materials(lecture_text, exam_text)
-                    
-                    # Display results
-                    display_results(study_materials)
-                    
-                    # Clean up temporary files
-                    os.unlink(tmp_lecture.name)
-                    os.unlink(tmp_exam.name)
-                    
-                except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
+            submit_study_job('multi_engine', lecture_notes, past_exams)
         else:
             st.warning("Please upload both lecture notes and past exam questions.")
+    
+    # Show progress or results of the job this session is following
+    render_current_job(display_results)
 
 def display_results(study_materials):
     st.success("✅ Study materials generated successfully!")
@@ -1,13 +1,26 @@
 import streamlit as st
 import os
-import tempfile
 from dotenv import load_dotenv
 from tesseract_only_processor import TesseractOnlyProcessor
 from ai_processor import AIProcessor
+from instrumentation import start_metrics_server
+from streamlit_jobs import submit_study_job, invalidate_stale_job, render_current_job
 
 # Load environment variables
 load_dotenv()
 
+# Expose pipeline stage metrics for Prometheus if requested
+if os.getenv('STUDY_BUDDY_METRICS_PORT'):
+    start_metrics_server(int(os.getenv('STUDY_BUDDY_METRICS_PORT')))
+
+@st.cache_resource
+def load_processors():
+    """
+    Initialize the processors once per server process (used for validation;
+    the jobs run on the background workers)
+    """
+    return TesseractOnlyProcessor(), AIProcessor()
+
 def main():
     st.set_page_config(
         page_title="Study Buddy - AI Exam Prep",
@@ -21,8 +34,7 @@ def main():
     # Initialize processors
     try:
         with st.spinner("Initializing OCR engine..."):
-            ocr_processor = TesseractOnlyProcessor()
-            ai_processor = AIProcessor()
+            ocr_processor, ai_processor = load_processors()
         
         # Display system information
         with st.expander("📋 System Information", expanded=False):
@@ -41,75 +53,32 @@ def main():
     with col1:
         st.subheader("📄 Lecture Notes")
         lecture_notes = st.file_uploader(
-            "Upload your lecture notes (PDF)",
+            "Upload your lecture notes (PDFs)",
             type=['pdf'],
+            accept_multiple_files=True,
             key="lecture_notes"
         )
     
     with col2:
         st.subheader("❓ Past Exam Questions")
         past_exams = st.file_uploader(
-            "Upload past exam questions (PDF)",
+            "Upload past exam questions (PDFs)",
             type=['pdf'],
+            accept_multiple_files=True,
             key="past_exams"
         )
     
+    # Results for different files or settings must not be shown as current
+    invalidate_stale_job('tesseract', lecture_notes, past_exams)
+    
     if st.button("🚀 Generate Study Materials", type="primary"):
         if lecture_notes and past_exams:
-            try:
-                # Create progress bar
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                # Process lecture notes
-                status_text.text("📄 Extracting text from lecture notes...")
-                progress_bar.progress(10)
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_lecture:
-                    tmp_lecture.write(lecture_notes.read())
-                    tmp_lecture.flush()
-                    
-                    lecture_text = ocr_processor.extract_text_from_pdf(tmp_lecture.name)
-                
-                progress_bar.progress(40)
-                st.info(f"✅ Extracted {len(lecture_text)} characters from lecture notes")
-                
-                # Process past exam questions
-                status_text.text("❓ Extracting text from past exam questions...")
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_exam:
-                    tmp_exam.write(past_exams.read())
-                    tmp_exam.flush()
-                    
-                    exam_text = ocr_processor.extract_text_from_pdf(tmp_exam.name)
-                
-                progress_bar.progress(70)
-                st.info(f"✅ Extracted {len(exam_text)} characters from exam questions")
-                
-                # Generate AI insights
-                status_text.text("🤖 Generating study materials with AI...")
-                study_materials = ai_processor.generate_study_materials(lecture_text, exam_text)
-                
-                progress_bar.progress(100)
-                status_text.text("✅ Processing complete!")
-                
-                # Display results
-                display_results(study_materials)
-                
-                # Clean up temporary files
-                try:
-                    os.unlink(tmp_lecture.name)
-                    os.unlink(tmp_exam.name)
-                except:
-                    pass  # Ignore cleanup errors
-                
-            except Exception as e:
-                st.error(f"An error occurred: {str(e)}")
-                import traceback
-                with st.expander("🔍 Error Details"):
-                    st.code(traceback.format_exc())
+            submit_study_job('tesseract', lecture_notes, past_exams)
         else:
             st.warning("Please upload both lecture notes and past exam questions.")
+    
+    # Show progress or results of the job this session is following
+    render_current_job(display_results)
 
 def display_results(study_materials):
     st.success("✅ Study materials generated successfully!")
@@ -1,13 +1,26 @@
 import streamlit as st
 import os
-import tempfile
 from dotenv import load_dotenv
 from simple_ocr_processor import SimpleOCRProcessor
 from ai_processor import AIProcessor
+from instrumentation import start_metrics_server
+from streamlit_jobs import submit_study_job, invalidate_stale_job, render_current_job
 
 # Load environment variables
 load_dotenv()
 
+# Expose pipeline stage metrics for Prometheus if requested
+if os.getenv('STUDY_BUDDY_METRICS_PORT'):
+    start_metrics_server(int(os.getenv('STUDY_BUDDY_METRICS_PORT')))
+
+@st.cache_resource
+def load_processors():
+    """
+    Initialize the processors once per server process (used for validation;
+    the jobs run on the background workers)
+    """
+    return SimpleOCRProcessor(), AIProcessor()
+
 def main():
     st.set_page_config(
         page_title="Study Buddy - AI Exam Prep",
@@ -21,8 +34,7 @@ def main():
     # Initialize processors
     try:
         with st.spinner("Initializing OCR engine..."):
-            ocr_processor = SimpleOCRProcessor()
-            ai_processor = AIProcessor()
+            ocr_processor, ai_processor = load_processors()
         
         # Display system information
         with st.expander("📋 System Information", expanded=False):
@@ -40,67 +52,32 @@ def main():
     with col1:
         st.subheader("📄 Lecture Notes")
         lecture_notes = st.file_uploader(
-            "Upload your lecture notes (PDF)",
+            "Upload your lecture notes (PDFs)",
             type=['pdf'],
+            accept_multiple_files=True,
             key="lecture_notes"
         )
     
     with col2:
         st.subheader("❓ Past Exam Questions")
         past_exams = st.file_uploader(
-            "Upload past exam questions (PDF)",
+            "Upload past exam questions (PDFs)",
             type=['pdf'],
+            accept_multiple_files=True,
             key="past_exams"
         )
     
+    # Results for different files or settings must not be shown as current
+    invalidate_stale_job('simple', lecture_notes, past_exams)
+    
     if st.button("🚀 Generate Study Materials", type="primary"):
         if lecture_notes and past_exams:
-            with st.spinner("Processing your files... This may take a few minutes."):
-                try:
-                    # Create progress bar
-                    progress_bar = st.progress(0)
-                    status_text = st.empty()
-                    
-                    # Process lecture notes
-                    status_text.text("📄 Extracting text from lecture notes...")
-                    progress_bar.progress(10)
-                    
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_lecture:
-                        tmp_lecture.write(lecture_notes.read())
-                        lecture_text = ocr_processor.extract_text_from_pdf(tmp_lecture.name)
-                    
-                    progress_bar.progress(40)
-                    
-                    # Process past exam questions
-                    status_text.text("❓ Extracting text from past exam questions...")
-                    
-                    with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp_exam:
-                        tmp_exam.write(past_exams.read())
-                        exam_text = ocr_processor.extract_text_from_pdf(tmp_exam.name)
-                    
-                    progress_bar.progress(70)
-                    
-                    # Generate AI insights
-                    status_text.text("🤖 Generating study materials with AI...")
-                    study_materials = ai_processor.generate_study_materials(lecture_text, exam_text)
-                    
-                    progress_bar.progress(100)
-                    status_text.text("✅ Processing complete!")
-                    
-                    # Display results
-                    display_results(study_materials)
-                    
-                    # Clean up temporary files
-                    os.unlink(tmp_lecture.name)
-                    os.unlink(tmp_exam.name)
-                    
-                except Exception as e:
-                    st.error(f"An error occurred: {str(e)}")
-                    import traceback
-                    with st.expander("🔍 Error Details"):
-                        st.code(traceback.format_exc())
+            submit_study_job('simple', lecture_notes, past_exams)
         else:
             st.warning("Please upload both lecture notes and past exam questions.")
+    
+    # Show progress or results of the job this session is following
+    render_current_job(display_results)
 
 def display_results(study_materials):
     st.success("✅ Study materials generated successfully!")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark PaddleOCR and EasyOCR inference backends: model load time, pages/sec
+and peak memory, each backend in a fresh process so the numbers don't mix
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from inference_backends import INFERENCE_BACKENDS, EASYOCR_BACKENDS
+
+def peak_rss_mb():
+    """
+    Peak resident memory of the current process in MB (None where unsupported)
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KB, macOS bytes
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        return None
+
+def load_pages(pdf_path, page_count):
+    if pdf_path:
+        from pdf2image import convert_from_path
+        return convert_from_path(pdf_path, dpi=300, first_page=1, last_page=page_count)
+    from benchmark_handoff import synthetic_page
+    return [synthetic_page() for _ in range(page_count)]
+
+def run_backend(backend, cpu_threads, pdf_path, page_count, model_dirs, queue):
+    """
+    Measure one backend; runs in its own process
+    """
+    try:
+        from ocr_processor import OCRProcessor
+
+        pages = load_pages(pdf_path, page_count)
+
+        start = time.perf_counter()
+        processor = OCRProcessor(inference_backend=backend, cpu_threads=cpu_threads, paddle_model_dirs=model_dirs)
+        result = {'backend': backend, 'cpu_threads': cpu_threads, 'init_seconds': time.perf_counter() - start}
+
+        engines = processor._engine_extractors()
+        for engine in ('paddle', 'easy'):
+            if engine not in engines or (engine == 'easy' and backend not in EASYOCR_BACKENDS):
+                # Other backends run EasyOCR exactly like 'default'
+                continue
+            extract = lambda page: engines[engine](page).text()
+            extract(pages[0])  # Warm-up, excluded from timing
+            start = time.perf_counter()
+            characters = sum(len(extract(page)) for page in pages)
+            elapsed = time.perf_counter() - start
+            result[engine] = {'pages_per_sec': len(pages) / elapsed, 'characters': characters}
+
+        result['peak_rss_mb'] = peak_rss_mb()
+        queue.put(result)
+    except Exception as e:
+        queue.put({'backend': backend, 'error': str(e)})
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pdf', help="PDF to benchmark with (default: synthetic pages)")
+    parser.add_argument('--pages', type=int, default=5)
+    parser.add_argument('--backends', nargs='+', default=list(INFERENCE_BACKENDS), choices=INFERENCE_BACKENDS)
+    parser.add_argument('--cpu-threads', type=int, default=None)
+    parser.add_argument('--model-dirs', help='JSON object of {"det", "rec", "cls"} PaddleOCR model directories')
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    model_dirs = json.loads(args.model_dirs) if args.model_dirs else None
+    context = multiprocessing.get_context('spawn')
+    results = []
+
+    for backend in args.backends:
+        print(f"🔄 Benchmarking {backend} backend...")
+        queue = context.Queue()
+        process = context.Process(target=run_backend, args=(backend, args.cpu_threads, args.pdf, args.pages, model_dirs, queue))
+        process.start()
+        results.append(queue.get())
+        process.join()
+
+    print(f"\n{'Backend':<10}{'init s':>8}{'paddle p/s':>12}{'easy p/s':>10}{'peak MB':>10}")
+    print("-" * 50)
+    for result in results:
+        if 'error' in result:
+            print(f"{result['backend']:<10}  ❌ {result['error']}")
+            continue
+        paddle = result.get('paddle', {}).get('pages_per_sec')
+        easy = result.get('easy', {}).get('pages_per_sec')
+        peak = result['peak_rss_mb']
+        print(f"{result['backend']:<10}{result['init_seconds']:>8.1f}"
+              f"{paddle if paddle is not None else float('nan'):>12.2f}"
+              f"{easy if easy is not None else float('nan'):>10.2f}"
+              f"{peak if peak is not None else float('nan'):>10.0f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n✅ Results saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
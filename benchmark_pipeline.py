@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark of the PDF-to-text pipelines on a synthetic corpus.
+Reports pages/sec, p50/p95 page latency, peak RSS and character accuracy
+against ground truth, and saves them as JSON to compare between runs.
+
+    python benchmark_pipeline.py --max-pages 50 --output bench.json
+    python benchmark_pipeline.py --compare baseline.json bench.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import re
+import sys
+import time
+import numpy as np
+from synthetic_corpus import generate_corpus
+from benchmark_inference import peak_rss_mb
+from study_pipeline import extract_pdf_text
+
+PIPELINES = ('ocr', 'simple', 'tesseract')
+
+# Benchmark pipeline names -> study_pipeline OCR engines
+PIPELINE_ENGINES = {
+    'ocr': 'multi_engine',
+    'simple': 'simple',
+    'tesseract': 'tesseract',
+}
+
+def split_pages(text):
+    """
+    Split processor output into {page_number: text} using the '--- Page N ---' markers
+    """
+    pages = {}
+    parts = re.split(r'^--- Page (\d+) ---$', text, flags=re.MULTILINE)
+    for number, page_text in zip(parts[1::2], parts[2::2]):
+        pages[int(number)] = page_text.strip()
+    return pages
+
+def _normalize(text):
+    return " ".join(text.split())
+
+def edit_distance(source, target):
+    """
+    Levenshtein distance, one numpy row at a time
+    """
+    if not source:
+        return len(target)
+    if not target:
+        return len(source)
+    target_codes = np.frombuffer(target.encode('utf-32-le'), dtype=np.uint32)
+    offsets = np.arange(len(target) + 1)
+    previous = offsets.copy()
+    for i, char in enumerate(source, start=1):
+        cost = (target_codes != ord(char)).astype(np.int64)
+        # Deletions and substitutions vectorize directly...
+        current = np.empty_like(previous)
+        current[0] = i
+        current[1:] = np.minimum(previous[1:] + 1, previous[:-1] + cost)
+        # ...insertions are a running minimum along the row
+        current = np.minimum.accumulate(current - offsets) + offsets
+        previous = current
+    return int(previous[-1])
+
+def character_accuracy(extracted, truth):
+    """
+    1 - (edit distance / ground truth length), on whitespace-normalized text
+    """
+    extracted, truth = _normalize(extracted), _normalize(truth)
+    if not truth:
+        return 1.0 if not extracted else 0.0
+    return max(0.0, 1.0 - edit_distance(extracted, truth) / len(truth))
+
+def run_pipeline(pipeline, documents, queue):
+    """
+    Run one pipeline over the corpus; executes in its own process so peak RSS is per pipeline
+    """
+    try:
+        # Every run must OCR every page, not resume from an earlier run's checkpoints
+        os.environ['STUDY_BUDDY_CHECKPOINT_DB'] = ''
+        engine = PIPELINE_ENGINES[pipeline]
+        results = []
+        for document in documents:
+            marks = []
+            start = time.perf_counter()
+            text = extract_pdf_text(engine, document['pdf'], lambda done, total: marks.append((done, time.perf_counter())))
+            elapsed = time.perf_counter() - start
+
+            # Page latency is the gap between consecutive completed pages,
+            # measured from the end of rasterization (the 0-pages-done mark)
+            page_seconds = [later - earlier for (_, earlier), (_, later) in zip(marks, marks[1:])]
+            rasterize_seconds = marks[0][1] - start if marks and marks[0][0] == 0 else None
+
+            results.append({
+                'name': document['name'],
+                'pages': document['pages'],
+                'seconds': elapsed,
+                'rasterize_seconds': rasterize_seconds,
+                'page_seconds': page_seconds,
+                'text': text,
+            })
+            print(f"  {pipeline}: {document['name']} in {elapsed:.1f}s", flush=True)
+        queue.put({'documents': results, 'peak_rss_mb': peak_rss_mb()})
+    except Exception as e:
+        queue.put({'error': str(e)})
+
+def summarize(pipeline_result, documents):
+    """
+    Aggregate per-document measurements into the pipeline's metrics
+    """
+    truth_by_name = {}
+    for document in documents:
+        with open(document['truth'], 'r', encoding='utf-8') as f:
+            truth_by_name[document['name']] = json.load(f)['pages']
+
+    page_seconds = []
+    accuracies = []
+    document_summaries = []
+    total_pages = 0
+    total_seconds = 0.0
+    for result in pipeline_result['documents']:
+        extracted = split_pages(result['text'])
+        truth = truth_by_name[result['name']]
+        document_accuracy = [character_accuracy(extracted.get(i + 1, ""), page['text']) for i, page in enumerate(truth)]
+
+        page_seconds.extend(result['page_seconds'])
+        accuracies.extend(document_accuracy)
+        total_pages += result['pages']
+        total_seconds += result['seconds']
+        document_summaries.append({
+            'name': result['name'],
+            'pages': result['pages'],
+            'seconds': round(result['seconds'], 3),
+            'rasterize_seconds': round(result['rasterize_seconds'], 3) if result['rasterize_seconds'] is not None else None,
+            'pages_per_sec': round(result['pages'] / result['seconds'], 3) if result['seconds'] else None,
+            'char_accuracy': round(float(np.mean(document_accuracy)), 4) if document_accuracy else None,
+        })
+
+    return {
+        'pages': total_pages,
+        'seconds': round(total_seconds, 3),
+        'pages_per_sec': round(total_pages / total_seconds, 3) if total_seconds else None,
+        'p50_page_seconds': round(float(np.percentile(page_seconds, 50)), 4) if page_seconds else None,
+        'p95_page_seconds': round(float(np.percentile(page_seconds, 95)), 4) if page_seconds else None,
+        'peak_rss_mb': round(pipeline_result['peak_rss_mb'], 1) if pipeline_result['peak_rss_mb'] else None,
+        'char_accuracy': round(float(np.mean(accuracies)), 4) if accuracies else None,
+        'documents': document_summaries,
+    }
+
+def load_corpus(corpus_dir, max_pages, seed):
+    manifest_path = os.path.join(corpus_dir, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest['seed'] == seed and manifest['max_pages'] == max_pages:
+            return manifest['documents']
+    print(f"📄 Generating synthetic corpus in {corpus_dir}")
+    return generate_corpus(corpus_dir, max_pages, seed)
+
+METRICS = ('pages_per_sec', 'p50_page_seconds', 'p95_page_seconds', 'peak_rss_mb', 'char_accuracy')
+
+def compare(baseline_path, candidate_path):
+    """
+    Print the change in each metric between two saved benchmark runs
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(candidate_path, 'r', encoding='utf-8') as f:
+        candidate = json.load(f)
+
+    print(f"{'Pipeline':<11}{'Metric':<18}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    print("-" * 63)
+    for pipeline, metrics in candidate['pipelines'].items():
+        before = baseline['pipelines'].get(pipeline)
+        if not before or 'error' in before or 'error' in metrics:
+            continue
+        for metric in METRICS:
+            old, new = before.get(metric), metrics.get(metric)
+            if old is None or new is None:
+                continue
+            change = f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"{pipeline:<11}{metric:<18}{old:>12.4g}{new:>12.4g}{change:>10}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--corpus', default='benchmark_corpus', help="Corpus directory (generated if missing)")
+    parser.add_argument('--max-pages', type=int, default=500, help="Skip corpus documents longer than this")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--pipelines', nargs='+', default=list(PIPELINES), choices=PIPELINES)
+    parser.add_argument('--output', default='bench_output.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CANDIDATE'), help="Compare two saved runs and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    documents = load_corpus(args.corpus, args.max_pages, args.seed)
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+        },
+        'corpus': {'seed': args.seed, 'max_pages': args.max_pages, 'documents': [d['name'] for d in documents]},
+        'pipelines': {},
+    }
+
+    context = multiprocessing.get_context('spawn')
+    for pipeline in args.pipelines:
+        print(f"🔄 Running {pipeline} pipeline...")
+        queue = context.Queue()
+        process = context.Process(target=run_pipeline, args=(pipeline, documents, queue))
+        process.start()
+        result = queue.get()
+        process.join()
+
+        if 'error' in result:
+            print(f"  ❌ {pipeline} failed: {result['error']}")
+            report['pipelines'][pipeline] = {'error': result['error']}
+            continue
+        summary = summarize(result, documents)
+        report['pipelines'][pipeline] = summary
+        print(f"  ✅ {summary['pages_per_sec']} pages/sec, p95 {summary['p95_page_seconds']}s/page, "
+              f"accuracy {summary['char_accuracy']}")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import metadata, util
+
+logger = logging.getLogger(__name__)
+
+# External tools: name -> candidate commands printing a version (first one found wins)
+TOOLS = {
+    'tesseract': (['tesseract', '--version'],),
+    'magick': (['magick', '--version'],),
+    'pdftoppm': (['pdftoppm', '-v'],),
+    'pdftotext': (['pdftotext', '-v'],),
+    'ghostscript': (['gswin64c', '-version'], ['gs', '--version']),
+}
+
+# Python packages: distribution name -> import name. Looked up without importing them.
+PACKAGES = {
+    'streamlit': 'streamlit',
+    'paddlepaddle': 'paddle',
+    'paddleocr': 'paddleocr',
+    'opencv-python': 'cv2',
+    'numpy': 'numpy',
+    'google-generativeai': 'google.generativeai',
+    'pdf2image': 'pdf2image',
+    'Pillow': 'PIL',
+    'python-dotenv': 'dotenv',
+    'pytesseract': 'pytesseract',
+    'easyocr': 'easyocr',
+    'torch': 'torch',
+}
+
+# Re-probe after this many seconds (tools are rarely installed while the app runs)
+DEFAULT_TTL = 3600
+
+PROBE_TIMEOUT = 15
+
+_VERSION = re.compile(r'\d+(?:\.\d+)+(?:-\d+)?')
+
+
+def probe_tool(commands):
+    """
+    Run a tool's version command: {'available', 'version', 'command', 'error'}
+    """
+    error = None
+    for command in commands:
+        try:
+            result = subprocess.run(command, capture_output=True, text=True, timeout=PROBE_TIMEOUT)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            error = str(e)
+            continue
+        # Some tools print their version to stderr, and older poppler exits non-zero on -v
+        match = _VERSION.search(result.stdout + result.stderr)
+        if result.returncode == 0 or match:
+            return {'available': True, 'version': match.group(0) if match else None,
+                    'command': command[0], 'error': None}
+        error = f"{command[0]} exited with {result.returncode}"
+    return {'available': False, 'version': None, 'command': None, 'error': error}
+
+
+def probe_package(distribution, module):
+    """
+    Whether a package is importable and its installed version, without importing it
+    """
+    try:
+        found = util.find_spec(module) is not None
+    except (ImportError, ValueError) as e:
+        return {'available': False, 'version': None, 'error': str(e)}
+    if not found:
+        return {'available': False, 'version': None, 'error': f"{module} is not installed"}
+    try:
+        version = metadata.version(distribution)
+    except metadata.PackageNotFoundError:
+        version = None
+    return {'available': True, 'version': version, 'error': None}
+
+
+class CapabilityRegistry:
+    def __init__(self, cache_path=None, ttl=DEFAULT_TTL):
+        """
+        Which external tools and Python packages are installed, with their versions.
+        Everything is probed in parallel once per process and cached on disk for ttl
+        seconds, so creating processors and validating the setup spawns no subprocesses.
+
+        cache_path: JSON cache file (None: no disk cache)
+        """
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self._results = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Cache at STUDY_BUDDY_CAPABILITY_CACHE (default: capabilities.json in the scratch
+        root; empty disables it), valid for STUDY_BUDDY_CAPABILITY_TTL seconds
+        """
+        cache_path = os.getenv('STUDY_BUDDY_CAPABILITY_CACHE')
+        if cache_path is None:
+            from scratch_space import default_scratch
+            cache_path = os.path.join(default_scratch().root, 'capabilities.json')
+        return cls(cache_path or None, int(os.getenv('STUDY_BUDDY_CAPABILITY_TTL', DEFAULT_TTL)))
+
+    def _environment(self):
+        # A different PATH or interpreter can see different tools and packages
+        return {'path': os.environ.get('PATH', ''), 'python': sys.executable}
+
+    def _load_cache(self):
+        if not self.cache_path:
+            return None
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if cached.get('environment') != self._environment() or time.time() - cached.get('probed', 0) > self.ttl:
+            return None
+        if set(cached.get('tools', {})) != set(TOOLS) or set(cached.get('packages', {})) != set(PACKAGES):
+            return None
+        return cached
+
+    def _save_cache(self, results):
+        if not self.cache_path:
+            return
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+            temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write capability cache: {e}")
+
+    def probe(self, refresh=False):
+        """
+        Probe results: {'tools': {name: ...}, 'packages': {name: ...}, 'probed': timestamp};
+        refresh ignores both the in-process and the disk cache
+        """
+        with self._lock:
+            if self._results is not None and not refresh:
+                return self._results
+            results = None if refresh else self._load_cache()
+            if results is None:
+                start = time.monotonic()
+                with ThreadPoolExecutor(max_workers=len(TOOLS) + len(PACKAGES)) as pool:
+                    tools = {name: pool.submit(probe_tool, commands) for name, commands in TOOLS.items()}
+                    packages = {name: pool.submit(probe_package, name, module) for name, module in PACKAGES.items()}
+                    results = {
+                        'environment': self._environment(),
+                        'probed': time.time(),
+                        'tools': {name: future.result() for name, future in tools.items()},
+                        'packages': {name: future.result() for name, future in packages.items()},
+                    }
+                logger.info(f"Probed {len(TOOLS)} tools and {len(PACKAGES)} packages "
+                            f"in {time.monotonic() - start:.2f}s")
+                self._save_cache(results)
+            self._results = results
+            return results
+
+    def tool(self, name):
+        return self.probe()['tools'][name]
+
+    def package(self, name):
+        return self.probe()['packages'][name]
+
+    def has_tool(self, name):
+        return self.tool(name)['available']
+
+    def has_package(self, name):
+        return self.package(name)['available']
+
+    def require_tool(self, name, label=None):
+        """
+        Raise if a tool is missing, in the processors' "<label> not available" form
+        """
+        tool = self.tool(name)
+        if not tool['available']:
+            raise Exception(f"{label or name} not available: {tool['error']}")
+        return tool
+
+    def ocr_engines(self):
+        """
+        OCR engines OCRProcessor can load here, in its order of preference; found without
+        importing or loading any engine (a broken install still fails at load time)
+        """
+        engines = [engine for engine, package in (('paddle', 'paddleocr'), ('easy', 'easyocr'))
+                   if self.has_package(package)]
+        if self.has_tool('tesseract') and self.has_package('pytesseract'):
+            engines.append('tesseract')
+        if self.has_tool('magick') and self.has_tool('tesseract'):
+            engines.append('imagemagick_tesseract')
+        return engines
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def capabilities():
+    """
+    The process-wide capability registry configured from the environment
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = CapabilityRegistry.from_env()
+        return _registry
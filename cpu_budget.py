@@ -0,0 +1,83 @@
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Thread pool sizes read by the native libraries behind the OCR engines.
+# OMP_THREAD_LIMIT caps Tesseract's OpenMP threads; the rest cover Paddle's
+# MKL/OpenMP pools and numpy/OpenCV's BLAS.
+THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'OMP_THREAD_LIMIT',
+)
+
+
+class CPUBudget:
+    def __init__(self, workers=1, total_cores=None):
+        """
+        Split the machine's cores between OCR workers so every engine in a worker
+        gets the same share, instead of each library sizing its pool to all cores
+
+        workers: number of pages/documents OCR'd concurrently
+        total_cores: cores available to this process (default: all visible cores)
+        """
+        self.workers = max(1, workers)
+        self.total_cores = total_cores or _available_cores()
+        self.threads_per_worker = max(1, self.total_cores // self.workers)
+
+    def environment(self):
+        """
+        Environment variables that size the native thread pools
+        """
+        return {name: str(self.threads_per_worker) for name in THREAD_ENV_VARS}
+
+    def apply(self):
+        """
+        Apply the budget to this process: environment variables (inherited by
+        Tesseract subprocesses and read by OpenMP at startup), OpenCV and PyTorch
+        """
+        os.environ.update(self.environment())
+
+        try:
+            import cv2
+            cv2.setNumThreads(self.threads_per_worker)
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not set OpenCV thread count: {e}")
+
+        try:
+            import torch
+            torch.set_num_threads(self.threads_per_worker)
+            try:
+                torch.set_num_interop_threads(1)
+            except RuntimeError:
+                # Only allowed before torch runs any parallel work
+                pass
+        except ImportError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not set torch thread count: {e}")
+
+        logger.info(f"CPU budget: {self.workers} workers x {self.threads_per_worker} threads "
+                    f"on {self.total_cores} cores")
+
+
+def _available_cores():
+    # Respect CPU affinity (containers, taskset) where the platform exposes it
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def configure_early(workers=1):
+    """
+    Apply a CPU budget before the OCR libraries are imported, so OpenMP and MKL
+    pick up the thread limits when they initialize. Returns the budget.
+    """
+    budget = CPUBudget(workers)
+    os.environ.update(budget.environment())
+    return budget
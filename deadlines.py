@@ -0,0 +1,157 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+logger = logging.getLogger(__name__)
+
+# Hard cap on any single engine call, budget or not
+DEFAULT_ENGINE_TIMEOUT = 120
+
+# The first engine on a page gets at least this long, even when the budget is spent,
+# so every page still gets some text
+MIN_ENGINE_TIMEOUT = 5
+
+# Guess of an engine's seconds per page before it has been measured
+INITIAL_ESTIMATE = 5.0
+
+
+class EngineTimeout(Exception):
+    pass
+
+
+class DocumentDeadline:
+    def __init__(self, seconds, pages):
+        """
+        Time budget of one document, spread evenly over the pages still to process,
+        so time saved on easy pages is available to harder ones
+        """
+        self.seconds = seconds
+        self.pages = pages
+        self.pages_done = 0
+        self.start = time.monotonic()
+
+    @classmethod
+    def for_pages(cls, pages, page_seconds=None, document_seconds=None):
+        """
+        Deadline from an explicit document budget or a per-page budget (default:
+        STUDY_BUDDY_PAGE_BUDGET seconds per page); None when no budget is configured
+        """
+        if document_seconds is None:
+            if page_seconds is None and os.getenv('STUDY_BUDDY_PAGE_BUDGET'):
+                page_seconds = float(os.getenv('STUDY_BUDDY_PAGE_BUDGET'))
+            if page_seconds is None:
+                return None
+            document_seconds = page_seconds * pages
+        return cls(document_seconds, pages)
+
+    def remaining(self):
+        return self.seconds - (time.monotonic() - self.start)
+
+    def page_budget(self):
+        """
+        Seconds available for the next page
+        """
+        return max(self.remaining(), 0) / max(self.pages - self.pages_done, 1)
+
+    def page_done(self):
+        self.pages_done += 1
+
+
+class PageReport:
+    def __init__(self, page):
+        """
+        What a page did not get: engines skipped for lack of time (or because an earlier
+        call was still stuck), engines that hit their timeout, engines that failed
+        """
+        self.page = page
+        self.skipped = []
+        self.timed_out = []
+        self.failed = []
+
+    def skip(self, engine):
+        if engine not in self.skipped:
+            self.skipped.append(engine)
+
+    def time_out(self, engine):
+        if engine not in self.timed_out:
+            self.timed_out.append(engine)
+
+    def fail(self, engine):
+        if engine not in self.failed:
+            self.failed.append(engine)
+
+    @property
+    def degraded(self):
+        return bool(self.skipped or self.timed_out or self.failed)
+
+    def to_dict(self):
+        return {'page': self.page, 'skipped': self.skipped, 'timed_out': self.timed_out, 'failed': self.failed}
+
+
+class EngineScheduler:
+    def __init__(self, engine_timeout=DEFAULT_ENGINE_TIMEOUT, smoothing=0.3, inline=False):
+        """
+        Decides which engines run on a page within its budget, from running estimates
+        of every engine's seconds per call, and runs in-process engines with timeouts
+
+        engine_timeout: hard cap on a single engine call in seconds
+        smoothing: weight of the newest duration in the running estimates
+        inline: always call in-process engines on the calling thread, ignoring their
+        timeouts; for processes that are killed from outside when they stall
+        """
+        self.engine_timeout = engine_timeout
+        self.smoothing = smoothing
+        self.inline = inline
+        self.estimates = {}
+        self._executors = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def record(self, engine, seconds):
+        previous = self.estimates.get(engine)
+        self.estimates[engine] = seconds if previous is None else \
+            (1 - self.smoothing) * previous + self.smoothing * seconds
+
+    def timeout_for(self, engine, budget_left, required, calls=1):
+        """
+        Timeout for the next call of engine, or None if it should be skipped. The first
+        (required) engine of a page always runs; the others only when their estimate
+        fits in what is left of the page budget. calls: pages covered by the call (a
+        batch), which scales the caps and the estimate.
+        """
+        if budget_left is None:
+            return self.engine_timeout * calls
+        if required:
+            return min(self.engine_timeout * calls, max(budget_left, MIN_ENGINE_TIMEOUT * calls))
+        if self.estimates.get(engine, INITIAL_ESTIMATE) * calls > budget_left:
+            return None
+        return min(self.engine_timeout * calls, budget_left)
+
+    def busy(self, engine):
+        """
+        Whether a call of engine that timed out is still running (in-process engines
+        cannot be killed, so they are not called again until it returns)
+        """
+        future = self._pending.get(engine)
+        return future is not None and not future.done()
+
+    def run(self, engine, function, timeout):
+        """
+        Run an in-process engine call on the engine's own thread and wait at most timeout
+        seconds; raises EngineTimeout and leaves the call to finish in the background,
+        since a thread cannot be cancelled. Without a timeout (or when inline) the call
+        runs on the calling thread, where span CPU times and profiles see it.
+        """
+        if timeout is None or self.inline:
+            return function()
+        with self._lock:
+            if engine not in self._executors:
+                self._executors[engine] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"engine-{engine}")
+            future = self._executors[engine].submit(function)
+            self._pending[engine] = future
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            raise EngineTimeout(f"{engine} did not finish within {timeout:.1f}s")
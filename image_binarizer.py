@@ -0,0 +1,113 @@
+import os
+import time
+import logging
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+BINARIZATION_METHODS = ('otsu', 'sauvola')
+
+# File formats Tesseract can read, with the extension and PIL save arguments
+HANDOFF_FORMATS = {
+    'png': ('.png', {'format': 'PNG'}),
+    'pnm': ('.pnm', {'format': 'PPM'}),  # PIL writes PBM/PGM/PPM by image mode
+    'tiff_g4': ('.tif', {'format': 'TIFF', 'compression': 'group4'}),
+}
+
+
+def otsu_threshold(gray):
+    """
+    Global Otsu threshold of a uint8 grayscale array
+    """
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = hist.sum() - weight_bg
+    cum_mean = np.cumsum(hist * levels)
+    mean_bg = cum_mean / np.maximum(weight_bg, 1)
+    mean_fg = (cum_mean[-1] - cum_mean) / np.maximum(weight_fg, 1)
+    return int(np.argmax(weight_bg * weight_fg * (mean_bg - mean_fg) ** 2))
+
+
+def otsu_binarize(image):
+    """
+    Binarize an image with a global Otsu threshold, returning a 1-bit PIL image
+    """
+    gray = np.asarray(image.convert('L'), dtype=np.uint8)
+    return Image.fromarray(gray > otsu_threshold(gray)).convert('1')
+
+
+def sauvola_binarize(image, window=25, k=0.2, dynamic_range=128):
+    """
+    Binarize an image with Sauvola's local threshold, returning a 1-bit PIL image.
+    Copes with uneven lighting on phone photos and scans better than Otsu.
+    """
+    gray = np.asarray(image.convert('L'), dtype=np.float64)
+    height, width = gray.shape
+    half = window // 2
+
+    # Integral images of the values and their squares give window sums in O(1)
+    padded = np.pad(gray, half + 1, mode='edge')
+    integral = padded.cumsum(axis=0).cumsum(axis=1)
+    integral_sq = (padded ** 2).cumsum(axis=0).cumsum(axis=1)
+
+    def window_sums(table):
+        return (table[window:window + height, window:window + width]
+                - table[:height, window:window + width]
+                - table[window:window + height, :width]
+                + table[:height, :width])
+
+    area = window * window
+    mean = window_sums(integral) / area
+    variance = np.maximum(window_sums(integral_sq) / area - mean ** 2, 0)
+    threshold = mean * (1 + k * (np.sqrt(variance) / dynamic_range - 1))
+
+    return Image.fromarray(gray > threshold).convert('1')
+
+
+def binarize(image, method):
+    """
+    Binarize an image with the named method ('otsu' or 'sauvola')
+    """
+    if method == 'otsu':
+        return otsu_binarize(image)
+    if method == 'sauvola':
+        return sauvola_binarize(image)
+    raise ValueError(f"Unknown binarization method: {method}")
+
+
+def save_for_tesseract(image, path_base, image_format='png'):
+    """
+    Write an image for Tesseract to read.
+    Returns (path, encode_seconds, bytes_written).
+    """
+    if image_format not in HANDOFF_FORMATS:
+        raise ValueError(f"Unknown handoff format: {image_format}")
+    extension, save_args = HANDOFF_FORMATS[image_format]
+
+    # Group 4 compression is only defined for 1-bit images
+    if image_format == 'tiff_g4' and image.mode != '1':
+        image = otsu_binarize(image)
+    elif image.mode not in ('1', 'L', 'RGB'):
+        image = image.convert('RGB')
+
+    path = f"{path_base}{extension}"
+    start = time.perf_counter()
+    image.save(path, **save_args)
+    encode_seconds = time.perf_counter() - start
+
+    return path, encode_seconds, os.path.getsize(path)
+
+
+def log_handoff_stats(stats, label):
+    """
+    Log a summary of per-page handoff measurements
+    """
+    if not stats:
+        return
+    total_seconds = sum(stat['encode_seconds'] for stat in stats)
+    total_bytes = sum(stat['bytes'] for stat in stats)
+    logger.info(f"{label}: {len(stats)} pages, "
+                f"{total_seconds / len(stats) * 1000:.1f} ms encode and "
+                f"{total_bytes / len(stats) / 1024:.0f} KB written per page")
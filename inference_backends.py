@@ -0,0 +1,90 @@
+import logging
+from importlib import metadata
+
+logger = logging.getLogger(__name__)
+
+# 'default' keeps the stock full-precision initialization
+INFERENCE_BACKENDS = ('default', 'mkldnn', 'onnx', 'int8')
+
+# EasyOCR has no ONNX/MKL-DNN switch, and its CPU path already quantizes the recognizer
+# to int8 by default: every other backend runs EasyOCR exactly like 'default'
+EASYOCR_BACKENDS = ('default',)
+
+
+def _paddleocr_major_version():
+    try:
+        return int(metadata.version('paddleocr').split('.')[0])
+    except Exception:
+        return 0
+
+
+def paddle_options(backend='default', cpu_threads=None, model_dirs=None, rec_batch_size=None):
+    """
+    Build PaddleOCR constructor arguments for an inference backend.
+
+    model_dirs: optional {'det': ..., 'rec': ..., 'cls': ...} model directories;
+    required for 'onnx' on PaddleOCR 2.x (exported .onnx models) and for 'int8'
+    (quantized inference models)
+    rec_batch_size: text lines per forward pass of the recognition model
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    major = _paddleocr_major_version()
+    options = {'use_textline_orientation': True, 'lang': 'en'}
+    if cpu_threads:
+        options['cpu_threads'] = cpu_threads
+    if rec_batch_size:
+        options['text_recognition_batch_size' if major >= 3 else 'rec_batch_num'] = rec_batch_size
+    if backend == 'default':
+        return options
+
+    model_dirs = model_dirs or {}
+    if backend in ('onnx', 'int8') and major < 3 and not model_dirs:
+        raise ValueError(f"The '{backend}' backend needs det/rec model directories")
+
+    # PaddleOCR 3.x renamed the model directory arguments
+    if major >= 3:
+        dir_keys = {
+            'det': 'text_detection_model_dir',
+            'rec': 'text_recognition_model_dir',
+            'cls': 'textline_orientation_model_dir',
+        }
+    else:
+        dir_keys = {'det': 'det_model_dir', 'rec': 'rec_model_dir', 'cls': 'cls_model_dir'}
+    for role, path in model_dirs.items():
+        options[dir_keys[role]] = path
+
+    if backend in ('mkldnn', 'int8'):
+        options['enable_mkldnn'] = True
+    elif backend == 'onnx':
+        # 3.x reaches ONNX Runtime through its high-performance inference plugin
+        if major >= 3:
+            options['enable_hpi'] = True
+        else:
+            options['use_onnx'] = True
+
+    return options
+
+
+def easyocr_options(backend='default'):
+    """
+    Build EasyOCR Reader keyword arguments for an inference backend; backends outside
+    EASYOCR_BACKENDS only apply to PaddleOCR and leave EasyOCR at its defaults
+    """
+    if backend not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    return {}
+
+
+def set_torch_threads(cpu_threads):
+    """
+    Limit PyTorch's intra-op thread pool (used by EasyOCR)
+    """
+    if not cpu_threads:
+        return
+    try:
+        import torch
+        torch.set_num_threads(cpu_threads)
+    except Exception as e:
+        logger.warning(f"Could not set torch thread count: {e}")
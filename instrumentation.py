@@ -0,0 +1,339 @@
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Page being processed by the current thread/task, attached to every span inside it
+_current_page = contextvars.ContextVar('current_page', default=None)
+
+# Wall time histogram buckets (seconds) for the Prometheus export
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# How often resident memory is sampled while spans are open (seconds)
+RSS_SAMPLE_INTERVAL = 0.01
+
+
+def _process_peak_rss_bytes():
+    """
+    Memory high-water mark of the whole process so far, in bytes (None where
+    unsupported); it only ever grows, so it says nothing about a single stage
+    """
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return None
+
+
+def _rss_bytes():
+    """
+    Current resident memory in bytes (Linux only, None elsewhere)
+    """
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class _RSSSampler:
+    """
+    Samples resident memory on a helper thread while any span is open, keeping every
+    open span's high-water mark, so memory allocated and freed inside a span still
+    counts. RSS is process-wide: a span that overlapped a span of another thread is
+    marked shared, since its peak includes that thread's allocations.
+    """
+    def __init__(self, interval=RSS_SAMPLE_INTERVAL):
+        self.interval = interval
+        self._open = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def begin(self, rss):
+        state = {'thread': threading.get_ident(), 'start': rss, 'peak': rss, 'shared': False}
+        with self._lock:
+            others = [other for other in self._open.values() if other['thread'] != state['thread']]
+            if others:
+                state['shared'] = True
+                for other in others:
+                    other['shared'] = True
+            self._open[id(state)] = state
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+                self._thread.start()
+        return state
+
+    def end(self, state, rss):
+        with self._lock:
+            self._open.pop(id(state), None)
+            if rss is not None:
+                state['peak'] = max(state['peak'], rss)
+        return state
+
+    def _run(self):
+        while True:
+            rss = _rss_bytes()
+            with self._lock:
+                if not self._open or rss is None:
+                    self._thread = None
+                    return
+                for state in self._open.values():
+                    state['peak'] = max(state['peak'], rss)
+            time.sleep(self.interval)
+
+
+_sampler = _RSSSampler()
+
+
+class SpanRecorder:
+    def __init__(self, json_log_path=None, prometheus_path=None, keep_records=10000):
+        """
+        Collects finished spans, aggregates them for Prometheus and optionally
+        appends each one as a JSON line to json_log_path and keeps a Prometheus
+        text file at prometheus_path up to date (rewritten at most once a second)
+        """
+        self.json_log_path = json_log_path
+        self.prometheus_path = prometheus_path
+        self.keep_records = keep_records
+        self._last_prometheus_write = 0.0
+        self.records = []
+        self.aggregates = {}
+        self._lock = threading.Lock()
+
+    def record(self, record):
+        with self._lock:
+            self.records.append(record)
+            if len(self.records) > self.keep_records:
+                del self.records[:len(self.records) - self.keep_records]
+
+            key = (record['span'], record.get('engine'))
+            aggregate = self.aggregates.setdefault(key, {
+                'count': 0, 'wall_sum': 0.0, 'cpu_sum': 0.0, 'max_rss_peak_growth': 0,
+                'buckets': [0] * len(BUCKETS),
+            })
+            aggregate['count'] += 1
+            aggregate['wall_sum'] += record['wall_seconds']
+            aggregate['cpu_sum'] += record['cpu_seconds']
+            if not record.get('rss_shared'):
+                # Only spans that had the process to themselves say anything about their stage
+                aggregate['max_rss_peak_growth'] = max(aggregate['max_rss_peak_growth'],
+                                                       record.get('rss_peak_growth_bytes') or 0)
+            for i, bound in enumerate(BUCKETS):
+                if record['wall_seconds'] <= bound:
+                    aggregate['buckets'][i] += 1
+
+            if self.json_log_path:
+                try:
+                    with open(self.json_log_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(record) + "\n")
+                except OSError as e:
+                    logger.warning(f"Could not write span log: {e}")
+
+        if self.prometheus_path and time.monotonic() - self._last_prometheus_write >= 1.0:
+            self._last_prometheus_write = time.monotonic()
+            try:
+                self.write_prometheus(self.prometheus_path)
+            except OSError as e:
+                logger.warning(f"Could not write metrics file: {e}")
+
+    def page_records(self):
+        """
+        The retained per-page ('ocr.page') span records
+        """
+        with self._lock:
+            return [r for r in self.records if r['span'] == 'ocr.page']
+
+    def prometheus_text(self):
+        """
+        Render the aggregates in the Prometheus text exposition format
+        """
+        lines = [
+            "# HELP studybuddy_span_seconds Wall time of pipeline stages",
+            "# TYPE studybuddy_span_seconds histogram",
+        ]
+        with self._lock:
+            aggregates = sorted(self.aggregates.items(), key=lambda item: (item[0][0], item[0][1] or ''))
+        for (name, engine), aggregate in aggregates:
+            labels = f'span="{name}"' + (f',engine="{engine}"' if engine else '')
+            for bound, count in zip(BUCKETS, aggregate['buckets']):
+                lines.append(f'studybuddy_span_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'studybuddy_span_seconds_bucket{{{labels},le="+Inf"}} {aggregate["count"]}')
+            lines.append(f'studybuddy_span_seconds_sum{{{labels}}} {aggregate["wall_sum"]:.6f}')
+            lines.append(f'studybuddy_span_seconds_count{{{labels}}} {aggregate["count"]}')
+
+        lines += [
+            "# HELP studybuddy_span_cpu_seconds_total CPU time of pipeline stages (calling thread)",
+            "# TYPE studybuddy_span_cpu_seconds_total counter",
+        ]
+        for (name, engine), aggregate in aggregates:
+            labels = f'span="{name}"' + (f',engine="{engine}"' if engine else '')
+            lines.append(f'studybuddy_span_cpu_seconds_total{{{labels}}} {aggregate["cpu_sum"]:.6f}')
+
+        lines += [
+            "# HELP studybuddy_span_rss_peak_growth_bytes Largest memory high-water mark of one run of a stage "
+            "above the resident memory at its start (runs overlapping other threads' spans excluded)",
+            "# TYPE studybuddy_span_rss_peak_growth_bytes gauge",
+        ]
+        for (name, engine), aggregate in aggregates:
+            labels = f'span="{name}"' + (f',engine="{engine}"' if engine else '')
+            lines.append(f'studybuddy_span_rss_peak_growth_bytes{{{labels}}} {aggregate["max_rss_peak_growth"]}')
+
+        peak = _process_peak_rss_bytes()
+        if peak is not None:
+            lines += [
+                "# HELP studybuddy_process_peak_rss_bytes Memory high-water mark of the whole process",
+                "# TYPE studybuddy_process_peak_rss_bytes gauge",
+                f"studybuddy_process_peak_rss_bytes {peak}",
+            ]
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path):
+        """
+        Write the Prometheus text export to a file (for node_exporter's textfile collector)
+        """
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(temp_path, path)
+
+
+# Process-wide recorder; STUDY_BUDDY_SPAN_LOG turns on the JSON lines log and
+# STUDY_BUDDY_METRICS_FILE the Prometheus text file
+recorder = SpanRecorder(
+    json_log_path=os.getenv('STUDY_BUDDY_SPAN_LOG'),
+    prometheus_path=os.getenv('STUDY_BUDDY_METRICS_FILE'),
+)
+
+
+@contextmanager
+def span(name, **labels):
+    """
+    Time a pipeline stage: wall time, CPU time of the calling thread and the memory
+    high-water mark during the stage (rss_peak_bytes, sampled every RSS_SAMPLE_INTERVAL,
+    and rss_peak_growth_bytes above the memory at its start; rss_shared when spans of
+    other threads ran meanwhile). Labels (e.g. engine='paddle') are stored with the record.
+    """
+    page = labels.pop('page', None) or _current_page.get()
+    rss_start = _rss_bytes()
+    memory = _sampler.begin(rss_start) if rss_start is not None else None
+    wall_start = time.perf_counter()
+    cpu_start = time.thread_time()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        record = {
+            'span': name,
+            'page': page,
+            'start': time.time() - (time.perf_counter() - wall_start),
+            'wall_seconds': time.perf_counter() - wall_start,
+            'cpu_seconds': time.thread_time() - cpu_start,
+            'rss_bytes': _rss_bytes(),
+            'process_peak_rss_bytes': _process_peak_rss_bytes(),
+        }
+        if memory is not None:
+            _sampler.end(memory, record['rss_bytes'])
+            record['rss_peak_bytes'] = memory['peak']
+            record['rss_peak_growth_bytes'] = memory['peak'] - rss_start
+            record['rss_shared'] = memory['shared']
+        record.update(labels)
+        if error:
+            record['error'] = error
+        recorder.record(record)
+
+
+@contextmanager
+def page_context(page):
+    """
+    Attribute every span opened inside this block to a page number
+    """
+    token = _current_page.set(page)
+    try:
+        yield
+    finally:
+        _current_page.reset(token)
+
+
+def instrumented(name, **labels):
+    """
+    Decorator form of span()
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name, **labels):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# name -> function returning a dict with a boolean 'ready', served on /health
+_health_checks = {}
+
+
+def register_health_check(name, check):
+    _health_checks[name] = check
+
+
+def health():
+    """
+    Result of every registered health check, and whether all of them are ready
+    """
+    checks = {}
+    for name, check in list(_health_checks.items()):
+        try:
+            checks[name] = check()
+        except Exception as e:
+            checks[name] = {'ready': False, 'error': str(e)}
+    return {'ready': all(result.get('ready') for result in checks.values()), 'checks': checks}
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == '/health':
+            status = health()
+            self._send(200 if status['ready'] else 503, json.dumps(status).encode('utf-8'), 'application/json')
+            return
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        self._send(200, recorder.prometheus_text().encode('utf-8'), 'text/plain; version=0.0.4')
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+_metrics_server = None
+
+
+def start_metrics_server(port=9108, host='127.0.0.1'):
+    """
+    Serve /metrics in Prometheus text format, and the registered health checks on
+    /health, from a background thread (once per process)
+    """
+    global _metrics_server
+    if _metrics_server is None:
+        _metrics_server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+        logger.info(f"Metrics available at http://{host}:{port}/metrics")
+    return _metrics_server
@@ -0,0 +1,207 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from scratch_space import default_scratch
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    cache_key TEXT,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    params TEXT NOT NULL,
+    result TEXT,
+    preview TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+)
+"""
+
+
+class JobQueue:
+    def __init__(self, db_path='jobs.db', job_dir='job_files', workers=2, scratch=None):
+        """
+        Local background job system: a worker thread pool plus a persistent SQLite
+        job table, so long OCR jobs survive Streamlit reruns and reconnects
+
+        db_path: SQLite database holding the job table
+        job_dir: directory for each job's input files
+        workers: number of jobs processed concurrently
+        scratch: ScratchSpace whose quota applies to spooled inputs (default: from the environment)
+        """
+        self.db_path = db_path
+        self.job_dir = job_dir
+        self.workers = workers
+        self.scratch = scratch or default_scratch()
+        self.handlers = {}
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job-worker')
+        self._lock = threading.Lock()
+
+        os.makedirs(job_dir, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(SCHEMA)
+            # Tables created before result caching and previews lack these columns
+            columns = [row['name'] for row in connection.execute("PRAGMA table_info(jobs)")]
+            for column in ('cache_key', 'preview'):
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+            connection.execute("CREATE INDEX IF NOT EXISTS jobs_cache_key ON jobs (kind, cache_key)")
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def register(self, kind, handler):
+        """
+        Register handler(params, progress) for a job kind; progress(fraction, message, preview)
+        reports status (preview: optional preliminary result, shown while the job runs),
+        and the handler's return value is stored as the JSON result
+        """
+        self.handlers[kind] = handler
+
+    def resume(self):
+        """
+        Requeue jobs left queued or running by a previous process and start them.
+        Call once after registering handlers.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created"
+            ).fetchall()
+            connection.execute(
+                "UPDATE jobs SET status = 'queued', progress = 0, updated = ? WHERE status = 'running'",
+                (time.time(),)
+            )
+        for row in rows:
+            logger.info(f"Resuming job {row['id']}")
+            self.executor.submit(self._run, row['id'])
+        return len(rows)
+
+    def job_files_dir(self, job_id):
+        return os.path.join(self.job_dir, job_id)
+
+    def submit(self, kind, params, files=None, cache_key=None):
+        """
+        Create a job and queue it. files maps a name to an open binary file (or bytes);
+        each is spooled in chunks to the job's directory and its path added to params['files'].
+        cache_key identifies the inputs and settings so find_job() can reuse the job.
+        Returns the job id.
+        """
+        if kind not in self.handlers:
+            raise Exception(f"No handler registered for job kind: {kind}")
+
+        job_id = uuid.uuid4().hex
+        params = dict(params)
+        if files:
+            directory = self.job_files_dir(job_id)
+            os.makedirs(directory, exist_ok=True)
+            params['files'] = {}
+            try:
+                for name, source in files.items():
+                    path = os.path.join(directory, name)
+                    self.scratch.spool(source, path)
+                    params['files'][name] = path
+            except BaseException:
+                shutil.rmtree(directory, ignore_errors=True)
+                raise
+
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO jobs (id, kind, cache_key, status, progress, message, params, created, updated) "
+                "VALUES (?, ?, ?, 'queued', 0, 'Waiting for a worker...', ?, ?, ?)",
+                (job_id, kind, cache_key, json.dumps(params), now, now)
+            )
+        self.executor.submit(self._run, job_id)
+        logger.info(f"Submitted {kind} job {job_id}")
+        return job_id
+
+    def get(self, job_id):
+        """
+        Return a job as a dict (params, result and preview decoded), or None if unknown
+        """
+        with self._connect() as connection:
+            row = connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['preview'] = json.loads(job['preview']) if job['preview'] else None
+        return job
+
+    def find_job(self, kind, cache_key):
+        """
+        Most recent finished or in-progress job for the same inputs and settings, or None
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT id FROM jobs WHERE kind = ? AND cache_key = ? AND status IN ('queued', 'running', 'done') "
+                "ORDER BY created DESC LIMIT 1",
+                (kind, cache_key)
+            ).fetchone()
+        return self.get(row['id']) if row else None
+
+    def list_jobs(self, status=None, limit=100):
+        """
+        Most recent jobs, optionally filtered by status
+        """
+        query = "SELECT id, kind, status, progress, message, error, created, updated FROM jobs"
+        args = ()
+        if status:
+            query += " WHERE status = ?"
+            args = (status,)
+        query += " ORDER BY created DESC LIMIT ?"
+        with self._connect() as connection:
+            return [dict(row) for row in connection.execute(query, args + (limit,)).fetchall()]
+
+    def _update(self, job_id, **fields):
+        fields['updated'] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connect() as connection:
+            connection.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", tuple(fields.values()) + (job_id,))
+
+    def _run(self, job_id):
+        job = self.get(job_id)
+        if job is None or job['status'] not in ACTIVE_STATUSES:
+            return
+
+        handler = self.handlers.get(job['kind'])
+        if handler is None:
+            self._update(job_id, status='failed', error=f"No handler for job kind: {job['kind']}")
+            return
+
+        def progress(fraction, message=None, preview=None):
+            fields = {'progress': max(0.0, min(1.0, fraction))}
+            if message is not None:
+                fields['message'] = message
+            if preview is not None:
+                fields['preview'] = json.dumps(preview)
+            self._update(job_id, **fields)
+
+        self._update(job_id, status='running', message='Starting...')
+        try:
+            result = handler(job['params'], progress)
+            self._update(job_id, status='done', progress=1.0, message='Complete', result=json.dumps(result))
+            logger.info(f"Job {job_id} complete")
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            self._update(job_id, status='failed', message='Failed', error=str(e))
+        finally:
+            # Inputs are only kept while the job can still be resumed
+            shutil.rmtree(self.job_files_dir(job_id), ignore_errors=True)
@@ -0,0 +1,136 @@
+import numpy as np
+from ocr_results import PageResult, MIN_CONFIDENCE
+
+# Boxes of the same text line overlap by at least this share of the shorter line's height...
+MIN_VERTICAL_OVERLAP = 0.5
+# ...and of the narrower box's width (engines split lines into segments differently)
+MIN_HORIZONTAL_OVERLAP = 0.3
+
+# A line found by only one of several engines is kept only at this confidence
+SOLO_MIN_CONFIDENCE = 0.7
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+def _vote(groups, max_readings):
+    """
+    Index of the winning reading of every line. groups is a list of candidate lists of
+    (normalized_text, confidence); each reading gets the confidence of every reading
+    weighted by their similarity (2 * shared bytes / total bytes from byte histograms,
+    the bound difflib's quick_ratio computes). All lines are scored in one numpy pass.
+    """
+    encoded = [[text.encode('utf-8') for text, _ in candidates] for candidates in groups]
+    flat = [data for group in encoded for data in group]
+    lengths = np.array([len(data) for data in flat])
+    histograms = np.bincount(
+        np.repeat(np.arange(len(flat)), lengths) * 256 + np.frombuffer(b''.join(flat), dtype=np.uint8),
+        minlength=len(flat) * 256
+    ).reshape(len(flat), 256)
+
+    # Pad to (lines, readings, ...) so every line is scored at once
+    padded = np.zeros((len(groups), max_readings, 256), dtype=histograms.dtype)
+    padded_lengths = np.zeros((len(groups), max_readings))
+    confidences = np.zeros((len(groups), max_readings))
+    row = 0
+    for g, candidates in enumerate(groups):
+        n = len(candidates)
+        padded[g, :n] = histograms[row:row + n]
+        padded_lengths[g, :n] = lengths[row:row + n]
+        confidences[g, :n] = [confidence for _, confidence in candidates]
+        row += n
+
+    shared = np.minimum(padded[:, :, None, :], padded[:, None, :, :]).sum(axis=3)
+    totals = np.maximum(padded_lengths[:, :, None] + padded_lengths[:, None, :], 1)
+    votes = np.einsum('gij,gj->gi', 2 * shared / totals, confidences)
+    votes[padded_lengths == 0] = -1  # Padding (and empty readings) never win
+    return votes.argmax(axis=1)
+
+
+def _line_groups(boxes):
+    """
+    Connected groups of overlapping line boxes (union-find over the pairwise overlap matrix)
+    """
+    x0, y0, x1, y1 = boxes.T
+    heights = np.maximum(y1 - y0, 1e-3)
+    widths = np.maximum(x1 - x0, 1e-3)
+    overlap_y = np.minimum(y1[:, None], y1[None, :]) - np.maximum(y0[:, None], y0[None, :])
+    overlap_x = np.minimum(x1[:, None], x1[None, :]) - np.maximum(x0[:, None], x0[None, :])
+    linked = (
+        (overlap_y >= MIN_VERTICAL_OVERLAP * np.minimum(heights[:, None], heights[None, :]))
+        & (overlap_x >= MIN_HORIZONTAL_OVERLAP * np.minimum(widths[:, None], widths[None, :]))
+    )
+
+    parent = list(range(len(boxes)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in zip(*np.nonzero(np.triu(linked, k=1))):
+        parent[find(i)] = find(j)
+
+    groups = {}
+    for i in range(len(boxes)):
+        groups.setdefault(find(i), []).append(i)
+    return list(groups.values())
+
+
+def fuse_results(results, size=(0, 0)):
+    """
+    Fuse the PageResults of several engines line by line: lines are aligned by
+    bounding box, and in every aligned line each engine's reading gets the
+    confidence-weighted votes of the engines that agree with it. The winning reading
+    keeps its own engine id, confidence and words. Returns a PageResult in reading order.
+    """
+    entries = []
+    for result in results:
+        for entry in result.entries():
+            text, confidence, box, engine, words = entry
+            if text.strip() and confidence > MIN_CONFIDENCE.get(engine, -np.inf):
+                entries.append(entry)
+    if not entries:
+        return PageResult.empty(None, size)
+
+    engines_run = len(results)
+    boxes = np.array([entry[2] for entry in entries], dtype=np.float32)
+    lines = []
+    for group in _line_groups(boxes):
+        # Each engine's reading of the line: its segments left to right
+        readings = {}
+        for i in sorted(group, key=lambda i: entries[i][2][0]):
+            readings.setdefault(entries[i][3], []).append(entries[i])
+
+        candidates = []
+        for engine, segments in readings.items():
+            text = " ".join(segment[0] for segment in segments)
+            lengths = [max(len(segment[0]), 1) for segment in segments]
+            confidence = sum(segment[1] * length for segment, length in zip(segments, lengths)) / sum(lengths)
+            candidates.append((engine, text, confidence, segments))
+
+        if len(candidates) == 1 and engines_run > 1 and candidates[0][2] < SOLO_MIN_CONFIDENCE:
+            continue  # Only one engine saw it, without much confidence
+        lines.append((group, candidates))
+    if not lines:
+        return PageResult.empty(None, size)
+
+    winners = _vote(
+        [[(_normalize(text), confidence) for _, text, confidence, _ in candidates] for _, candidates in lines],
+        max(len(candidates) for _, candidates in lines)
+    )
+
+    fused = []
+    for (group, candidates), winner in zip(lines, winners):
+        engine, text, confidence, segments = candidates[winner]
+        group_boxes = boxes[group]
+        box = (float(group_boxes[:, 0].min()), float(group_boxes[:, 1].min()),
+               float(group_boxes[:, 2].max()), float(group_boxes[:, 3].max()))
+        words = [word for segment in segments for word in segment[4]]
+        fused.append((text, confidence, box, engine, words))
+
+    # Reading order: top to bottom, then left to right
+    fused.sort(key=lambda entry: (entry[2][1], entry[2][0]))
+    return PageResult.build(None, fused, size)
@@ -1,89 +1,248 @@
-from paddleocr import PaddleOCR
-import pytesseract
-import easyocr
-import numpy as np
-import cv2
 import os
-import tempfile
 import subprocess
+import time
+from collections import Counter
+from functools import partial
 from PIL import Image, ImageEnhance, ImageFilter
 from io import BytesIO
 import logging
+from inference_backends import paddle_options, easyocr_options, set_torch_threads, EASYOCR_BACKENDS
+from cpu_budget import CPUBudget
+from instrumentation import span, page_context, instrumented
+from profiling import resolve_profiler, maybe_profile
+from scratch_space import default_scratch
+from capabilities import capabilities
+from deadlines import (DocumentDeadline, EngineScheduler, EngineTimeout, PageReport,
+                       DEFAULT_ENGINE_TIMEOUT)
+
+# The engines (paddleocr, easyocr, pytesseract) and numpy/cv2 are imported when an
+# OCRProcessor is created or a page is OCR'd, not when this module is imported, so
+# entry points that only reference it stay fast to start
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Full-size copies of a page alive at once while it is preprocessed and OCR'd
+# (enhanced PIL image, numpy array, BGR conversion, engine input buffer)
+PAGE_COPY_FACTOR = 4
+
+# Engines with separate detection and recognition steps, whose recognition can be
+# batched across pages (see recognize_pages)
+BATCHED_ENGINES = ('paddle', 'easy')
+
+# Engines running in this process: a timeout can only abandon their calls, not stop them
+IN_PROCESS_ENGINES = ('paddle', 'easy')
+
 class OCRProcessor:
-    def __init__(self):
+    def __init__(self, tile_memory_limit_mb=None, tile_overlap=150,
+                 inference_backend='default', cpu_threads=None, paddle_model_dirs=None,
+                 cpu_budget=None, profile=None, page_time_budget=None,
+                 engine_timeout=DEFAULT_ENGINE_TIMEOUT, routing=None, text_regions=None,
+                 batch_pages=None, recognition_batch_size=None, inline_engines=False):
         """
         Initialize multiple OCR engines for better accuracy
+        
+        inference_backend: 'default', 'mkldnn', 'onnx' or 'int8' (see inference_backends;
+        EasyOCR only has 'default')
+        cpu_threads: intra-op thread count for PaddleOCR and EasyOCR
+        paddle_model_dirs: optional {'det', 'rec', 'cls'} model directories for PaddleOCR
+        cpu_budget: CPUBudget (or worker count) shared by the processes OCR'ing in
+        parallel; sizes every engine's thread pool to this worker's share of the cores
+        profile: Profiler, True or False; None enables profiling from STUDY_BUDDY_PROFILE_DIR
+        tile_memory_limit_mb: when set, pages whose working set would exceed this
+        many MB are OCR'd as overlapping horizontal tiles
+        tile_overlap: overlap between tiles in pixels, must exceed the tallest text line
+        page_time_budget: seconds per page a document may take on average (None reads
+        STUDY_BUDDY_PAGE_BUDGET; unset means no budget); lower-priority engines are
+        skipped on pages that run out of time
+        engine_timeout: hard cap in seconds on a single engine call; PaddleOCR and EasyOCR
+        calls are only capped under a page budget, and then only abandoned when they
+        overrun (run them in an OCRWorkerPool to have stalled calls killed)
+        routing: classify every page (see page_classifier) and OCR it with the one engine
+        and Tesseract mode suited to its kind, falling back to the next engine only when
+        that one fails or finds nothing; False runs every engine and fuses the results.
+        None reads STUDY_BUDDY_PAGE_ROUTING (on unless '0').
+        text_regions: OCR only the text-bearing regions of a page (see text_regions),
+        stacked into one image per engine call; needs OpenCV. None reads
+        STUDY_BUDDY_TEXT_REGIONS (on unless '0').
+        batch_pages: routed pages are OCR'd in groups of this many; the pages of a group
+        routed to PaddleOCR or EasyOCR have their text lines recognised together (see
+        recognize_pages). None reads STUDY_BUDDY_BATCH_PAGES (default 4); 1 disables it.
+        recognition_batch_size: text lines per recognition batch (None reads
+        STUDY_BUDDY_RECOGNITION_BATCH, default 32)
+        inline_engines: call PaddleOCR and EasyOCR on the calling thread even under a page
+        budget (the budget still skips engines); for worker processes that are killed
+        when they stall
         """
+        self.tile_memory_limit_mb = tile_memory_limit_mb
+        self.tile_overlap = tile_overlap
+        self.inference_backend = inference_backend
+        self.profiler = resolve_profiler(profile)
+        self.page_time_budget = page_time_budget
+        self.scheduler = EngineScheduler(engine_timeout, inline=inline_engines)
+        self.routing = os.getenv('STUDY_BUDDY_PAGE_ROUTING', '1') != '0' if routing is None else routing
+        self.text_regions = os.getenv('STUDY_BUDDY_TEXT_REGIONS', '1') != '0' if text_regions is None else text_regions
+        self.batch_pages = max(1, batch_pages or int(os.getenv('STUDY_BUDDY_BATCH_PAGES', '4')))
+        self.recognition_batch_size = recognition_batch_size or int(os.getenv('STUDY_BUDDY_RECOGNITION_BATCH', '32'))
+        self.degraded_pages = []
+        self.page_routes = []
         self.engines = {}
         self.available_engines = []
         
+        # Apply the CPU budget before any engine creates its thread pool
+        if isinstance(cpu_budget, int):
+            cpu_budget = CPUBudget(workers=cpu_budget)
+        self.cpu_budget = cpu_budget
+        if cpu_budget:
+            cpu_budget.apply()
+            if not cpu_threads:
+                cpu_threads = cpu_budget.threads_per_worker
+        
+        registry = capabilities()
+        
         # Initialize PaddleOCR
         try:
-            self.engines['paddle'] = PaddleOCR(use_textline_orientation=True, lang='en')
+            if not registry.has_package('paddleocr'):
+                raise Exception(registry.package('paddleocr')['error'])
+            from paddleocr import PaddleOCR
+            options = paddle_options(inference_backend, cpu_threads, paddle_model_dirs,
+                                     rec_batch_size=self.recognition_batch_size)
+            self.engines['paddle'] = PaddleOCR(**options)
             self.available_engines.append('paddle')
-            logger.info("PaddleOCR initialized successfully")
+            logger.info(f"PaddleOCR initialized successfully ({inference_backend} backend)")
         except Exception as e:
             logger.warning(f"PaddleOCR initialization failed: {e}")
         
         # Initialize EasyOCR
         try:
-            self.engines['easy'] = easyocr.Reader(['en'])
+            if not registry.has_package('easyocr'):
+                raise Exception(registry.package('easyocr')['error'])
+            import easyocr
+            set_torch_threads(cpu_threads)
+            self.engines['easy'] = easyocr.Reader(['en'], **easyocr_options(inference_backend))
             self.available_engines.append('easy')
-            logger.info("EasyOCR initialized successfully")
+            backend = inference_backend if inference_backend in EASYOCR_BACKENDS else 'default'
+            logger.info(f"EasyOCR initialized successfully ({backend} backend)")
         except Exception as e:
             logger.warning(f"EasyOCR initialization failed: {e}")
         
         # Check Tesseract availability
-        try:
-            pytesseract.get_tesseract_version()
+        tesseract = registry.tool('tesseract')
+        if tesseract['available'] and registry.has_package('pytesseract'):
             self.available_engines.append('tesseract')
             logger.info("Tesseract is available")
-        except Exception as e:
-            logger.warning(f"Tesseract not available: {e}")
+        else:
+            logger.warning(f"Tesseract not available: {tesseract['error'] or 'pytesseract is not installed'}")
         
         # Check ImageMagick + Tesseract availability
-        try:
-            subprocess.run(['magick', '--version'], capture_output=True, check=True)
+        magick = registry.tool('magick')
+        if magick['available'] and tesseract['available']:
             self.available_engines.append('imagemagick_tesseract')
             logger.info("ImageMagick + Tesseract is available")
-        except Exception as e:
-            logger.warning(f"ImageMagick + Tesseract not available: {e}")
+        else:
+            logger.warning(f"ImageMagick + Tesseract not available: {magick['error'] or tesseract['error']}")
         
         if not self.available_engines:
             raise Exception("No OCR engines available! Please install at least one OCR engine.")
         
         logger.info(f"Available OCR engines: {', '.join(self.available_engines)}")
     
-    def extract_text_from_images(self, images):
+    def extract_text_from_images(self, images, progress_callback=None, time_budget=None, page_numbers=None,
+                                 text_layers=None):
         """
         Extract text from a list of PIL images using multiple OCR engines for better accuracy
+        
+        progress_callback: optional callable(pages_done, total_pages), called after each page
+        time_budget: optional seconds for the whole document (see extract_page_results)
+        page_numbers: document page number of every image (default: 1 to n)
+        text_layers: PDF text layer of every image, for page routing (optional)
+        """
+        from ocr_results import format_results
+        return format_results(self.extract_page_results(images, progress_callback, time_budget, page_numbers,
+                                                        text_layers))
+    
+    def extract_page_results(self, images, progress_callback=None, time_budget=None, page_numbers=None,
+                             text_layers=None, page_callback=None):
         """
-        all_text = []
+        OCR a list of PIL images into PageResults (lines, words, boxes, confidences and
+        engine ids); extract_text_from_images is the text form of this
         
-        for i, image in enumerate(images):
-            try:
-                logger.info(f"Processing page {i + 1}/{len(images)}")
-                
-                # Preprocess image for better OCR
-                enhanced_image = self._preprocess_image(image)
-                
-                # Extract text using multiple engines and combine results
-                page_text = self._extract_with_multiple_engines(enhanced_image)
-                
-                if page_text.strip():
-                    all_text.append(f"--- Page {i + 1} ---\n{page_text}\n")
-                else:
-                    logger.warning(f"No text extracted from page {i + 1}")
+        progress_callback: optional callable(pages_done, total_pages), called after each page
+        time_budget: optional seconds for the whole document (default: page_time_budget per
+        page), spread over the pages still to process. Pages that skipped or lost engines
+        are listed in self.degraded_pages afterwards.
+        page_numbers: document page number of every image (default: 1 to n), for
+        documents of which only some pages were rendered
+        text_layers: PDF text layer of every image (see page_classifier.text_layers); a
+        page with one is routed as typed text whatever it looks like. The kind of every
+        routed page is listed in self.page_routes afterwards.
+        page_callback: optional callable(result, degraded) called as each page finishes
+        (e.g. to checkpoint it), before progress_callback
+        """
+        results = []
+        self.degraded_pages = []
+        self.page_routes = []
+        deadline = DocumentDeadline.for_pages(len(images), self.page_time_budget, time_budget)
+        profiled = self.profiler.sample_request() if self.profiler else False
+        
+        page_numbers = list(page_numbers or range(1, len(images) + 1))
+        for chunk_start in range(0, len(images), self.batch_pages):
+            chunk = range(chunk_start, min(chunk_start + self.batch_pages, len(images)))
+            routes = {}
+            for i in chunk:
+                with page_context(page_numbers[i]):
+                    text_layer = text_layers[i] if text_layers and i < len(text_layers) else None
+                    routes[i] = self._classify_page(images[i], text_layer)
+                if routes[i][0]:
+                    self.page_routes.append({'page': page_numbers[i], 'kind': routes[i][0]})
+            reports = {i: PageReport(page_numbers[i]) for i in chunk}
+            batched = self._recognize_chunk(images, routes, reports, deadline)
+            
+            for i in chunk:
+                page, image, report = page_numbers[i], images[i], reports[i]
+                route = routes[i][1]
+                finished = None
+                try:
+                    logger.info(f"Processing page {page} ({i + 1}/{len(images)})")
+                    page_end = time.monotonic() + deadline.page_budget() if deadline else None
                     
-            except Exception as e:
-                logger.error(f"Error processing image {i + 1}: {str(e)}")
-                continue
+                    with page_context(page), span('ocr.page'), \
+                            maybe_profile(self.profiler, 'ocr', page=page, enabled=profiled):
+                        result = None
+                        if i in batched:
+                            engine, result = batched[i]
+                            if result is None or not result.text().strip():
+                                # Nothing from the batch: the rest of the route, page by page
+                                route = dict(route, engines=tuple(e for e in route['engines'] if e != engine))
+                                result = None
+                        if result is None:
+                            result = self._extract_page(image, page_end, report, route)
+                    result.page = page
+                    
+                    if not result.text().strip():
+                        logger.warning(f"No text extracted from page {page}")
+                    results.append(result)
+                    finished = result
+                        
+                except Exception as e:
+                    logger.error(f"Error processing page {page}: {str(e)}")
+                    continue
+                finally:
+                    if deadline:
+                        deadline.page_done()
+                    if report.degraded:
+                        self.degraded_pages.append(report.to_dict())
+                    if page_callback and finished is not None:
+                        page_callback(finished, report.degraded)
+                    if progress_callback:
+                        progress_callback(i + 1, len(images))
         
-        return "\n".join(all_text)
+        if self.page_routes:
+            kinds = Counter(route['kind'] for route in self.page_routes)
+            logger.info(f"Page kinds: {', '.join(f'{count} {kind}' for kind, count in kinds.most_common())}")
+        if self.degraded_pages:
+            logger.warning(f"{len(self.degraded_pages)}/{len(images)} pages got degraded treatment "
+                           f"(engines skipped, timed out or failed)")
+        return results
     
     def extract_text_from_image_file(self, image_path):
         """
@@ -91,11 +250,99 @@ class OCRProcessor:
         """
         try:
             image = Image.open(image_path)
-            enhanced_image = self._preprocess_image(image)
-            return self._extract_with_multiple_engines(enhanced_image)
+            return self._extract_page(image, route=self._classify_page(image)[1]).text()
         except Exception as e:
             raise Exception(f"Error extracting text from image: {str(e)}")
     
+    @instrumented('ocr.classify')
+    def _classify_page(self, image, text_layer=None):
+        """
+        Page kind and route (see page_classifier.ROUTES) of a raw page image; (None, None)
+        when routing is off or the page could not be classified
+        """
+        if not self.routing:
+            return None, None
+        try:
+            from page_classifier import classify_page
+            kind, route, _ = classify_page(image, text_layer)
+        except Exception as e:
+            logger.warning(f"Page classification failed, using every engine: {e}")
+            return None, None
+        return kind, route
+    
+    @instrumented('ocr.regions')
+    def _text_regions(self, image):
+        """
+        Text regions to crop a page to (see text_regions); None when region detection is
+        off or unavailable, finds nothing, or would keep most of the page anyway
+        """
+        if not self.text_regions:
+            return None
+        from text_regions import find_text_regions, coverage, MAX_REGION_COVERAGE
+        try:
+            regions = find_text_regions(image)
+        except ImportError as e:
+            logger.warning(f"Text region detection not available, OCR'ing whole pages: {e}")
+            self.text_regions = False
+            return None
+        except Exception as e:
+            logger.warning(f"Text region detection failed, OCR'ing the whole page: {e}")
+            return None
+        if not regions or coverage(regions, image.size) > MAX_REGION_COVERAGE:
+            return None
+        return regions
+    
+    def _extract_page(self, image, page_end=None, report=None, route=None):
+        """
+        OCR one page into a PageResult, tiling oversized pages. page_end is the
+        time.monotonic() deadline of the page (None: no budget); route limits the page
+        to the first engine of the route that finds text (None: fuse every engine).
+        """
+        report = report or PageReport(None)
+        if self._needs_tiling(image):
+            # Oversized page: OCR it tile by tile to bound memory
+            return self._extract_tiled(image, page_end, report, route)
+        
+        enhanced_image, placements = self._prepare_page(image)
+        result = self._extract_enhanced(enhanced_image, page_end, report, route)
+        return self._page_result(result, placements, image.size)
+    
+    def _prepare_page(self, image):
+        """
+        The preprocessed image to OCR for a page: the page itself, or its text regions
+        stacked into one image so every engine runs once. Returns (image, placements),
+        placements being None for the whole page.
+        """
+        regions = self._text_regions(image)
+        if not regions:
+            # Preprocess image for better OCR
+            return self._preprocess_image(image), None
+        
+        # Mostly whitespace, logos or figures: OCR only the text
+        from text_regions import compose_regions
+        mosaic, placements = compose_regions(image, regions)
+        return self._preprocess_image(mosaic), placements
+    
+    def _page_result(self, result, placements, size):
+        """
+        A PageResult of a prepared image in page coordinates
+        """
+        if placements is None:
+            return result
+        from text_regions import split_regions
+        return split_regions(result, placements, size)
+    
+    def _extract_enhanced(self, enhanced_image, page_end, report, route=None):
+        """
+        OCR a preprocessed image with the page's route, or with every engine
+        """
+        if route:
+            return self._extract_routed(enhanced_image, route, page_end, report)
+        
+        # Extract text using multiple engines and combine results
+        return self._extract_with_multiple_engines(enhanced_image, page_end, report)
+    
+    @instrumented('ocr.preprocess')
     def _preprocess_image(self, image):
         """
         Preprocess image to improve OCR accuracy
@@ -121,142 +368,464 @@ class OCRProcessor:
             logger.warning(f"Image preprocessing failed: {e}")
             return image
     
-    def _extract_with_multiple_engines(self, image):
+    def _engine_extractors(self, psm=None):
+        """
+        PageResult extractor of every available engine, in order of preference; psm
+        overrides the Tesseract page segmentation mode
+        """
+        tesseract_options = {'psm': psm} if psm else {}
+        extractors = {
+            'paddle': self._paddle_result,
+            'easy': self._easyocr_result,
+            'tesseract': partial(self._tesseract_result, **tesseract_options),
+            'imagemagick_tesseract': partial(self._imagemagick_tesseract_result, **tesseract_options),
+        }
+        return {engine: extract for engine, extract in extractors.items() if engine in self.available_engines}
+    
+    def _extract_with_multiple_engines(self, image, page_end=None, report=None):
         """
         Extract text using multiple OCR engines and combine results
         """
-        results = {}
+        results = self._run_engines(image, page_end, report or PageReport(None))
+        return self._combine_results(results, image.size)
+    
+    def _extract_routed(self, image, route, page_end=None, report=None):
+        """
+        Extract text with the engines of a page route, stopping at the first one that
+        finds text
+        """
+        results = self._run_engines(image, page_end, report or PageReport(None), engines=route['engines'],
+                                    psm=route['psm'], first_success=True)
+        found = {engine: result for engine, result in results.items() if result.text().strip()}
+        return self._combine_results(found or results, image.size)
+    
+    def _run_engines(self, image, page_end, report, exclude=(), engines=None, psm=None, first_success=False):
+        """
+        Run the engines in order of preference within the time left until page_end:
+        the first engine that can run always does (with a timeout); the others are
+        skipped when their estimated time no longer fits. Returns {engine: PageResult}.
         
-        # Try PaddleOCR
-        if 'paddle' in self.available_engines:
+        engines: engines to run, in this order (default: every available engine)
+        psm: Tesseract page segmentation mode (default: 6)
+        first_success: stop at the first engine that finds text
+        """
+        extractors = self._engine_extractors(psm)
+        results = {}
+        for engine in list(extractors) if engines is None else engines:
+            if engine not in extractors or engine in exclude:
+                continue
+            extract = extractors[engine]
+            if self.scheduler.busy(engine):
+                # An earlier call timed out and is still running
+                report.skip(engine)
+                continue
+            
+            left = None if page_end is None else page_end - time.monotonic()
+            timeout = self.scheduler.timeout_for(engine, left, required=not results)
+            if timeout is None:
+                report.skip(engine)
+                continue
+            if page_end is None and engine in IN_PROCESS_ENGINES:
+                # No budget to enforce: run on this thread rather than abandon a slow call
+                timeout = None
+            
+            start = time.monotonic()
             try:
-                results['paddle'] = self._extract_with_paddle(image)
+                results[engine] = extract(image, timeout)
+                self.scheduler.record(engine, time.monotonic() - start)
+                if first_success and results[engine].text().strip():
+                    break
+            except EngineTimeout as e:
+                logger.warning(f"{engine} timed out: {e}")
+                self.scheduler.record(engine, timeout)
+                report.time_out(engine)
             except Exception as e:
-                logger.warning(f"PaddleOCR failed: {e}")
+                logger.warning(f"{engine} failed: {e}")
+                report.fail(engine)
         
-        # Try EasyOCR
-        if 'easy' in self.available_engines:
-            try:
-                results['easy'] = self._extract_with_easyocr(image)
-            except Exception as e:
-                logger.warning(f"EasyOCR failed: {e}")
+        return results
+    
+    def _combine_results(self, results, size):
+        """
+        Combine per-engine PageResults: with several engines, fuse them line by line,
+        voting by confidence (see ocr_fusion)
+        """
+        from ocr_results import PageResult
+        if not results:
+            return PageResult.empty(None, size)
+        if len(results) == 1:
+            return next(iter(results.values()))
+        from ocr_fusion import fuse_results
+        with span('ocr.fusion'):
+            return fuse_results(list(results.values()), size)
+    
+    def _needs_tiling(self, image):
+        """
+        Check whether a page's OCR working set would exceed the tile memory limit
+        """
+        if not self.tile_memory_limit_mb:
+            return False
+        width, height = image.size
+        return width * height * 3 * PAGE_COPY_FACTOR > self.tile_memory_limit_mb * 1024 * 1024
+    
+    def _tile_bands(self, width, height):
+        """
+        Split a page into overlapping full-width bands that fit the memory limit.
+        Returns (top, bottom, owned_top, owned_bottom) tuples; every point of the
+        page is owned by exactly one band, which is how duplicates are dropped.
+        """
+        overlap = self.tile_overlap
+        budget = self.tile_memory_limit_mb * 1024 * 1024
+        band_height = int(budget // (width * 3 * PAGE_COPY_FACTOR))
+        if band_height < 2 * overlap:
+            logger.warning(f"Tile memory limit too small for a {width}px wide page, using {2 * overlap}px bands")
+            band_height = 2 * overlap
         
-        # Try Tesseract
-        if 'tesseract' in self.available_engines:
-            try:
-                results['tesseract'] = self._extract_with_tesseract(image)
-            except Exception as e:
-                logger.warning(f"Tesseract failed: {e}")
+        bands = []
+        top = 0
+        while True:
+            bottom = min(top + band_height, height)
+            bands.append([top, bottom])
+            if bottom >= height:
+                break
+            top = bottom - overlap
+        
+        # One seam per pair of neighbouring bands, in the middle of their overlap, so the
+        # owned ranges meet exactly whatever the parity of the overlap
+        seams = [next_top + overlap // 2 for next_top, _ in bands[1:]]
+        bounds = [0] + seams + [height]
+        return [(top, bottom, bounds[i], bounds[i + 1]) for i, (top, bottom) in enumerate(bands)]
+    
+    def _extract_tiled(self, image, page_end=None, report=None, route=None):
+        """
+        Extract text from an oversized page as overlapping tiles and merge the lines;
+        a routed page is tiled with the first available engine of its route only
+        """
+        from ocr_results import PageResult
+        report = report or PageReport(None)
+        width, height = image.size
+        tiles = self._tile_bands(width, height)
+        logger.info(f"Page is {width}x{height}, processing as {len(tiles)} tiles")
+        
+        psm = route['psm'] if route else None
+        extractors = self._engine_extractors(psm)
+        if route:
+            # Every tile needs the same engine, or lines would be fused across engines
+            first = next((engine for engine in route['engines'] if engine in extractors), None)
+            extractors = {first: extractors[first]} if first else extractors
+        engine_tiles = {engine: [] for engine in extractors}
+        failed = set()
+        
+        for i, (top, bottom, owned_top, owned_bottom) in enumerate(tiles):
+            tile = self._preprocess_image(image.crop((0, top, width, bottom)))
+            
+            # Spread what is left of the page budget over the remaining tiles
+            tile_end = None
+            if page_end is not None:
+                now = time.monotonic()
+                tile_end = now + max(page_end - now, 0) / (len(tiles) - i)
+            
+            results = self._run_engines(tile, tile_end, report, exclude=failed, engines=list(extractors), psm=psm)
+            for engine in extractors:
+                if engine in failed:
+                    continue
+                if engine not in results:
+                    # An engine missing a tile would leave a gap in the page
+                    failed.add(engine)
+                    continue
+                result = results[engine].translated(0, top)
+                # Keep each line only in the tile that owns its centre
+                centres = (result.lines['y0'] + result.lines['y1']) / 2
+                engine_tiles[engine].append(result.select((centres >= owned_top) & (centres < owned_bottom)))
+            
+            del tile
+        
+        results = {
+            engine: PageResult.concatenate(None, tile_results, (width, height)).sorted_by_position()
+            for engine, tile_results in engine_tiles.items()
+            if engine not in failed
+        }
+        
+        # Same combination rule as untiled pages
+        return self._combine_results(results, (width, height))
+    
+    def _recognize_chunk(self, images, routes, reports, deadline):
+        """
+        OCR the pages of a chunk whose route starts with a batched engine (PaddleOCR or
+        EasyOCR) through recognize_pages, one call per engine. Returns {index: (engine, PageResult)}, the
+        result being None when the call failed; other pages are left out.
+        """
+        groups = {}
+        for i, (_, route) in routes.items():
+            if not route or self._needs_tiling(images[i]):
+                continue
+            engine = next((engine for engine in route['engines'] if engine in self.available_engines), None)
+            if engine in BATCHED_ENGINES and not self.scheduler.busy(engine):
+                groups.setdefault(engine, []).append(i)
         
-        # Try ImageMagick + Tesseract
-        if 'imagemagick_tesseract' in self.available_engines:
+        batched = {}
+        for engine, indices in groups.items():
+            if len(indices) < 2:
+                continue
+            prepared = [self._prepare_page(images[i]) for i in indices]
+            budget = deadline.page_budget() * len(indices) if deadline else None
+            timeout = self.scheduler.timeout_for(engine, budget, required=True, calls=len(indices)) \
+                if deadline else None
+            start = time.monotonic()
             try:
-                results['imagemagick_tesseract'] = self._extract_with_imagemagick_tesseract(image)
+                results = self.recognize_pages([image for image, _ in prepared], engine, timeout=timeout)
+                self.scheduler.record(engine, (time.monotonic() - start) / len(indices))
             except Exception as e:
-                logger.warning(f"ImageMagick + Tesseract failed: {e}")
+                logger.warning(f"Batched {engine} failed on {len(indices)} pages: {e}")
+                for i in indices:
+                    if isinstance(e, EngineTimeout):
+                        reports[i].time_out(engine)
+                    else:
+                        reports[i].fail(engine)
+                    batched[i] = (engine, None)
+                continue
+            for i, (_, placements), result in zip(indices, prepared, results):
+                batched[i] = (engine, self._page_result(result, placements, images[i].size))
+        return batched
+    
+    def recognize_pages(self, images, engine='paddle', batch_size=None, timeout=None):
+        """
+        OCR several preprocessed pages with PaddleOCR or EasyOCR in one go: text lines are
+        detected page by page, then the line crops of all the pages are recognised
+        together in batches of batch_size (default: recognition_batch_size), so the
+        recognition model runs on full batches instead of a few lines per call. Returns
+        a PageResult per image. timeout covers the whole call.
+        Engine versions without separate detection and recognition calls OCR the pages
+        one at a time instead.
+        """
+        if engine not in BATCHED_ENGINES or engine not in self.available_engines:
+            raise Exception(f"Batched recognition needs PaddleOCR or EasyOCR, not {engine}")
+        batch_size = batch_size or self.recognition_batch_size
         
-        # Combine results - choose the longest text as it's likely more complete
-        if results:
-            best_result = max(results.values(), key=len)
-            return best_result
+        if engine == 'paddle':
+            ocr = self.engines['paddle']
+            supported = hasattr(ocr, 'text_detector') and hasattr(ocr, 'text_recognizer')
+            recognize = self._paddle_batch
         else:
-            return ""
+            reader = self.engines['easy']
+            supported = hasattr(reader, 'detect') and hasattr(reader, 'recognize')
+            recognize = self._easyocr_batch
+        if not supported:
+            extract = self._engine_extractors()[engine]
+            page_timeout = timeout / len(images) if timeout else None
+            return [extract(image, page_timeout) for image in images]
+        
+        with span('ocr.engine_batch', engine=engine):
+            return self.scheduler.run(engine, lambda: recognize(images, batch_size), timeout)
+    
+    def _paddle_batch(self, images, batch_size):
+        """
+        PaddleOCR 2.x: detector per page, then angle classifier and recognizer over the
+        line crops of every page
+        """
+        import cv2
+        import numpy as np
+        from ocr_results import PageResult
+        ocr = self.engines['paddle']
+        crops, owners = [], []
+        for index, image in enumerate(images):
+            image_array = cv2.cvtColor(np.array(image.convert('RGB')), cv2.COLOR_RGB2BGR)
+            boxes, _ = ocr.text_detector(image_array)
+            for points in boxes if boxes is not None else []:
+                crops.append(self._crop_line(image_array, points))
+                owners.append((index, self._points_to_box(points)))
+        
+        recognized = []
+        for start in range(0, len(crops), batch_size):
+            batch = crops[start:start + batch_size]
+            if getattr(ocr, 'use_angle_cls', False):
+                batch, _, _ = ocr.text_classifier(batch)
+            recognized.extend(ocr.text_recognizer(batch)[0])
+        
+        lines = [[] for _ in images]
+        for (index, box), (text, confidence) in zip(owners, recognized):
+            lines[index].append((text, confidence, box))
+        return [PageResult.from_lines(None, page_lines, 'paddle', image.size).sorted_by_position()
+                for page_lines, image in zip(lines, images)]
+    
+    def _easyocr_batch(self, images, batch_size):
+        """
+        EasyOCR: detector per page, then the recognizer over the line crops of every page.
+        The recognizer reads boxes of a single image, so each batch of batch_size crops
+        is stacked into one small image (see text_regions.stack_crops) and recognised in
+        one call; memory follows the batch, not the chunk.
+        """
+        import numpy as np
+        from bisect import bisect_right
+        from ocr_results import PageResult
+        from text_regions import stack_crops, MOSAIC_GAP
+        reader = self.engines['easy']
+        crops, owners = [], []
+        for index, image in enumerate(images):
+            gray = np.array(image.convert('L'))
+            horizontal, free = reader.detect(gray)
+            for x0, x1, y0, y1 in horizontal[0]:
+                x0, y0 = max(int(x0), 0), max(int(y0), 0)
+                crops.append(gray[y0:int(y1), x0:int(x1)])
+                owners.append((index, (x0, y0, int(x1), int(y1))))
+            for points in free[0]:
+                crops.append(self._crop_line(gray, points))
+                owners.append((index, self._points_to_box(points)))
+        
+        kept = [(crop, owner) for crop, owner in zip(crops, owners) if crop.size]
+        lines = [[] for _ in images]
+        for start in range(0, len(kept), batch_size):
+            batch = kept[start:start + batch_size]
+            mosaic, tops = stack_crops([Image.fromarray(crop) for crop, _ in batch], 'L')
+            boxes = [[MOSAIC_GAP, MOSAIC_GAP + crop.shape[1], top, top + crop.shape[0]]
+                     for (crop, _), top in zip(batch, tops)]
+            result = reader.recognize(np.array(mosaic), horizontal_list=boxes, free_list=[],
+                                      batch_size=batch_size, detail=1)
+            for points, text, confidence in result:
+                # The crop a result came from, by the centre of its box in the stack
+                centre = sum(point[1] for point in points) / len(points)
+                index, box = batch[max(bisect_right(tops, centre) - 1, 0)][1]
+                lines[index].append((text, confidence, box))
+        return [PageResult.from_lines(None, page_lines, 'easy', image.size).sorted_by_position()
+                for page_lines, image in zip(lines, images)]
     
-    def _extract_with_paddle(self, image):
+    def _crop_line(self, image_array, points):
+        """
+        Straightened crop of a text line from its four corner points (as PaddleOCR
+        crops lines for its recognizer)
+        """
+        import cv2
+        import numpy as np
+        points = np.array(points, dtype=np.float32)
+        width = int(max(np.linalg.norm(points[0] - points[1]), np.linalg.norm(points[2] - points[3])))
+        height = int(max(np.linalg.norm(points[0] - points[3]), np.linalg.norm(points[1] - points[2])))
+        target = np.float32([[0, 0], [width, 0], [width, height], [0, height]])
+        crop = cv2.warpPerspective(image_array, cv2.getPerspectiveTransform(points, target), (width, height),
+                                   borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+        if height >= 1.5 * max(width, 1):
+            # Vertical line of text
+            crop = np.rot90(crop)
+        return crop
+    
+    @instrumented('ocr.engine', engine='paddle')
+    def _paddle_result(self, image, timeout=None):
         """
         Extract text using PaddleOCR
         """
+        import cv2
+        import numpy as np
+        from ocr_results import PageResult
         image_array = np.array(image)
         if len(image_array.shape) == 3:
             image_array = cv2.cvtColor(image_array, cv2.COLOR_RGB2BGR)
         
-        result = self.engines['paddle'].ocr(image_array, cls=True)
-        return self._parse_paddle_result(result)
+        result = self.scheduler.run('paddle', lambda: self.engines['paddle'].ocr(image_array, cls=True), timeout)
+        return PageResult.from_lines(None, self._parse_paddle_lines(result), 'paddle', image.size)
     
-    def _extract_with_easyocr(self, image):
+    @instrumented('ocr.engine', engine='easy')
+    def _easyocr_result(self, image, timeout=None):
         """
         Extract text using EasyOCR
         """
+        import numpy as np
+        from ocr_results import PageResult
         image_array = np.array(image)
-        result = self.engines['easy'].readtext(image_array)
+        result = self.scheduler.run('easy', lambda: self.engines['easy'].readtext(image_array), timeout)
         
-        text_lines = []
+        lines = []
         for detection in result:
             if len(detection) >= 2:
                 text = detection[1]
                 confidence = detection[2] if len(detection) > 2 else 1.0
-                if confidence > 0.5:  # Only include high-confidence results
-                    text_lines.append(text)
+                lines.append((text, confidence, self._points_to_box(detection[0])))
         
-        return "\n".join(text_lines)
+        return PageResult.from_lines(None, lines, 'easy', image.size)
     
-    def _extract_with_tesseract(self, image):
+    @instrumented('ocr.engine', engine='tesseract')
+    def _tesseract_result(self, image, timeout=None, psm=6):
         """
-        Extract text using Tesseract directly
+        Extract text using Tesseract directly (psm: page segmentation mode, 6 for a
+        block of text, 11 for sparse text)
         """
+        import pytesseract
+        from ocr_results import PageResult
         # Configure Tesseract for better accuracy
-        custom_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz !"#$%&\'()*+,-./:;?<=>?@[\]^_`{|}~'
-        text = pytesseract.image_to_string(image, config=custom_config)
-        return text.strip()
+        custom_config = f'--oem 3 --psm {psm} ' + r'-c tessedit_char_whitelist=0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz !"#$%&\'()*+,-./:;?<=>?@[\]^_`{|}~'
+        try:
+            # pytesseract kills Tesseract when the timeout expires (0 means none)
+            data = pytesseract.image_to_data(image, config=custom_config, output_type=pytesseract.Output.DICT,
+                                             timeout=timeout or 0)
+        except RuntimeError as e:
+            if 'timeout' in str(e).lower():
+                raise EngineTimeout(f"tesseract did not finish within {timeout:.1f}s")
+            raise
+        return PageResult.from_tesseract_data(None, data, 'tesseract', image.size)
     
-    def _extract_with_imagemagick_tesseract(self, image):
+    @instrumented('ocr.engine', engine='imagemagick_tesseract')
+    def _imagemagick_tesseract_result(self, image, timeout=None, psm=6):
         """
         Extract text using ImageMagick preprocessing + Tesseract
         """
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_file:
+        from ocr_results import PageResult, read_tesseract_tsv
+        # Both subprocesses share the timeout; subprocess.run kills a process that overruns
+        call_end = time.monotonic() + timeout if timeout else None
+        
+        def remaining():
+            return max(call_end - time.monotonic(), 0.1) if call_end else None
+        
+        # The work directory (input, processed image, TSV output) is removed even on failure
+        with default_scratch().work_dir('ocr') as work_dir:
+            # Save image temporarily
+            input_file = os.path.join(work_dir, 'page.png')
+            image.save(input_file, 'PNG')
+            
             try:
-                # Save image temporarily
-                image.save(temp_file.name, 'PNG')
-                
                 # Use ImageMagick to preprocess
-                processed_file = temp_file.name.replace('.png', '_processed.png')
+                processed_file = os.path.join(work_dir, 'page_processed.png')
                 subprocess.run([
-                    'magick', temp_file.name,
+                    'magick', input_file,
                     '-density', '300',
                     '-quality', '100',
                     '-sharpen', '0x1',
                     '-contrast-stretch', '0.15x0.05%',
                     processed_file
-                ], check=True, capture_output=True)
+                ], check=True, capture_output=True, timeout=remaining())
                 
-                # Run Tesseract on processed image
-                text_file = processed_file.replace('.png', '')
+                # Run Tesseract on processed image, with word boxes and confidences
+                output_base = os.path.join(work_dir, 'page_processed')
                 subprocess.run([
-                    'tesseract', processed_file, text_file,
-                    '--oem', '3', '--psm', '6'
-                ], check=True, capture_output=True)
-                
-                # Read extracted text
-                with open(f"{text_file}.txt", 'r', encoding='utf-8') as f:
-                    text = f.read().strip()
-                
-                # Cleanup
-                os.unlink(processed_file)
-                os.unlink(f"{text_file}.txt")
-                
-                return text
-                
-            finally:
-                # Cleanup original temp file
-                if os.path.exists(temp_file.name):
-                    os.unlink(temp_file.name)
+                    'tesseract', processed_file, output_base,
+                    '--oem', '3', '--psm', str(psm), 'tsv'
+                ], check=True, capture_output=True, timeout=remaining())
+            except subprocess.TimeoutExpired as e:
+                raise EngineTimeout(f"imagemagick_tesseract: {e.cmd[0]} did not finish within {timeout:.1f}s")
+            
+            data = read_tesseract_tsv(f"{output_base}.tsv")
+            return PageResult.from_tesseract_data(None, data, 'imagemagick_tesseract', image.size)
     
-    def _parse_paddle_result(self, result):
+    def _parse_paddle_lines(self, result):
         """
-        Parse PaddleOCR result and extract text
+        Parse PaddleOCR result into (text, confidence, box) lines
         """
         if not result or not result[0]:
-            return ""
+            return []
         
-        text_lines = []
+        lines = []
         for line in result[0]:
             if len(line) >= 2:
-                text = line[1][0] if isinstance(line[1], list) else str(line[1])
-                confidence = line[1][1] if isinstance(line[1], list) and len(line[1]) > 1 else 1.0
-                if confidence > 0.5:  # Only include high-confidence results
-                    text_lines.append(text)
+                text = line[1][0] if isinstance(line[1], (list, tuple)) else str(line[1])
+                confidence = line[1][1] if isinstance(line[1], (list, tuple)) and len(line[1]) > 1 else 1.0
+                lines.append((text, confidence, self._points_to_box(line[0])))
         
-        return "\n".join(text_lines)
+        return lines
+    
+    def _points_to_box(self, points):
+        """
+        Convert a detector's corner points into an (x0, y0, x1, y1) box
+        """
+        xs = [point[0] for point in points]
+        ys = [point[1] for point in points]
+        return (min(xs), min(ys), max(xs), max(ys))
     
     def validate_setup(self):
         """
@@ -0,0 +1,243 @@
+import csv
+import json
+import struct
+import numpy as np
+
+# Engine ids stored per line (uint8)
+ENGINES = ('paddle', 'easy', 'tesseract', 'imagemagick_tesseract')
+
+# Lines below these confidences are left out of the page text; other engines keep every line
+MIN_CONFIDENCE = {'paddle': 0.5, 'easy': 0.5}
+
+# Boxes are (x0, y0, x1, y1) in page pixels; start/end index the page's text buffer
+LINE_DTYPE = np.dtype([
+    ('x0', '<f4'), ('y0', '<f4'), ('x1', '<f4'), ('y1', '<f4'),
+    ('confidence', '<f4'), ('engine', 'u1'), ('start', '<u4'), ('end', '<u4'),
+])
+WORD_DTYPE = np.dtype([
+    ('x0', '<f4'), ('y0', '<f4'), ('x1', '<f4'), ('y1', '<f4'),
+    ('confidence', '<f4'), ('line', '<u4'), ('start', '<u4'), ('end', '<u4'),
+])
+
+_HEADER = struct.Struct('<I')
+
+
+def format_pages(pages):
+    """
+    Join {page_number: text} into the processors' '--- Page N ---' output; empty pages are left out
+    """
+    return "\n".join(
+        f"--- Page {page} ---\n{pages[page]}\n" for page in sorted(pages) if pages[page]
+    )
+
+
+def format_results(results):
+    """
+    The '--- Page N ---' text of a list of PageResults
+    """
+    return format_pages({result.page: result.text() for result in results})
+
+
+class PageResult:
+    """
+    OCR output of one page: lines and words with boxes, confidences and engine ids,
+    held in two NumPy structured arrays plus one text buffer (about 32 bytes per
+    word besides the characters themselves), instead of a string per page
+    """
+    __slots__ = ('page', 'width', 'height', 'lines', 'words', 'buffer')
+
+    def __init__(self, page, width, height, lines, words, buffer):
+        self.page = page
+        self.width = width
+        self.height = height
+        self.lines = lines
+        self.words = words
+        self.buffer = buffer
+
+    @classmethod
+    def build(cls, page, entries, size=(0, 0)):
+        """
+        Build from (text, confidence, box, engine, words) line entries, where words is a
+        list of (text, confidence, box) found in the line's text in order (or empty)
+        """
+        lines = np.zeros(len(entries), dtype=LINE_DTYPE)
+        word_rows = []
+        parts = []
+        offset = 0
+        for i, (text, confidence, box, engine, words) in enumerate(entries):
+            lines[i] = (*box, confidence, ENGINES.index(engine), offset, offset + len(text))
+            cursor = 0
+            for word_text, word_confidence, word_box in words:
+                found = text.find(word_text, cursor)
+                start = found if found >= 0 else cursor
+                cursor = start + len(word_text) if found >= 0 else cursor
+                word_rows.append((*word_box, word_confidence, i, offset + start, offset + cursor))
+            parts.append(text)
+            offset += len(text) + 1  # Lines are separated by a newline in the buffer
+        return cls(page, size[0], size[1], lines, np.array(word_rows, dtype=WORD_DTYPE), "\n".join(parts))
+
+    @classmethod
+    def from_lines(cls, page, lines, engine, size=(0, 0)):
+        """
+        Build from an engine's (text, confidence, box) lines
+        """
+        return cls.build(page, [(text, confidence, box, engine, []) for text, confidence, box in lines], size)
+
+    @classmethod
+    def from_tesseract_data(cls, page, data, engine='tesseract', size=(0, 0)):
+        """
+        Build from Tesseract word data (pytesseract image_to_data dict or a TSV read with
+        read_tesseract_tsv); words are grouped into Tesseract's lines
+        """
+        grouped = {}
+        for i, word in enumerate(data['text']):
+            if not str(word).strip():
+                continue
+            key = (int(data['block_num'][i]), int(data['par_num'][i]), int(data['line_num'][i]))
+            left, top = int(data['left'][i]), int(data['top'][i])
+            box = (left, top, left + int(data['width'][i]), top + int(data['height'][i]))
+            grouped.setdefault(key, []).append((str(word), float(data['conf'][i]) / 100, box))
+
+        entries = []
+        for words in grouped.values():
+            text = " ".join(word for word, _, _ in words)
+            confidence = sum(word_confidence for _, word_confidence, _ in words) / len(words)
+            box = (
+                min(b[0] for _, _, b in words), min(b[1] for _, _, b in words),
+                max(b[2] for _, _, b in words), max(b[3] for _, _, b in words),
+            )
+            entries.append((text, confidence, box, engine, words))
+        return cls.build(page, entries, size)
+
+    @classmethod
+    def empty(cls, page, size=(0, 0)):
+        return cls.build(page, [], size)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def line_text(self, i):
+        return self.buffer[self.lines['start'][i]:self.lines['end'][i]]
+
+    def entries(self):
+        """
+        The lines as (text, confidence, box, engine, words) entries, as accepted by build()
+        """
+        words_by_line = {}
+        for word in self.words:
+            words_by_line.setdefault(int(word['line']), []).append((
+                self.buffer[word['start']:word['end']], float(word['confidence']),
+                (float(word['x0']), float(word['y0']), float(word['x1']), float(word['y1'])),
+            ))
+        return [
+            (
+                self.line_text(i), float(line['confidence']),
+                (float(line['x0']), float(line['y0']), float(line['x1']), float(line['y1'])),
+                ENGINES[line['engine']], words_by_line.get(i, []),
+            )
+            for i, line in enumerate(self.lines)
+        ]
+
+    def engine_names(self):
+        return sorted({ENGINES[engine] for engine in np.unique(self.lines['engine'])})
+
+    def text(self, min_confidence=None):
+        """
+        Page text, one OCR line per line of text; drops lines below min_confidence (default: the
+        per-engine MIN_CONFIDENCE thresholds)
+        """
+        if min_confidence is None:
+            thresholds = np.array([MIN_CONFIDENCE.get(engine, -np.inf) for engine in ENGINES], dtype='<f4')
+            keep = self.lines['confidence'] > thresholds[self.lines['engine']]
+        else:
+            keep = self.lines['confidence'] > min_confidence
+        return "\n".join(self.line_text(i) for i in np.flatnonzero(keep))
+
+    def select(self, mask):
+        """
+        New result with only the lines where mask is true (and their words)
+        """
+        entries = self.entries()
+        return PageResult.build(self.page, [entries[i] for i in np.flatnonzero(mask)], (self.width, self.height))
+
+    def translated(self, dx, dy):
+        """
+        Copy with every box shifted by (dx, dy), e.g. from tile to page coordinates
+        """
+        lines = self.lines.copy()
+        words = self.words.copy()
+        for array in (lines, words):
+            array['x0'] += dx
+            array['x1'] += dx
+            array['y0'] += dy
+            array['y1'] += dy
+        return PageResult(self.page, self.width, self.height, lines, words, self.buffer)
+
+    def sorted_by_position(self):
+        """
+        Copy with the lines in reading order (top to bottom, then left to right)
+        """
+        order = np.lexsort((self.lines['x0'], self.lines['y0']))
+        entries = self.entries()
+        return PageResult.build(self.page, [entries[i] for i in order], (self.width, self.height))
+
+    @classmethod
+    def concatenate(cls, page, results, size=(0, 0)):
+        """
+        One result holding the lines of several (e.g. per-tile) results in order
+        """
+        entries = []
+        for result in results:
+            entries.extend(result.entries())
+        return cls.build(page, entries, size)
+
+    def to_bytes(self):
+        """
+        Compact binary form: JSON header, then the raw line and word arrays and the UTF-8 text
+        """
+        text = self.buffer.encode('utf-8')
+        header = json.dumps({
+            'page': self.page, 'width': self.width, 'height': self.height,
+            'lines': len(self.lines), 'words': len(self.words), 'text_bytes': len(text),
+        }).encode('utf-8')
+        return b''.join((_HEADER.pack(len(header)), header, self.lines.tobytes(), self.words.tobytes(), text))
+
+    @classmethod
+    def from_bytes(cls, data):
+        (header_size,) = _HEADER.unpack_from(data)
+        offset = _HEADER.size
+        header = json.loads(data[offset:offset + header_size])
+        offset += header_size
+        lines = np.frombuffer(data, dtype=LINE_DTYPE, count=header['lines'], offset=offset).copy()
+        offset += lines.nbytes
+        words = np.frombuffer(data, dtype=WORD_DTYPE, count=header['words'], offset=offset).copy()
+        offset += words.nbytes
+        buffer = bytes(data[offset:offset + header['text_bytes']]).decode('utf-8')
+        return cls(header['page'], header['width'], header['height'], lines, words, buffer)
+
+    def to_dict(self):
+        """
+        JSON-friendly form for APIs and debugging
+        """
+        return {
+            'page': self.page,
+            'width': self.width,
+            'height': self.height,
+            'lines': [
+                {'text': text, 'confidence': confidence, 'box': box, 'engine': engine,
+                 'words': [{'text': w[0], 'confidence': w[1], 'box': w[2]} for w in words]}
+                for text, confidence, box, engine, words in self.entries()
+            ],
+        }
+
+
+def read_tesseract_tsv(path):
+    """
+    Read a Tesseract TSV output file into the column dict pytesseract's image_to_data returns
+    """
+    data = {}
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f, delimiter='\t', quoting=csv.QUOTE_NONE):
+            for column, value in row.items():
+                data.setdefault(column, []).append(value if value is not None else '')
+    return data
@@ -0,0 +1,436 @@
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Size of the warm-up page: large enough for every engine's detector to find lines
+WARMUP_PAGE_SIZE = (1240, 400)
+
+# How long a finished extraction waits for its remaining progress events
+PROGRESS_DRAIN_SECONDS = 5
+
+# A worker that reports no progress on its task for this long is killed; above
+# pdf_handler.MAGICK_TIMEOUT, so a slow rasterization times out on its own first
+DEFAULT_STALL_SECONDS = 900
+
+# Pages rasterized per step in a worker; the worker reports in after each one
+RASTERIZE_CHUNK = 10
+
+# Runs of a task whose worker died under it (another task's crash or stall takes
+# the whole pool down); a task whose own worker stalled is not run again
+TASK_ATTEMPTS = 3
+
+# How often a waiting extraction checks its worker for a stall
+WATCHDOG_INTERVAL = 5
+
+# Cores per worker by default, so each engine still has some intra-op threads
+CORES_PER_WORKER = 2
+
+# Resident memory of a worker with every engine loaded, plus a page in flight
+DEFAULT_WORKER_MEMORY_MB = 1500
+
+# State of the current worker process (set by _init_worker)
+_worker = {}
+
+
+class OCRWorkerLost(Exception):
+    def __init__(self, message, stalled=False):
+        super().__init__(message)
+        self.stalled = stalled
+
+
+def warmup_page():
+    """
+    A small page of printed text that every engine can read
+    """
+    from PIL import Image, ImageDraw, ImageFont
+    image = Image.new('RGB', WARMUP_PAGE_SIZE, 'white')
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=36)
+    except TypeError:
+        # Pillow < 10.1 has a single fixed-size default font
+        font = ImageFont.load_default()
+    for line, text in enumerate(("Study Buddy warm-up page", "The quick brown fox 0123456789")):
+        draw.text((60, 80 + line * 120), text, fill='black', font=font)
+    return image
+
+
+def _init_worker(events, workers, options, warmup):
+    """
+    Load the OCR engines in a fresh worker process, run the warm-up page through each
+    of them and report the outcome. Errors are reported rather than raised, since a
+    failing initializer would break the whole pool.
+    """
+    _worker['events'] = events
+    status = {'pid': os.getpid(), 'ready': False, 'engines': [], 'warmup_seconds': {}, 'error': None}
+    start = time.monotonic()
+    try:
+        from cpu_budget import CPUBudget
+        from ocr_processor import OCRProcessor
+        from pdf_handler import PDFHandler
+        # Engines run on the worker's own thread: a stalled worker is killed by the pool
+        processor = OCRProcessor(cpu_budget=CPUBudget(workers), **dict({'inline_engines': True}, **options))
+        _worker['processor'] = processor
+        _worker['pdf_handler'] = PDFHandler()
+        status['load_seconds'] = round(time.monotonic() - start, 2)
+
+        if warmup:
+            image = warmup_page()
+            for engine, extract in processor._engine_extractors().items():
+                engine_start = time.monotonic()
+                try:
+                    extract(processor._preprocess_image(image))
+                except Exception as e:
+                    logger.warning(f"Warm-up of {engine} failed: {e}")
+                    continue
+                status['warmup_seconds'][engine] = round(time.monotonic() - engine_start, 2)
+                status['engines'].append(engine)
+        else:
+            status['engines'] = list(processor.available_engines)
+        status['ready'] = bool(status['engines'])
+        if not status['ready']:
+            status['error'] = "No OCR engine passed the warm-up"
+    except Exception as e:
+        logger.error(f"OCR worker failed to start: {e}")
+        status['error'] = str(e)
+    _worker['status'] = status
+    events.put(('status', status))
+
+
+def _worker_extract(pdf_path, task_id, pages=None):
+    """
+    Extract the text of a PDF (or of some of its pages) in a worker; progress and every
+    finished page are reported through the event queue. Returns ({page: text}, degraded_pages).
+    """
+    status = _worker.get('status', {})
+    if not status.get('ready'):
+        raise Exception(f"OCR worker is not ready: {status.get('error') or 'still starting'}")
+    events = _worker['events']
+    processor = _worker['processor']
+    # Tells the pool which process to kill if the task stalls
+    events.put(('started', task_id, os.getpid()))
+
+    try:
+        from page_classifier import text_layers
+        if pages is None:
+            from pdf2image import pdfinfo_from_path
+            pages = list(range(1, pdfinfo_from_path(pdf_path)['Pages'] + 1))
+        images = []
+        for start in range(0, len(pages), RASTERIZE_CHUNK):
+            images.extend(_worker['pdf_handler'].convert_pdf_to_images(pdf_path, pages[start:start + RASTERIZE_CHUNK]))
+            # A long document takes a while to rasterize: tell the stall watchdog it is moving
+            events.put(('heartbeat', task_id))
+        events.put(('progress', task_id, 0, len(images)))
+        results = processor.extract_page_results(
+            images, progress_callback=lambda done, total: events.put(('progress', task_id, done, total)),
+            page_numbers=pages, text_layers=text_layers(pdf_path, pages) if processor.routing else None,
+            page_callback=lambda result, degraded: events.put(('page', task_id, result.page, result.text(), degraded))
+        )
+        return {result.page: result.text() for result in results}, processor.degraded_pages
+    finally:
+        # Comes after all of the task's progress events in the queue
+        events.put(('done', task_id))
+
+
+def _worker_pid():
+    return os.getpid()
+
+
+def _available_memory_bytes():
+    """
+    Memory available for new processes without swapping, or None if unknown
+    """
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def default_workers(worker_memory_mb=None):
+    """
+    One worker per CORES_PER_WORKER cores, as many as fit in the available memory at
+    worker_memory_mb each (None reads STUDY_BUDDY_OCR_WORKER_MEMORY_MB, default 1500);
+    at least one
+    """
+    from cpu_budget import CPUBudget
+    if worker_memory_mb is None:
+        worker_memory_mb = float(os.getenv('STUDY_BUDDY_OCR_WORKER_MEMORY_MB', DEFAULT_WORKER_MEMORY_MB))
+    workers = CPUBudget().total_cores // CORES_PER_WORKER
+    available = _available_memory_bytes()
+    if available is not None and worker_memory_mb:
+        workers = min(workers, int(available // (worker_memory_mb * 1024 * 1024)))
+    return max(1, workers)
+
+
+class OCRWorkerPool:
+    def __init__(self, workers=1, processor_options=None, warmup=True, stall_seconds=None):
+        """
+        Processes that load the OCR engines once, at server start, and warm each of
+        them up on a small page, so the first real document sees steady-state latency
+        instead of model downloads and loads
+
+        workers: number of worker processes; each holds its own copy of the models and
+        gets an equal share of the cores
+        processor_options: keyword arguments for every worker's OCRProcessor
+        warmup: run the warm-up page through every engine after loading it
+        stall_seconds: kill a worker whose task reports no progress for this long (None
+        reads STUDY_BUDDY_OCR_STALL_SECONDS, default 600); 0 disables the watchdog
+        """
+        self.workers = max(1, workers)
+        self.processor_options = processor_options or {}
+        self.warmup = warmup
+        if stall_seconds is None:
+            stall_seconds = float(os.getenv('STUDY_BUDDY_OCR_STALL_SECONDS', DEFAULT_STALL_SECONDS))
+        self.stall_seconds = stall_seconds
+        self.started = None
+        self._status = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+        self._restart_lock = threading.Lock()
+        self._ready = threading.Event()
+        # Spawned, not forked: the server has threads, and the engines' native pools must
+        # be sized by each worker's CPU budget before they first load
+        self._context = multiprocessing.get_context('spawn')
+        self._events = self._context.Queue()
+        self._executor = None
+        threading.Thread(target=self._read_events, name='ocr-pool-events', daemon=True).start()
+        self._start()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Pool of STUDY_BUDDY_OCR_WORKERS processes (default: default_workers()); 0 disables
+        the pool
+        """
+        workers = os.getenv('STUDY_BUDDY_OCR_WORKERS')
+        workers = default_workers() if workers is None or workers == '' else int(workers)
+        return cls(workers) if workers > 0 else None
+
+    def _start(self):
+        with self._lock:
+            self._status = {}
+            self._ready.clear()
+            self.started = time.time()
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=self._context,
+                initializer=_init_worker,
+                initargs=(self._events, self.workers, self.processor_options, self.warmup),
+            )
+            # Processes start on demand, so give every one of them a task right away
+            for _ in range(self.workers):
+                self._executor.submit(_worker_pid)
+        logger.info(f"Starting {self.workers} OCR worker process(es)")
+
+    def _read_events(self):
+        while True:
+            event = self._events.get()
+            if event[0] == 'status':
+                status = event[1]
+                with self._lock:
+                    self._status[status['pid']] = status
+                    if len(self._status) >= self.workers:
+                        self._ready.set()
+                if status['ready']:
+                    logger.info(f"OCR worker {status['pid']} ready: {', '.join(status['engines'])} "
+                                f"(load {status.get('load_seconds', 0)}s, warm-up {status['warmup_seconds']})")
+                else:
+                    logger.error(f"OCR worker {status['pid']} is not usable: {status['error']}")
+                continue
+
+            with self._lock:
+                task = self._tasks.get(event[1])
+                if task:
+                    task['last_event'] = time.monotonic()
+                    if event[0] == 'started':
+                        task['pid'] = event[2]
+            if task is None:
+                continue
+            if event[0] == 'done':
+                task['finished'].set()
+            elif event[0] == 'progress' and task['callback']:
+                try:
+                    task['callback'](*event[2:])
+                except Exception as e:
+                    logger.warning(f"Progress callback failed: {e}")
+            elif event[0] == 'page':
+                try:
+                    task['page_callback'](*event[2:])
+                except Exception as e:
+                    logger.warning(f"Page callback failed: {e}")
+
+    def wait_ready(self, timeout=None):
+        """
+        Block until every worker has reported in (ready or failed); returns whether they did
+        """
+        return self._ready.wait(timeout)
+
+    def health(self):
+        """
+        Readiness of the pool: ready once every worker has loaded and warmed up its engines
+        """
+        with self._lock:
+            workers = sorted(self._status.values(), key=lambda status: status['pid'])
+        ready = [status for status in workers if status['ready']]
+        return {
+            'ready': len(ready) >= self.workers,
+            'workers': self.workers,
+            'ready_workers': len(ready),
+            'starting_workers': self.workers - len(workers),
+            'engines': sorted({engine for status in ready for engine in status['engines']}),
+            'started': self.started,
+            'details': workers,
+        }
+
+    def extract_pdf_text(self, pdf_path, progress_callback=None, pages=None):
+        """
+        Like extract_pdf_pages, with the pages joined into the processors' '--- Page N ---'
+        text. Returns (text, degraded_pages).
+        """
+        from ocr_results import format_pages
+        page_texts, degraded_pages = self.extract_pdf_pages(pdf_path, progress_callback, pages)
+        return format_pages(page_texts), degraded_pages
+
+    def extract_pdf_pages(self, pdf_path, progress_callback=None, pages=None, page_callback=None):
+        """
+        Extract the text of a PDF (only the given 1-based pages, if any) on one of the
+        workers. Returns ({page: text}, degraded_pages). page_callback(page, text, degraded)
+        is called as each page finishes, so it survives the worker dying later.
+        A crashed worker takes the pool down with it; the pool is restarted (and warmed up
+        again) and the tasks it took down are run again for their missing pages, up to
+        TASK_ATTEMPTS times. A worker that reports nothing for stall_seconds (an engine
+        hung on a page) is killed, which does the same, except that its own task fails.
+        """
+        pdf_path = os.path.abspath(pdf_path)
+        received = {}
+
+        def on_page(page, text, degraded):
+            received[page] = text
+            if page_callback:
+                page_callback(page, text, degraded)
+
+        remaining = pages
+        for attempt in range(1, TASK_ATTEMPTS + 1):
+            done_before = len(received)
+
+            def on_progress(done, total):
+                # Pages finished by earlier attempts still count
+                if progress_callback:
+                    progress_callback(done_before + done, done_before + total)
+
+            try:
+                page_texts, degraded_pages = self._run_task(pdf_path, on_progress, remaining, on_page)
+                received.update(page_texts)
+                return received, degraded_pages
+            except OCRWorkerLost as e:
+                if e.stalled or attempt == TASK_ATTEMPTS:
+                    raise
+                if remaining is None:
+                    from pdf2image import pdfinfo_from_path
+                    remaining = list(range(1, pdfinfo_from_path(pdf_path)['Pages'] + 1))
+                remaining = [page for page in remaining if page not in received]
+                logger.warning(f"{e}; running the task again for its {len(remaining)} missing pages")
+                if not remaining:
+                    return received, []
+
+    def _run_task(self, pdf_path, progress_callback, pages, page_callback):
+        """
+        One run of an extraction on the current executor, watched for stalls; raises
+        OCRWorkerLost when the pool broke under it (after restarting it)
+        """
+        task_id = uuid.uuid4().hex
+        task = {'callback': progress_callback, 'page_callback': page_callback, 'finished': threading.Event(),
+                'pid': None, 'last_event': None}
+        with self._lock:
+            self._tasks[task_id] = task
+            executor = self._executor
+        stalled = False
+        try:
+            future = executor.submit(_worker_extract, pdf_path, task_id, pages)
+            while True:
+                try:
+                    result = future.result(timeout=WATCHDOG_INTERVAL)
+                    break
+                except FutureTimeout:
+                    # The clock starts when a worker picks the task up, not while it is queued
+                    with self._lock:
+                        last_event, pid = task['last_event'], task['pid']
+                    if not stalled and self.stall_seconds and last_event is not None and \
+                            time.monotonic() - last_event > self.stall_seconds:
+                        stalled = True
+                        self._kill_worker(pid)
+            # Let the last progress events through before the callback goes away
+            task['finished'].wait(PROGRESS_DRAIN_SECONDS)
+            return result
+        except BrokenProcessPool:
+            self._restart(executor)
+            if stalled:
+                raise OCRWorkerLost(f"OCR worker made no progress for {self.stall_seconds:.0f}s and was stopped",
+                                    stalled=True)
+            raise OCRWorkerLost("OCR worker died while extracting the document")
+        finally:
+            with self._lock:
+                self._tasks.pop(task_id, None)
+
+    def _kill_worker(self, pid):
+        logger.error(f"OCR worker {pid} made no progress for {self.stall_seconds:.0f}s, killing it")
+        try:
+            os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+        except OSError as e:
+            logger.warning(f"Could not kill OCR worker {pid}: {e}")
+
+    def _restart(self, executor):
+        """
+        Replace a broken executor, once: the other tasks it took down find it already replaced
+        """
+        with self._restart_lock:
+            if self._executor is not executor:
+                return
+            logger.error("An OCR worker died, restarting the pool")
+            executor.shutdown(wait=False, cancel_futures=True)
+            self._start()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def start_ocr_pool(workers=None, **kwargs):
+    """
+    Start the process-wide OCR worker pool (once); workers=None reads
+    STUDY_BUDDY_OCR_WORKERS. Returns the pool, or None when it is disabled.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = OCRWorkerPool.from_env() if workers is None else \
+                (OCRWorkerPool(workers, **kwargs) if workers > 0 else None)
+            if _pool:
+                from instrumentation import register_health_check
+                register_health_check('ocr_workers', _pool.health)
+        return _pool
+
+
+def running_pool():
+    """
+    The OCR worker pool if one has been started in this process
+    """
+    return _pool
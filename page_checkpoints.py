@@ -0,0 +1,375 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from scratch_space import default_scratch
+from upload_cache import CACHE_VERSION, hash_file
+from ocr_results import format_pages
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    document_hash TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    total_pages INTEGER NOT NULL,
+    fingerprints TEXT,
+    complete INTEGER NOT NULL DEFAULT 0,
+    updated REAL NOT NULL,
+    PRIMARY KEY (document_hash, settings)
+);
+CREATE TABLE IF NOT EXISTS pages (
+    document_hash TEXT NOT NULL,
+    settings TEXT NOT NULL,
+    page INTEGER NOT NULL,
+    fingerprint TEXT,
+    text TEXT NOT NULL,
+    created REAL NOT NULL,
+    PRIMARY KEY (document_hash, settings, page)
+);
+"""
+
+# Checkpoints of documents untouched for this long are pruned when a store is opened
+DEFAULT_MAX_AGE_DAYS = 30
+# Oldest documents are pruned until the stored page text fits in this many MB
+DEFAULT_MAX_MB = 512
+
+
+def page_ranges(pages):
+    """
+    Group sorted 1-based page numbers into contiguous (first_page, last_page) runs
+    """
+    runs = []
+    for page in pages:
+        if runs and runs[-1][1] == page - 1:
+            runs[-1] = (runs[-1][0], page)
+        else:
+            runs.append((page, page))
+    return runs
+
+
+class CheckpointStore:
+    def __init__(self, db_path=None, max_age_days=None, max_mb=None):
+        """
+        Durable per-page OCR output keyed by document hash and extraction settings, so an
+        interrupted extraction resumes at the first missing page. SQLite in WAL mode lets
+        partial results be read while another process is still writing pages. Pages are
+        also indexed by content fingerprint, so an edited re-upload reuses unchanged pages.
+
+        db_path: None keeps checkpoints.db under the scratch root
+        max_age_days, max_mb: retention applied on open; None reads
+        STUDY_BUDDY_CHECKPOINT_MAX_AGE_DAYS / STUDY_BUDDY_CHECKPOINT_MAX_MB, 0 disables the limit
+        """
+        if db_path is None:
+            db_path = os.path.join(default_scratch().root, 'checkpoints.db')
+        if max_age_days is None:
+            max_age_days = float(os.getenv('STUDY_BUDDY_CHECKPOINT_MAX_AGE_DAYS', DEFAULT_MAX_AGE_DAYS))
+        if max_mb is None:
+            max_mb = float(os.getenv('STUDY_BUDDY_CHECKPOINT_MAX_MB', DEFAULT_MAX_MB))
+        self.db_path = db_path
+        self.max_age_days = max_age_days
+        self.max_mb = max_mb
+        with self._connect() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            # Stores created before page fingerprinting lack the fingerprint columns
+            for table, column in (('documents', 'fingerprints'), ('pages', 'fingerprint')):
+                columns = [row['name'] for row in connection.execute(f"PRAGMA table_info({table})")]
+                if column not in columns:
+                    connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+            connection.execute("CREATE INDEX IF NOT EXISTS pages_fingerprint ON pages (settings, fingerprint)")
+        self.prune()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Store at STUDY_BUDDY_CHECKPOINT_DB (default: checkpoints.db under the scratch root);
+        set it to an empty string to disable checkpointing
+        """
+        db_path = os.getenv('STUDY_BUDDY_CHECKPOINT_DB')
+        if db_path == '':
+            return None
+        return cls(db_path)
+
+    def _connect(self):
+        connection = sqlite3.connect(self.db_path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    def load(self, document_hash, settings):
+        """
+        Return (total_pages, {page: text}, fingerprints); total_pages is None for an unknown
+        document and fingerprints None when the pages were not fingerprinted
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT total_pages, fingerprints FROM documents WHERE document_hash = ? AND settings = ?",
+                (document_hash, settings)
+            ).fetchone()
+            if row is None:
+                return None, {}, None
+            pages = connection.execute(
+                "SELECT page, text FROM pages WHERE document_hash = ? AND settings = ?",
+                (document_hash, settings)
+            ).fetchall()
+        fingerprints = json.loads(row['fingerprints']) if row['fingerprints'] else None
+        return row['total_pages'], {page['page']: page['text'] for page in pages}, fingerprints
+
+    def begin(self, document_hash, settings, total_pages, fingerprints=None):
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO documents (document_hash, settings, total_pages, fingerprints, updated) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT (document_hash, settings) DO UPDATE SET "
+                "total_pages = excluded.total_pages, fingerprints = excluded.fingerprints, updated = excluded.updated",
+                (document_hash, settings, total_pages, json.dumps(fingerprints) if fingerprints else None, time.time())
+            )
+
+    def find_pages(self, settings, fingerprints):
+        """
+        Text of already extracted pages with these fingerprints (from any document): {fingerprint: text}
+        """
+        found = {}
+        unique = list(set(fingerprints))
+        with self._connect() as connection:
+            # Stay below SQLite's bound parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                rows = connection.execute(
+                    f"SELECT fingerprint, text FROM pages WHERE settings = ? AND fingerprint IN "
+                    f"({', '.join('?' * len(batch))})",
+                    (settings, *batch)
+                ).fetchall()
+                found.update((row['fingerprint'], row['text']) for row in rows)
+        return found
+
+    def save_page(self, document_hash, settings, page, text, fingerprint=None):
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO pages (document_hash, settings, page, fingerprint, text, created) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (document_hash, settings, page, fingerprint, text, now)
+            )
+            connection.execute(
+                "UPDATE documents SET updated = ? WHERE document_hash = ? AND settings = ?",
+                (now, document_hash, settings)
+            )
+
+    def finish(self, document_hash, settings):
+        """
+        Mark the document complete if every page has been saved. Returns whether it is.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE documents SET complete = 1, updated = ? WHERE document_hash = ? AND settings = ? "
+                "AND total_pages = (SELECT COUNT(*) FROM pages WHERE pages.document_hash = documents.document_hash "
+                "AND pages.settings = documents.settings)",
+                (time.time(), document_hash, settings)
+            )
+            row = connection.execute(
+                "SELECT complete FROM documents WHERE document_hash = ? AND settings = ?",
+                (document_hash, settings)
+            ).fetchone()
+        return bool(row and row['complete'])
+
+    def partial_results(self, document_hash):
+        """
+        Progress and text extracted so far for a document, one entry per extraction
+        settings; safe to call while the extraction is running
+        """
+        with self._connect() as connection:
+            documents = connection.execute(
+                "SELECT settings, total_pages, complete, updated FROM documents WHERE document_hash = ?",
+                (document_hash,)
+            ).fetchall()
+        results = []
+        for document in documents:
+            _, pages, _ = self.load(document_hash, document['settings'])
+            results.append({
+                'settings': document['settings'],
+                'total_pages': document['total_pages'],
+                'pages_done': len(pages),
+                'complete': bool(document['complete']),
+                'updated': document['updated'],
+                'text': format_pages(pages),
+            })
+        return results
+
+    def prune(self):
+        """
+        Delete documents not updated within max_age_days, then the least recently updated
+        ones until the stored page text fits in max_mb, and shrink the file if anything
+        went. Returns the number of documents removed.
+        """
+        removed = []
+        with self._connect() as connection:
+            if self.max_age_days:
+                cutoff = time.time() - self.max_age_days * 86400
+                removed += connection.execute(
+                    "SELECT document_hash, settings FROM documents WHERE updated < ?", (cutoff,)
+                ).fetchall()
+            if self.max_mb:
+                documents = connection.execute(
+                    "SELECT documents.document_hash, documents.settings, "
+                    "(SELECT COALESCE(SUM(LENGTH(CAST(text AS BLOB))), 0) FROM pages "
+                    "WHERE pages.document_hash = documents.document_hash "
+                    "AND pages.settings = documents.settings) AS size "
+                    "FROM documents ORDER BY updated DESC"
+                ).fetchall()
+                kept = 0
+                for document in documents:
+                    kept += document['size']
+                    if kept > self.max_mb * 1024 * 1024:
+                        removed.append(document)
+            keys = {(row['document_hash'], row['settings']) for row in removed}
+            for key in keys:
+                connection.execute("DELETE FROM pages WHERE document_hash = ? AND settings = ?", key)
+                connection.execute("DELETE FROM documents WHERE document_hash = ? AND settings = ?", key)
+        if keys:
+            # Deleted rows only become free pages; VACUUM hands the space back to the disk
+            connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            try:
+                connection.execute("VACUUM")
+            except sqlite3.OperationalError as e:
+                logger.debug(f"Checkpoint store not vacuumed: {e}")
+            finally:
+                connection.close()
+            logger.info(f"Pruned checkpoints of {len(keys)} documents from {self.db_path}")
+        return len(keys)
+
+    def discard(self, document_hash, settings=None):
+        """
+        Delete the checkpoints of a document (for one settings string, or all of them)
+        """
+        condition = "document_hash = ?" + (" AND settings = ?" if settings else "")
+        args = (document_hash, settings) if settings else (document_hash,)
+        with self._connect() as connection:
+            connection.execute(f"DELETE FROM pages WHERE {condition}", args)
+            connection.execute(f"DELETE FROM documents WHERE {condition}", args)
+
+
+class DocumentCheckpoint:
+    def __init__(self, store, document_hash, settings):
+        """
+        Checkpoint state of one extraction. Without a store the pages are only kept in memory,
+        so processors use the same code path whether checkpointing is enabled or not.
+        """
+        self.store = store
+        self.document_hash = document_hash
+        self.settings = f"v{CACHE_VERSION} {settings}"
+        self.total_pages = None
+        self.pages = {}
+        self.fingerprints = None
+        if store:
+            self.total_pages, self.pages, self.fingerprints = store.load(document_hash, self.settings)
+
+    def missing_pages(self):
+        """
+        Pages (1-based) still to OCR, or None when the page count is not known yet
+        """
+        if self.total_pages is None:
+            return None
+        return [page for page in range(1, self.total_pages + 1) if page not in self.pages]
+
+    def begin(self, total_pages, fingerprints=None):
+        self.total_pages = total_pages
+        self.fingerprints = fingerprints
+        if self.store:
+            self.store.begin(self.document_hash, self.settings, total_pages, fingerprints)
+
+    def save_page(self, page, text, durable=True):
+        """
+        Record a page's text; durable=False keeps it out of the store (e.g. a page that
+        lost engines to a time budget, not worth resuming from)
+        """
+        self.pages[page] = text
+        if self.store and durable:
+            fingerprint = self.fingerprints[page - 1] if self.fingerprints else None
+            self.store.save_page(self.document_hash, self.settings, page, text, fingerprint)
+
+    def pages_to_fingerprint(self, pages=None):
+        """
+        Pages (among pages, default all) not fingerprinted nor extracted yet; None for a
+        new document, meaning all of them. A document begun without fingerprints
+        (fingerprinting failed or was off) is not fingerprinted later.
+        """
+        if self.total_pages is None:
+            return pages
+        if self.fingerprints is None:
+            return []
+        wanted = range(1, self.total_pages + 1) if pages is None else pages
+        return [page for page in wanted
+                if page <= len(self.fingerprints) and self.fingerprints[page - 1] is None and page not in self.pages]
+
+    def reuse_unchanged_pages(self, pdf_path, pages=None):
+        """
+        Fingerprint the pages of a document (only the given 1-based pages, if any) and take
+        the text of pages already extracted (e.g. from an earlier version of the same
+        deck), leaving only new or edited pages missing. Returns the number of pages reused.
+        """
+        from page_fingerprints import fingerprint_pages
+        try:
+            fingerprints = fingerprint_pages(pdf_path, pages=pages)
+        except Exception as e:
+            logger.warning(f"Page fingerprinting failed, extracting every page: {e}")
+            return 0
+
+        if self.fingerprints and len(self.fingerprints) == len(fingerprints):
+            # Keep the fingerprints taken for an earlier subset of the pages
+            fingerprints = [new or old for new, old in zip(fingerprints, self.fingerprints)]
+        self.begin(len(fingerprints), fingerprints)
+        known = self.store.find_pages(self.settings, [fingerprint for fingerprint in fingerprints if fingerprint])
+        reused = 0
+        for page, fingerprint in enumerate(fingerprints, start=1):
+            if fingerprint in known and page not in self.pages:
+                self.save_page(page, known[fingerprint])
+                reused += 1
+        if reused:
+            logger.info(f"{reused} pages unchanged from earlier uploads, "
+                        f"{len(self.missing_pages())}/{len(fingerprints)} pages left to extract")
+        return reused
+
+    def finish(self):
+        """
+        Mark the extraction complete (if no page is missing) and return the document text
+        """
+        if self.store:
+            self.store.finish(self.document_hash, self.settings)
+        return format_pages(self.pages)
+
+
+def resolve_checkpoints(checkpoints):
+    """
+    Turn a processor's checkpoints flag into a CheckpointStore (or None):
+    None reads the environment, True uses the default path under the scratch root,
+    False disables it
+    """
+    if checkpoints is None:
+        return CheckpointStore.from_env()
+    if checkpoints is True:
+        return CheckpointStore()
+    if checkpoints is False:
+        return None
+    return checkpoints
+
+
+def open_checkpoint(store, pdf_path, settings, document_hash=None, fingerprint=True, pages=None):
+    """
+    Checkpoint state for extracting pdf_path with the given settings, hashing the file if
+    needed. Pages about to be extracted are fingerprinted first (unless fingerprint is
+    False) so unchanged pages of an edited re-upload are not extracted again.
+
+    pages: only these sorted 1-based pages are about to be extracted (e.g. a preview
+    sample), so only they are fingerprinted; the rest are when they are extracted
+    """
+    if store and document_hash is None:
+        document_hash = hash_file(pdf_path)
+    checkpoint = DocumentCheckpoint(store, document_hash, settings)
+    to_fingerprint = checkpoint.pages_to_fingerprint(pages) if store and fingerprint else []
+    if to_fingerprint is None or to_fingerprint:
+        checkpoint.reuse_unchanged_pages(pdf_path, to_fingerprint)
+    elif checkpoint.pages:
+        logger.info(f"Resuming document {document_hash[:12]}: {len(checkpoint.pages)}/"
+                    f"{checkpoint.total_pages} pages already extracted")
+    return checkpoint
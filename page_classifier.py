@@ -0,0 +1,125 @@
+import logging
+import subprocess
+import numpy as np
+from image_binarizer import otsu_threshold
+
+logger = logging.getLogger(__name__)
+
+# Pages are classified on a thumbnail of about this many pixels on the long side
+CLASSIFY_SIZE = 600
+
+# Gradient step (in gray levels) that counts as an edge
+EDGE_THRESHOLD = 48
+
+# A text layer with this many words means a typed (born-digital) page
+MIN_TEXT_LAYER_WORDS = 5
+
+# Scans: a gray or speckled background instead of the flat white of rendered pages
+# (spread is the interquartile range of the background pixels, scaled to a std)
+SCAN_BACKGROUND_SPREAD = 1.0
+SCAN_BACKGROUND_MEAN = 240
+# Diagrams and photos: ink in solid areas rather than thin strokes, or few tall ink bands
+DIAGRAM_INK_PER_EDGE = 1.6
+DIAGRAM_MAX_BAND_SHARE = 0.25
+# Handwriting: a large share of diagonal stroke edges
+HANDWRITING_DIAGONAL_SHARE = 0.4
+# Slides and other pages with little text (a full page of body text is 5-10% ink)
+SPARSE_INK = 0.04
+
+# Engines to try per page kind (first available wins; the next one only runs when it
+# fails or finds nothing) and the Tesseract page segmentation mode
+ROUTES = {
+    'clean_text': {'engines': ('tesseract', 'imagemagick_tesseract', 'paddle', 'easy'), 'psm': 6},
+    'sparse_slide': {'engines': ('tesseract', 'imagemagick_tesseract', 'paddle', 'easy'), 'psm': 11},
+    'scan': {'engines': ('paddle', 'imagemagick_tesseract', 'easy', 'tesseract'), 'psm': 6},
+    'handwriting': {'engines': ('paddle', 'easy', 'tesseract', 'imagemagick_tesseract'), 'psm': 6},
+    'diagram': {'engines': ('paddle', 'easy', 'tesseract', 'imagemagick_tesseract'), 'psm': 11},
+}
+
+
+def page_features(image, text_layer=None):
+    """
+    Cheap statistics of a page image: ink density, background level and noise, edge density,
+    share of diagonal edges, ink per edge and the height of the tallest ink band,
+    plus the word count of the page's text layer (None if unknown)
+    """
+    factor = max(1, max(image.size) // CLASSIFY_SIZE)
+    small = image.reduce(factor) if factor > 1 else image
+    gray = np.asarray(small.convert('L'), dtype=np.uint8)
+    threshold = otsu_threshold(gray)
+    ink = gray <= threshold
+    background = gray[~ink]
+
+    signed = gray.astype(np.int16)
+    gx = np.abs(np.diff(signed, axis=1))[:-1, :]
+    gy = np.abs(np.diff(signed, axis=0))[:, :-1]
+    edge_x = gx > EDGE_THRESHOLD
+    edge_y = gy > EDGE_THRESHOLD
+    edges = edge_x | edge_y
+    edge_count = int(edges.sum())
+
+    # Ink bands: runs of rows holding ink, i.e. text lines (short) or figures (tall)
+    rows = ink.mean(axis=1) > 0.002
+    tallest = run = 0
+    for has_ink in rows:
+        run = run + 1 if has_ink else 0
+        tallest = max(tallest, run)
+
+    # Quartiles rather than mean and std: the anti-aliased rims of glyphs are not noise
+    low, median, high = np.percentile(background, (25, 50, 75)) if background.size else (0, 0, 0)
+    ink_share = float(ink.mean())
+    edge_share = edge_count / edges.size
+    return {
+        'ink': ink_share,
+        'background': float(median),
+        'background_spread': float(high - low) / 1.35,
+        'edges': edge_share,
+        'diagonal_edges': float((edge_x & edge_y).sum()) / edge_count if edge_count else 0.0,
+        'ink_per_edge': ink_share / edge_share if edge_share else 0.0,
+        'tallest_band': tallest / len(rows),
+        'text_layer_words': len(text_layer.split()) if text_layer is not None else None,
+    }
+
+
+def classify_features(features):
+    """
+    Page kind from page_features(); see ROUTES for the kinds
+    """
+    if features['ink'] == 0:
+        return 'sparse_slide'
+    sparse = features['ink'] < SPARSE_INK
+    if (features['text_layer_words'] or 0) >= MIN_TEXT_LAYER_WORDS:
+        # Typed page: the text layer says so, whatever the rendering looks like
+        return 'sparse_slide' if sparse else 'clean_text'
+    if features['background_spread'] > SCAN_BACKGROUND_SPREAD or features['background'] < SCAN_BACKGROUND_MEAN:
+        return 'scan'
+    if features['ink_per_edge'] > DIAGRAM_INK_PER_EDGE or features['tallest_band'] > DIAGRAM_MAX_BAND_SHARE:
+        return 'diagram'
+    if features['diagonal_edges'] > HANDWRITING_DIAGONAL_SHARE:
+        return 'handwriting'
+    return 'sparse_slide' if sparse else 'clean_text'
+
+
+def classify_page(image, text_layer=None):
+    """
+    Classify a page image and return (kind, route, features)
+    """
+    features = page_features(image, text_layer)
+    kind = classify_features(features)
+    return kind, ROUTES[kind], features
+
+
+def text_layers(pdf_path, pages=None):
+    """
+    Text layer of the given 1-based pages (default: all), for classification; None when
+    pdftotext is not available or fails
+    """
+    from page_fingerprints import text_layer_pages
+    try:
+        texts = text_layer_pages(pdf_path)
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.debug(f"No text layer for page classification: {e}")
+        return None
+    if pages is None:
+        return texts
+    return [texts[page - 1] if page - 1 < len(texts) else '' for page in pages]
@@ -0,0 +1,60 @@
+import hashlib
+import logging
+import subprocess
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+logger = logging.getLogger(__name__)
+
+# Thumbnails are enough to tell edited pages apart, and render far faster than OCR resolution
+FINGERPRINT_DPI = 50
+
+# Pages rendered per pdf2image call, bounding memory on long documents
+RENDER_BATCH = 50
+
+
+def text_layer_pages(pdf_path):
+    """
+    Text layer of every page via pdftotext (empty strings for scanned pages)
+    """
+    result = subprocess.run(
+        ['pdftotext', '-enc', 'UTF-8', pdf_path, '-'],
+        check=True, capture_output=True
+    )
+    # pdftotext ends every page with a form feed
+    return result.stdout.decode('utf-8', errors='replace').split('\f')[:-1]
+
+
+def fingerprint_pages(pdf_path, dpi=FINGERPRINT_DPI, pages=None):
+    """
+    SHA-256 fingerprint of every page, covering its text layer and a low DPI grayscale
+    render, so edits to either the text or the graphics change the fingerprint
+
+    pages: only render and fingerprint these sorted 1-based pages; the others are None
+    """
+    from page_checkpoints import page_ranges
+    page_count = pdfinfo_from_path(pdf_path)['Pages']
+    try:
+        texts = text_layer_pages(pdf_path)
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.debug(f"No text layer for fingerprints: {e}")
+        texts = []
+    if len(texts) != page_count:
+        texts = [''] * page_count
+
+    fingerprints = [None] * page_count
+    if pages is None:
+        runs = [(1, page_count)] if page_count else []
+    else:
+        runs = page_ranges([page for page in pages if page <= page_count])
+    for run_first, run_last in runs:
+        for first_page in range(run_first, run_last + 1, RENDER_BATCH):
+            last_page = min(first_page + RENDER_BATCH - 1, run_last)
+            thumbnails = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page,
+                                           grayscale=True)
+            for page, thumbnail in enumerate(thumbnails, start=first_page):
+                digest = hashlib.sha256()
+                digest.update(texts[page - 1].encode('utf-8'))
+                digest.update(f"{thumbnail.width}x{thumbnail.height}".encode('ascii'))
+                digest.update(thumbnail.tobytes())
+                fingerprints[page - 1] = digest.hexdigest()
+    return fingerprints
@@ -0,0 +1,150 @@
+import logging
+import os
+import re
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+# Pages OCR'd per document for a preview
+DEFAULT_SAMPLE_SIZE = 16
+
+# Documents with fewer pages are not worth a preview: they are extracted in full right away
+PREVIEW_MIN_PAGES = 40
+
+# Resolution of the thumbnails used to find title pages of scanned documents
+SAMPLE_DPI = 30
+
+# Tables of contents are looked for in the first pages only
+TOC_SEARCH_PAGES = 10
+
+_TOC_HEADING = re.compile(r'^\s*(?:table of contents|contents|outline|agenda|overview)\s*$', re.IGNORECASE | re.MULTILINE)
+# A table of contents line ends with a page number, often after a dot leader
+_TOC_ENTRY = re.compile(r'\S.*?(?:\.{2,}|\s)\s*\d{1,4}\s*$', re.MULTILINE)
+MIN_TOC_ENTRIES = 5
+
+# Section title slides: a heading and little else
+MAX_TITLE_WORDS = 12
+# Scanned title pages carry much less ink than the document's typical page
+MAX_TITLE_INK_RATIO = 0.4
+
+
+def preview_sample_size():
+    """
+    Pages per document sampled in preview mode (STUDY_BUDDY_PREVIEW_PAGES, default 16)
+    """
+    return int(os.getenv('STUDY_BUDDY_PREVIEW_PAGES', DEFAULT_SAMPLE_SIZE))
+
+
+def _spread(items, count):
+    """
+    count items evenly spaced over the list, first and last included
+    """
+    if count <= 0:
+        return []
+    if len(items) <= count:
+        return list(items)
+    if count == 1:
+        return [items[len(items) // 2]]
+    return [items[round(i * (len(items) - 1) / (count - 1))] for i in range(count)]
+
+
+def toc_pages(texts):
+    """
+    1-based pages among the first TOC_SEARCH_PAGES that look like a table of contents
+    """
+    found = []
+    for page, text in enumerate(texts[:TOC_SEARCH_PAGES], start=1):
+        if _TOC_HEADING.search(text) or len(_TOC_ENTRY.findall(text)) >= MIN_TOC_ENTRIES:
+            found.append(page)
+    return found
+
+
+def title_pages(texts, ink=None):
+    """
+    1-based pages that look like section title slides: few words on the text layer, or
+    (for pages without one) far less ink than the document's median page
+    """
+    median_ink = None
+    if ink:
+        inked = sorted(value for value in ink if value > 0)
+        median_ink = inked[len(inked) // 2] if inked else None
+
+    found = []
+    for page, text in enumerate(texts, start=1):
+        words = len(text.split())
+        if words:
+            if words <= MAX_TITLE_WORDS:
+                found.append(page)
+        elif median_ink and 0 < ink[page - 1] < MAX_TITLE_INK_RATIO * median_ink:
+            found.append(page)
+    return found
+
+
+def ink_coverage(pdf_path, page_count, dpi=SAMPLE_DPI, batch=50):
+    """
+    Share of dark pixels on every page, from low resolution grayscale thumbnails
+    """
+    import numpy as np
+    from pdf2image import convert_from_path
+    coverage = []
+    for first_page in range(1, page_count + 1, batch):
+        last_page = min(first_page + batch - 1, page_count)
+        for thumbnail in convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page, grayscale=True):
+            coverage.append(float((np.asarray(thumbnail) < 128).mean()))
+    return coverage
+
+
+def choose_pages(page_count, toc=(), titles=(), sample_size=DEFAULT_SAMPLE_SIZE):
+    """
+    Stratified sample of 1-based pages: the first page and the table of contents, up to a
+    third of the sample in section title pages spread over the document, and evenly
+    spaced content pages for the rest
+    """
+    if page_count <= sample_size:
+        return list(range(1, page_count + 1))
+
+    chosen = {1}
+    chosen.update(list(toc)[:max(1, sample_size // 4)])
+    chosen.update(_spread([page for page in titles if page not in chosen], sample_size // 3))
+
+    title_set = set(titles)
+    content = [page for page in range(1, page_count + 1) if page not in chosen and page not in title_set]
+    chosen.update(_spread(content, sample_size - len(chosen)))
+    if len(chosen) < sample_size:
+        # Mostly title pages: fill up with whatever is left
+        rest = [page for page in range(1, page_count + 1) if page not in chosen]
+        chosen.update(_spread(rest, sample_size - len(chosen)))
+    return sorted(chosen)
+
+
+def sample_pages(pdf_path, sample_size=None):
+    """
+    Pick the pages of a document to OCR for a preview. Returns {'total_pages', 'pages',
+    'toc', 'titles'}; pages is every page for documents shorter than the sample.
+    """
+    from pdf2image import pdfinfo_from_path
+    from page_fingerprints import text_layer_pages
+    sample_size = sample_size or preview_sample_size()
+    page_count = pdfinfo_from_path(pdf_path)['Pages']
+    if page_count <= sample_size:
+        return {'total_pages': page_count, 'pages': list(range(1, page_count + 1)), 'toc': [], 'titles': []}
+
+    try:
+        texts = text_layer_pages(pdf_path)
+    except (OSError, subprocess.CalledProcessError) as e:
+        logger.debug(f"No text layer for page sampling: {e}")
+        texts = []
+    if len(texts) != page_count:
+        texts = [''] * page_count
+
+    ink = None
+    if sum(1 for text in texts if text.strip()) < page_count / 2:
+        # Mostly scanned: judge title pages by ink instead
+        ink = ink_coverage(pdf_path, page_count)
+
+    toc = toc_pages(texts)
+    titles = title_pages(texts, ink)
+    pages = choose_pages(page_count, toc, titles, sample_size)
+    logger.info(f"Preview sample of {pdf_path}: {len(pages)}/{page_count} pages "
+                f"({len(toc)} contents, {len(titles)} title pages found)")
+    return {'total_pages': page_count, 'pages': pages, 'toc': toc, 'titles': titles}
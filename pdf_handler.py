@@ -4,11 +4,30 @@ import os
 import subprocess
 from PIL import Image
 import logging
+from instrumentation import instrumented
+from scratch_space import default_scratch
+from capabilities import capabilities
 
 logger = logging.getLogger(__name__)
 
+# Longest a single ImageMagick rasterization may take before it is killed
+MAGICK_TIMEOUT = 600
+
+
+def _page_ranges(pages):
+    # page_checkpoints pulls in numpy; only needed when converting a subset of pages
+    from page_checkpoints import page_ranges
+    return page_ranges(pages)
+
+
 class PDFHandler:
-    def __init__(self):
+    def __init__(self, adaptive_dpi=False, dpi=300):
+        """
+        adaptive_dpi: pick each page's resolution from a low DPI probe instead of
+        rendering everything at a fixed DPI
+        """
+        self.adaptive_dpi = adaptive_dpi
+        self.dpi = dpi
         self.conversion_methods = []
         
         # Check pdf2image availability
@@ -20,27 +39,39 @@ class PDFHandler:
             logger.warning(f"pdf2image not available: {e}")
         
         # Check ImageMagick availability
-        try:
-            subprocess.run(['magick', '--version'], capture_output=True, check=True)
+        magick = capabilities().tool('magick')
+        if magick['available']:
             self.conversion_methods.append('imagemagick')
             logger.info("ImageMagick is available")
-        except Exception as e:
-            logger.warning(f"ImageMagick not available: {e}")
+        else:
+            logger.warning(f"ImageMagick not available: {magick['error']}")
         
         if not self.conversion_methods:
             raise Exception("No PDF conversion methods available! Please install pdf2image or ImageMagick.")
         
         logger.info(f"Available PDF conversion methods: {', '.join(self.conversion_methods)}")
     
-    def convert_pdf_to_images(self, pdf_path):
+    @instrumented('pdf.convert')
+    def convert_pdf_to_images(self, pdf_path, pages=None):
         """
         Convert PDF pages to images for OCR processing using multiple methods
+        
+        pages: sorted 1-based page numbers to convert (default: all pages)
         """
         # Try pdf2image first (usually faster)
         if 'pdf2image' in self.conversion_methods:
             try:
                 logger.info("Converting PDF using pdf2image...")
-                images = convert_from_path(pdf_path, dpi=300)
+                if self.adaptive_dpi:
+                    # adaptive_dpi needs numpy; only imported when adaptive rendering is used
+                    from adaptive_dpi import convert_pdf_adaptive
+                    images = convert_pdf_adaptive(pdf_path, default_dpi=self.dpi, pages=pages)
+                elif pages is None:
+                    images = convert_from_path(pdf_path, dpi=self.dpi)
+                else:
+                    images = []
+                    for first_page, last_page in _page_ranges(pages):
+                        images.extend(convert_from_path(pdf_path, dpi=self.dpi, first_page=first_page, last_page=last_page))
                 logger.info(f"Successfully converted {len(images)} pages using pdf2image")
                 return images
             except Exception as e:
@@ -50,29 +81,63 @@ class PDFHandler:
         if 'imagemagick' in self.conversion_methods:
             try:
                 logger.info("Converting PDF using ImageMagick...")
-                return self._convert_with_imagemagick(pdf_path)
+                if self.adaptive_dpi:
+                    return self._convert_with_imagemagick_adaptive(pdf_path, pages)
+                images = []
+                for source in self._imagemagick_sources(pdf_path, pages):
+                    images.extend(self._convert_with_imagemagick(source, dpi=self.dpi))
+                return images
             except Exception as e:
                 logger.error(f"ImageMagick conversion failed: {e}")
         
         raise Exception("All PDF conversion methods failed")
     
-    def _convert_with_imagemagick(self, pdf_path):
+    def _imagemagick_sources(self, pdf_path, pages=None):
+        """
+        ImageMagick input specs covering the given 1-based pages (frame ranges are 0-based)
+        """
+        if pages is None:
+            return [pdf_path]
+        return [f"{pdf_path}[{first_page - 1}-{last_page - 1}]" for first_page, last_page in _page_ranges(pages)]
+    
+    def _convert_with_imagemagick_adaptive(self, pdf_path, pages=None):
+        """
+        Convert PDF to images using ImageMagick, choosing each page's DPI from a low DPI probe
+        """
+        from adaptive_dpi import PROBE_DPI, plan_page_dpis
+        probe_images = []
+        for source in self._imagemagick_sources(pdf_path, pages):
+            probe_images.extend(self._convert_with_imagemagick(source, dpi=PROBE_DPI))
+        page_dpis = plan_page_dpis(probe_images, probe_dpi=PROBE_DPI, default_dpi=self.dpi)
+        del probe_images
+        
+        images = []
+        page_indexes = [page - 1 for page in pages] if pages is not None else range(len(page_dpis))
+        for page_index, dpi in zip(page_indexes, page_dpis):
+            images.extend(self._convert_with_imagemagick(f"{pdf_path}[{page_index}]", dpi=dpi))
+        return images
+    
+    def _convert_with_imagemagick(self, pdf_path, dpi=300):
         """
         Convert PDF to images using ImageMagick
         """
-        with tempfile.TemporaryDirectory() as temp_dir:
+        scratch = default_scratch()
+        with scratch.work_dir('pdf') as temp_dir:
             # Convert PDF to images using ImageMagick
             output_pattern = os.path.join(temp_dir, "page_%03d.png")
             
+            # Density must come before the input to set the rasterization resolution
             subprocess.run([
                 'magick',
+                '-density', str(dpi),
                 pdf_path,
-                '-density', '300',
                 '-quality', '100',
                 '-alpha', 'remove',
                 '-colorspace', 'RGB',
                 output_pattern
-            ], check=True, capture_output=True)
+            ], check=True, capture_output=True, timeout=MAGICK_TIMEOUT)
+            # A whole document of page PNGs is the bulk of the scratch area's use
+            scratch.charge(temp_dir)
             
             # Load images
             images = []
@@ -102,8 +167,8 @@ class PDFHandler:
         """
         temp_paths = []
         for i, image in enumerate(images):
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=f'_page_{i}.png')
-            image.save(temp_file.name, 'PNG')
+            with tempfile.NamedTemporaryFile(delete=False, suffix=f'_page_{i}.png', dir=default_scratch().root) as temp_file:
+                image.save(temp_file, 'PNG')
             temp_paths.append(temp_file.name)
         return temp_paths
     
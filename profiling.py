@@ -0,0 +1,154 @@
+import cProfile
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_DIR = 'profiles'
+
+
+def parse_page_spec(spec):
+    """
+    Parse a page selection like "1,3,10-12" into a set of page numbers (None means all pages)
+    """
+    if not spec or spec.strip().lower() == 'all':
+        return None
+    pages = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if '-' in part:
+            first, last = part.split('-', 1)
+            pages.update(range(int(first), int(last) + 1))
+        elif part:
+            pages.add(int(part))
+    return pages
+
+
+class Profiler:
+    def __init__(self, output_dir=DEFAULT_PROFILE_DIR, pages=None, sample_rate=1.0, top_allocations=25):
+        """
+        Opt-in cProfile + tracemalloc sampling for selected pages or requests
+
+        output_dir: where .prof files and allocation reports are written
+        pages: set of page numbers to profile (None profiles every page)
+        sample_rate: fraction of requests/documents to profile
+        top_allocations: number of allocation sites listed per report
+        """
+        self.output_dir = output_dir
+        self.pages = pages
+        self.sample_rate = sample_rate
+        self.top_allocations = top_allocations
+        self._counter = itertools.count(1)
+        # cProfile and tracemalloc are process-wide, so one profiled block at a time
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build a profiler from STUDY_BUDDY_PROFILE_DIR (enables profiling),
+        STUDY_BUDDY_PROFILE_PAGES and STUDY_BUDDY_PROFILE_RATE; None if not enabled
+        """
+        output_dir = os.getenv('STUDY_BUDDY_PROFILE_DIR')
+        if not output_dir:
+            return None
+        return cls(
+            output_dir=output_dir,
+            pages=parse_page_spec(os.getenv('STUDY_BUDDY_PROFILE_PAGES')),
+            sample_rate=float(os.getenv('STUDY_BUDDY_PROFILE_RATE', '1.0')),
+        )
+
+    def sample_request(self):
+        """
+        Decide whether the next request/document is profiled
+        """
+        return random.random() < self.sample_rate
+
+    def wants_page(self, page):
+        return self.pages is None or page in self.pages
+
+    @contextmanager
+    def profile(self, label, page=None, enabled=True):
+        """
+        Profile the enclosed block if it is selected; a no-op otherwise
+        """
+        if not enabled or (page is not None and not self.wants_page(page)) or not self._lock.acquire(blocking=False):
+            yield
+            return
+
+        run_name = f"{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}_{next(self._counter):04d}_{label}"
+        if page is not None:
+            run_name += f"_page{page}"
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(10)
+        start_snapshot = tracemalloc.take_snapshot()
+        profiler = cProfile.Profile()
+        wall_start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - wall_start
+            try:
+                end_snapshot = tracemalloc.take_snapshot()
+                current, peak = tracemalloc.get_traced_memory()
+                self._dump(run_name, profiler, start_snapshot, end_snapshot, peak, elapsed)
+            except Exception as e:
+                logger.warning(f"Could not write profile {run_name}: {e}")
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+                self._lock.release()
+
+    def _dump(self, run_name, profiler, start_snapshot, end_snapshot, peak, elapsed):
+        os.makedirs(self.output_dir, exist_ok=True)
+        profile_path = os.path.join(self.output_dir, f"{run_name}.prof")
+        profiler.dump_stats(profile_path)
+
+        filters = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ]
+        growth = end_snapshot.filter_traces(filters).compare_to(start_snapshot.filter_traces(filters), 'lineno')
+        report_path = os.path.join(self.output_dir, f"{run_name}_allocations.txt")
+        with open(report_path, 'w', encoding='utf-8') as f:
+            f.write(f"{run_name}: {elapsed:.3f}s wall, traced memory peak {peak / 1024 / 1024:.1f} MB\n")
+            f.write(f"Top {self.top_allocations} allocation sites by growth:\n")
+            for stat in growth[:self.top_allocations]:
+                f.write(f"{stat}\n")
+
+        logger.info(f"Profile written to {profile_path}")
+
+
+def resolve_profiler(profile):
+    """
+    Turn a component's profile flag into a Profiler (or None):
+    None reads the environment, True uses the defaults, False disables it
+    """
+    if profile is None:
+        return Profiler.from_env()
+    if profile is True:
+        return Profiler()
+    if profile is False:
+        return None
+    return profile
+
+
+@contextmanager
+def maybe_profile(profiler, label, page=None, enabled=True):
+    """
+    Profile the block with profiler if one is configured
+    """
+    if profiler is None:
+        yield
+    else:
+        with profiler.profile(label, page=page, enabled=enabled):
+            yield
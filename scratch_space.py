@@ -0,0 +1,211 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class ScratchQuotaExceeded(Exception):
+    pass
+
+
+class ScratchSpace:
+    def __init__(self, root, quota_bytes=None):
+        """
+        Scratch area for every temporary artifact of the pipeline (spooled uploads,
+        page images, Tesseract .txt outputs). Work directories are tracked and removed
+        deterministically, and neither spooling nor work directories may grow the area
+        past quota_bytes.
+        """
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.live = set()
+        self._lock = threading.Lock()
+        # Running byte count for the quota: resynced from disk when no spool or work
+        # directory is in flight, and otherwise kept up to date under the lock as
+        # spools write and work directories are charged, so concurrent writers
+        # cannot both fit into the same free space
+        self._used = 0
+        self._spooling = 0
+        # Live work directory -> bytes last charged for it
+        self._work_sizes = {}
+        os.makedirs(root, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Build from STUDY_BUDDY_SCRATCH_DIR (default: <system temp>/study_buddy) and
+        STUDY_BUDDY_SCRATCH_QUOTA_MB (default: no cap)
+        """
+        root = os.getenv('STUDY_BUDDY_SCRATCH_DIR') or os.path.join(tempfile.gettempdir(), 'study_buddy')
+        quota_mb = os.getenv('STUDY_BUDDY_SCRATCH_QUOTA_MB')
+        return cls(root, int(quota_mb) * 1024 * 1024 if quota_mb else None)
+
+    def usage(self):
+        """
+        Bytes currently stored under the scratch root
+        """
+        total = 0
+        for directory, _, files in os.walk(self.root):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(directory, name))
+                except OSError:
+                    pass  # Removed while walking
+        return total
+
+    def _resync(self):
+        """
+        Recount the usage from disk if nothing is in flight (call with the lock held)
+        """
+        if not self._spooling and not self.live:
+            # Picks up files written or removed behind the running count
+            self._used = self.usage()
+
+    def _full(self, action):
+        return ScratchQuotaExceeded(
+            f"Scratch space full while {action}: {self._used / 1024 / 1024:.0f} MB used "
+            f"of {self.quota_bytes / 1024 / 1024:.0f} MB"
+        )
+
+    def _reserve(self, size, name):
+        """
+        Count size more bytes against the quota, or raise ScratchQuotaExceeded
+        """
+        with self._lock:
+            if self._used + size > self.quota_bytes:
+                raise self._full(f"spooling {name}")
+            self._used += size
+
+    @contextmanager
+    def work_dir(self, prefix='work'):
+        """
+        A tracked work directory that is removed when the block exits, even on errors.
+        With a quota, none is created once the area is full, and what is written to it
+        counts once charged (see charge).
+        """
+        path = os.path.join(self.root, f"{prefix}_{uuid.uuid4().hex}")
+        with self._lock:
+            if self.quota_bytes is not None:
+                self._resync()
+                if self._used >= self.quota_bytes:
+                    raise self._full(f"creating a {prefix} work directory")
+            os.makedirs(path)
+            self.live.add(path)
+        try:
+            yield path
+        finally:
+            shutil.rmtree(path, ignore_errors=True)
+            with self._lock:
+                self.live.discard(path)
+                self._used -= self._work_sizes.pop(path, 0)
+
+    def charge(self, path):
+        """
+        Count the current size of a live work directory against the quota, after a
+        large write into it (e.g. a rasterized document); raises ScratchQuotaExceeded
+        when the area is over quota, and the work_dir block then removes the files
+        """
+        if self.quota_bytes is None:
+            return
+        size = 0
+        for directory, _, files in os.walk(path):
+            for name in files:
+                try:
+                    size += os.path.getsize(os.path.join(directory, name))
+                except OSError:
+                    pass
+        with self._lock:
+            if path not in self.live:
+                return
+            self._used += size - self._work_sizes.get(path, 0)
+            self._work_sizes[path] = size
+            if self._used > self.quota_bytes:
+                raise self._full(f"writing to {os.path.basename(path)}")
+
+    def spool(self, source, destination, chunk_size=CHUNK_SIZE):
+        """
+        Copy a file object (or bytes) to destination in fixed-size chunks, reserving
+        every chunk against the quota before writing it. Returns (bytes_written, sha256).
+        A partial file is removed (and its bytes released) on failure.
+        """
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            data = memoryview(source)
+            chunks = (data[offset:offset + chunk_size] for offset in range(0, len(data), chunk_size))
+        else:
+            chunks = iter(lambda: source.read(chunk_size), b'')
+
+        quota = self.quota_bytes is not None
+        if quota:
+            with self._lock:
+                self._resync()
+                self._spooling += 1
+
+        digest = hashlib.sha256()
+        written = 0
+        try:
+            with open(destination, 'wb') as f:
+                for chunk in chunks:
+                    if quota:
+                        self._reserve(len(chunk), os.path.basename(destination))
+                    written += len(chunk)
+                    digest.update(chunk)
+                    f.write(chunk)
+        except BaseException:
+            if os.path.exists(destination):
+                os.unlink(destination)
+            if quota:
+                with self._lock:
+                    self._used -= written
+            raise
+        finally:
+            if quota:
+                with self._lock:
+                    self._spooling -= 1
+        return written, digest.hexdigest()
+
+    def purge_stale(self, max_age_seconds=6 * 3600):
+        """
+        Remove work directories left behind by crashed processes. Returns the number removed.
+        """
+        removed = 0
+        cutoff = time.time() - max_age_seconds
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not (os.path.isdir(path) and name.startswith(('work_', 'ocr_', 'pdf_', 'tesseract_'))):
+                continue
+            with self._lock:
+                if path in self.live:
+                    continue
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+                    removed += 1
+            except OSError:
+                pass
+        if removed:
+            logger.info(f"Removed {removed} stale scratch directories from {self.root}")
+        return removed
+
+
+_default_scratch = None
+_default_lock = threading.Lock()
+
+
+def default_scratch():
+    """
+    The process-wide scratch space configured from the environment
+    """
+    global _default_scratch
+    with _default_lock:
+        if _default_scratch is None:
+            _default_scratch = ScratchSpace.from_env()
+        return _default_scratch
@@ -1,65 +1,85 @@
 import os
 import subprocess
-import tempfile
 import logging
 from PIL import Image
+from image_binarizer import binarize, save_for_tesseract, log_handoff_stats
+from scratch_space import default_scratch
+from page_checkpoints import resolve_checkpoints, open_checkpoint, page_ranges
+from ocr_results import format_pages
+from capabilities import capabilities
+from pdf_handler import MAGICK_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
 class SimpleOCRProcessor:
-    def __init__(self):
+    def __init__(self, binarization=None, handoff_format='png', checkpoints=None):
         """
         Simple, reliable OCR processor using ImageMagick + Tesseract
+        
+        binarization: optional 'otsu' or 'sauvola' to hand Tesseract 1-bit pages
+        handoff_format: temp file format for Tesseract ('png', 'pnm' or 'tiff_g4')
+        checkpoints: CheckpointStore, True or False; None uses STUDY_BUDDY_CHECKPOINT_DB
         """
-        # Verify ImageMagick is available
-        try:
-            result = subprocess.run(['magick', '--version'], capture_output=True, text=True)
-            if result.returncode != 0:
-                raise Exception("ImageMagick command failed")
-            logger.info("ImageMagick is available")
-        except Exception as e:
-            raise Exception(f"ImageMagick not available: {e}")
+        self.checkpoints = resolve_checkpoints(checkpoints)
+        self.binarization = binarization
+        self.handoff_format = handoff_format
+        self.handoff_stats = []
         
-        # Verify Tesseract is available
-        try:
-            result = subprocess.run(['tesseract', '--version'], capture_output=True, text=True)
-            if result.returncode != 0:
-                raise Exception("Tesseract command failed")
-            logger.info("Tesseract is available")
-        except Exception as e:
-            raise Exception(f"Tesseract not available: {e}")
+        # Verify ImageMagick and Tesseract are available (probed once per process)
+        capabilities().require_tool('magick', 'ImageMagick')
+        logger.info("ImageMagick is available")
+        capabilities().require_tool('tesseract', 'Tesseract')
+        logger.info("Tesseract is available")
     
-    def extract_text_from_pdf(self, pdf_path):
+    def extract_text_from_pdf(self, pdf_path, progress_callback=None, document_hash=None, pages=None):
         """
         Extract text from PDF using ImageMagick + Tesseract method
+        
+        progress_callback: optional callable(pages_done, total_pages), called once
+        the PDF is rasterized and after each page
+        document_hash: SHA-256 of the PDF if already known (used for checkpoints)
+        pages: only extract (and return the text of) these 1-based pages, e.g. a preview
+        sample; they are checkpointed like any other, so the full extraction skips them
+        
+        Every page is checkpointed, so a restarted extraction only converts and
+        OCRs the pages missing from an earlier attempt. Pages whose fingerprint matches a page
+        extracted before (e.g. an edited re-upload) are reused as well.
         """
         logger.info(f"Processing PDF: {pdf_path}")
         
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with default_scratch().work_dir('ocr') as temp_dir:
             try:
+                checkpoint = open_checkpoint(self.checkpoints, pdf_path, 'simple', document_hash, pages=pages)
+                requested = pages
+                if requested is not None and checkpoint.total_pages is None:
+                    from pdf2image import pdfinfo_from_path
+                    checkpoint.begin(pdfinfo_from_path(pdf_path)['Pages'])
+                missing = checkpoint.missing_pages()
+                if requested is not None:
+                    missing = [page for page in requested if page in missing]
+                
                 # Convert PDF to images using ImageMagick (process in smaller batches)
                 logger.info("Converting PDF to images...")
-                image_pattern = os.path.join(temp_dir, "page_%03d.png")
+                page_images = self._convert_pages(pdf_path, temp_dir, missing)
+                if checkpoint.total_pages is None:
+                    checkpoint.begin(len(page_images))
+                logger.info(f"Generated {len(page_images)} images")
                 
-                # Convert with the exact same method that worked in terminal
-                subprocess.run([
-                    'magick',
-                    pdf_path,
-                    image_pattern
-                ], check=True, capture_output=True)
-                
-                # Find all generated images
-                image_files = sorted([f for f in os.listdir(temp_dir) if f.endswith('.png')])
-                logger.info(f"Generated {len(image_files)} images")
+                def report_progress():
+                    if not progress_callback:
+                        return
+                    if requested is None:
+                        progress_callback(len(checkpoint.pages), checkpoint.total_pages)
+                    else:
+                        progress_callback(sum(page in checkpoint.pages for page in requested), len(requested))
+                report_progress()
                 
                 # Extract text from each image
-                all_text = []
-                for i, image_file in enumerate(image_files):
+                for page, image_path in page_images:
                     try:
-                        image_path = os.path.join(temp_dir, image_file)
-                        text_file = os.path.join(temp_dir, f"page_{i:03d}_text")
+                        text_file = os.path.join(temp_dir, f"page_{page:03d}_text")
                         
-                        logger.info(f"Processing page {i+1}/{len(image_files)}")
+                        logger.info(f"Processing page {page}/{checkpoint.total_pages}")
                         
                         # Run Tesseract with optimized settings
                         subprocess.run([
@@ -71,16 +91,17 @@ class SimpleOCRProcessor:
                         
                         # Read extracted text
                         with open(f"{text_file}.txt", 'r', encoding='utf-8') as f:
-                            page_text = f.read().strip()
-                        
-                        if page_text:
-                            all_text.append(f"--- Page {i + 1} ---\n{page_text}\n")
+                            checkpoint.save_page(page, f.read().strip())
                         
                     except Exception as e:
-                        logger.warning(f"Failed to process page {i+1}: {e}")
+                        logger.warning(f"Failed to process page {page}: {e}")
                         continue
+                    finally:
+                        report_progress()
                 
-                result_text = "\n".join(all_text)
+                if requested is not None:
+                    return format_pages({page: checkpoint.pages[page] for page in requested if page in checkpoint.pages})
+                result_text = checkpoint.finish()
                 logger.info(f"Extracted {len(result_text)} characters total")
                 return result_text
                 
@@ -91,20 +112,58 @@ class SimpleOCRProcessor:
                 logger.error(f"OCR processing error: {e}")
                 raise Exception(f"OCR processing failed: {e}")
     
-    def extract_text_from_images(self, images):
+    def _convert_pages(self, pdf_path, temp_dir, pages=None):
+        """
+        Convert the given 1-based pages (default: all) to PNGs in temp_dir with ImageMagick.
+        Returns [(page, image_path)].
+        """
+        if pages is None:
+            # Convert with the exact same method that worked in terminal
+            subprocess.run([
+                'magick',
+                pdf_path,
+                os.path.join(temp_dir, "page_%03d.png")
+            ], check=True, capture_output=True, timeout=MAGICK_TIMEOUT)
+            default_scratch().charge(temp_dir)
+            image_files = sorted(f for f in os.listdir(temp_dir) if f.endswith('.png'))
+            return [(i + 1, os.path.join(temp_dir, f)) for i, f in enumerate(image_files)]
+        
+        page_images = []
+        for first_page, last_page in page_ranges(pages):
+            # ImageMagick frame indexes are 0-based
+            prefix = f"range_{first_page:04d}_"
+            subprocess.run([
+                'magick',
+                f"{pdf_path}[{first_page - 1}-{last_page - 1}]",
+                os.path.join(temp_dir, f"{prefix}%03d.png")
+            ], check=True, capture_output=True, timeout=MAGICK_TIMEOUT)
+            default_scratch().charge(temp_dir)
+            image_files = sorted(f for f in os.listdir(temp_dir) if f.startswith(prefix))
+            page_images.extend((first_page + i, os.path.join(temp_dir, f)) for i, f in enumerate(image_files))
+        return page_images
+    
+    def extract_text_from_images(self, images, progress_callback=None):
         """
         Extract text from a list of PIL images
+        
+        progress_callback: optional callable(pages_done, total_pages), called after each page
         """
         all_text = []
+        self.handoff_stats = []
         
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with default_scratch().work_dir('ocr') as temp_dir:
             for i, image in enumerate(images):
                 try:
-                    # Save image temporarily
-                    image_path = os.path.join(temp_dir, f"page_{i:03d}.png")
-                    if image.mode != 'RGB':
+                    if self.binarization:
+                        image = binarize(image, self.binarization)
+                    elif image.mode != 'RGB':
                         image = image.convert('RGB')
-                    image.save(image_path, 'PNG')
+                    
+                    # Save image temporarily
+                    image_path, encode_seconds, size = save_for_tesseract(
+                        image, os.path.join(temp_dir, f"page_{i:03d}"), self.handoff_format
+                    )
+                    self.handoff_stats.append({'page': i + 1, 'encode_seconds': encode_seconds, 'bytes': size})
                     
                     # Extract text directly with Tesseract (no preprocessing)
                     text_file = os.path.join(temp_dir, f"page_{i:03d}_text")
@@ -123,7 +182,11 @@ class SimpleOCRProcessor:
                 except Exception as e:
                     logger.warning(f"Failed to process image {i+1}: {e}")
                     continue
+                finally:
+                    if progress_callback:
+                        progress_callback(i + 1, len(images))
         
+        log_handoff_stats(self.handoff_stats, f"Tesseract handoff ({self.handoff_format})")
         return "\n".join(all_text)
     
     def validate_setup(self):
@@ -131,11 +194,8 @@ class SimpleOCRProcessor:
         Validate that the OCR system is working
         """
         try:
-            # Test ImageMagick
-            subprocess.run(['magick', '--version'], capture_output=True, check=True)
-            
-            # Test Tesseract  
-            subprocess.run(['tesseract', '--version'], capture_output=True, check=True)
+            capabilities().require_tool('magick', 'ImageMagick')
+            capabilities().require_tool('tesseract', 'Tesseract')
             
             logger.info("Simple OCR processor validated successfully")
             return True
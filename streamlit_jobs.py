@@ -0,0 +1,180 @@
+import os
+import time
+import streamlit as st
+from job_queue import JobQueue, ACTIVE_STATUSES
+from study_pipeline import STUDY_JOB, run_study_job, study_job_key
+from upload_cache import hash_bytes
+from scratch_space import default_scratch
+from ocr_worker_pool import start_ocr_pool
+
+
+@st.cache_resource
+def get_job_queue():
+    """
+    One job queue per server process, shared by every session
+    """
+    queue = JobQueue(
+        db_path=os.getenv('STUDY_BUDDY_JOB_DB', 'jobs.db'),
+        # Spooled uploads live in the scratch area so they count towards its quota
+        job_dir=os.getenv('STUDY_BUDDY_JOB_DIR') or os.path.join(default_scratch().root, 'jobs'),
+        workers=int(os.getenv('STUDY_BUDDY_JOB_WORKERS', '2')),
+    )
+    queue.register(STUDY_JOB, run_study_job)
+    queue.resume()
+
+    # Work directories left behind by a crashed or killed server
+    default_scratch().purge_stale()
+    return queue
+
+
+@st.cache_resource
+def get_ocr_pool():
+    """
+    OCR worker processes for the multi-engine pipeline, started (and warming up) with
+    the first page load of the server; None when STUDY_BUDDY_OCR_WORKERS is 0
+    """
+    return start_ocr_pool()
+
+
+def current_job_id():
+    """
+    The job this browser session is following; kept in the URL as well so a
+    reconnect or page reload reattaches to it
+    """
+    job_id = st.session_state.get('job_id') or st.query_params.get('job')
+    if job_id:
+        st.session_state['job_id'] = job_id
+    return job_id
+
+
+def remember_job(job_id):
+    st.session_state['job_id'] = job_id
+    st.query_params['job'] = job_id
+
+
+def forget_job():
+    st.session_state.pop('job_id', None)
+    if 'job' in st.query_params:
+        del st.query_params['job']
+
+
+def upload_hash(uploaded_file):
+    """
+    SHA-256 of an uploaded file, computed once per upload and remembered in the session
+    """
+    hashes = st.session_state.setdefault('upload_hashes', {})
+    upload_id = getattr(uploaded_file, 'file_id', None) or (uploaded_file.name, uploaded_file.size)
+    if upload_id not in hashes:
+        hashes[upload_id] = hash_bytes(uploaded_file.getbuffer())
+    return hashes[upload_id]
+
+
+def study_cache_key(engine, lecture_notes, past_exams):
+    """
+    Cache key of a study materials run: every upload (in order) plus the settings affecting the output
+    """
+    return study_job_key(
+        engine,
+        [upload_hash(upload) for upload in lecture_notes],
+        [upload_hash(upload) for upload in past_exams],
+    )
+
+
+def submit_study_job(engine, lecture_notes, past_exams):
+    """
+    Follow the study materials job for the uploaded PDFs (lists of uploads): reuse a
+    finished or running job for the same files and settings, otherwise queue a new one
+    """
+    queue = get_job_queue()
+    cache_key = study_cache_key(engine, lecture_notes, past_exams)
+
+    existing = queue.find_job(STUDY_JOB, cache_key)
+    if existing:
+        remember_job(existing['id'])
+        return existing['id']
+
+    files = {}
+    documents = {}
+    for role, uploads in (('lecture', lecture_notes), ('exam', past_exams)):
+        documents[role] = []
+        for i, upload in enumerate(uploads):
+            file_name = f"{role}_{i:03d}.pdf"
+            upload.seek(0)
+            files[file_name] = upload
+            documents[role].append({'name': upload.name, 'file': file_name, 'hash': upload_hash(upload)})
+
+    job_id = queue.submit(
+        STUDY_JOB,
+        {'engine': engine, 'documents': documents},
+        files=files,
+        cache_key=cache_key,
+    )
+    remember_job(job_id)
+    return job_id
+
+
+def invalidate_stale_job(engine, lecture_notes, past_exams):
+    """
+    Stop showing the followed job's results once the uploads or settings no longer match it
+    """
+    job_id = current_job_id()
+    if not (job_id and lecture_notes and past_exams):
+        return
+    job = st.session_state.get('finished_jobs', {}).get(job_id) or get_job_queue().get(job_id)
+    if job and job['cache_key'] and job['cache_key'] != study_cache_key(engine, lecture_notes, past_exams):
+        forget_job()
+
+
+def render_preview(preview):
+    """
+    Preliminary areas of concentration of a running job, from its sampled pages
+    """
+    sampled = sum(len(document['pages']) for document in preview['sampled_pages'].values())
+    total = sum(document['total_pages'] for document in preview['sampled_pages'].values())
+    st.subheader("🎯 Preliminary Areas of Concentration")
+    st.caption(f"Based on {sampled} of {total} pages - refined once every page has been read.")
+    for area in preview['areas_of_concentration']:
+        st.write(f"• {area}")
+
+
+def render_current_job(display_results, poll_interval=1.0):
+    """
+    Show the followed job: progress while it runs (polling by rerunning the
+    script), the results when it is done, the error if it failed
+    """
+    job_id = current_job_id()
+    if not job_id:
+        return
+
+    # Finished results are kept in the session so reruns don't touch the job table
+    finished = st.session_state.setdefault('finished_jobs', {})
+    job = finished.get(job_id) or get_job_queue().get(job_id)
+    if job is None:
+        forget_job()
+        return
+    if job['status'] == 'done':
+        finished.clear()
+        finished[job_id] = job
+
+    if job['status'] in ACTIVE_STATUSES:
+        st.progress(job['progress'])
+        st.text(job['message'] or "Processing...")
+        if job.get('preview'):
+            render_preview(job['preview'])
+        st.caption("You can leave this page open or come back later - the job keeps running.")
+        time.sleep(poll_interval)
+        st.rerun()
+    elif job['status'] == 'done':
+        result = job['result']
+        st.info(f"✅ Extracted {result['lecture_characters']} characters from "
+                f"{result.get('lecture_documents', 1)} lecture notes file(s) and {result['exam_characters']} "
+                f"from {result.get('exam_documents', 1)} exam questions file(s)")
+        if result.get('degraded_pages'):
+            pages = sum(len(reports) for reports in result['degraded_pages'].values())
+            st.caption(f"⏱️ {pages} page(s) were OCR'd with fewer engines (time budget, timeouts or engine errors).")
+        if result['study_materials'] is None:
+            st.warning("Only text was extracted: set GEMINI_API_KEY to generate study materials.")
+        else:
+            display_results(result['study_materials'])
+    else:
+        st.error(f"An error occurred: {job['error']}")
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Headless entry point: PDF -> text -> study materials without Streamlit.
+
+Batch mode processes a directory of courses. Each subdirectory (or the
+directory itself if it holds PDFs) is one course; PDFs with "exam" in their
+name are past exam papers, the rest are lecture notes. One JSON result per
+course is written to the output directory. Jobs live in a SQLite queue in the
+output directory, so rerunning the same command after a crash or restart
+resumes unfinished courses and skips finished ones.
+
+    python study_buddy_batch.py run catalog/ --output results/ --engine tesseract --concurrency 4
+    python study_buddy_batch.py serve --port 8765
+
+Without GEMINI_API_KEY (or with --text-only) only the PDF-to-text stage runs
+and the results contain the extracted text.
+
+HTTP API (serve):
+    POST /jobs       {"lecture": [paths], "exam": [paths], "engine": "tesseract", "text_only": false}
+    GET  /jobs       recent jobs
+    GET  /jobs/<id>  job status and result
+    GET  /documents/<sha256>  pages extracted so far (page checkpoints)
+    GET  /health     readiness of the OCR worker pool (503 while it warms up)
+
+With --ocr-workers N, serve starts N OCR worker processes for the multi_engine
+pipeline before accepting requests; they load and warm up every engine once.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from dotenv import load_dotenv
+from instrumentation import health
+from job_queue import JobQueue, ACTIVE_STATUSES
+from ocr_worker_pool import start_ocr_pool
+from page_checkpoints import CheckpointStore
+from study_pipeline import OCR_ENGINES, STUDY_JOB, run_study_job, study_job_key, text_only_mode
+from upload_cache import hash_file
+
+logger = logging.getLogger(__name__)
+
+
+def find_courses(input_dir):
+    """
+    Return {course_name: {'lecture': [paths], 'exam': [paths]}} for a catalog directory
+    """
+    def classify(directory):
+        roles = {'lecture': [], 'exam': []}
+        for name in sorted(os.listdir(directory)):
+            path = os.path.join(directory, name)
+            if os.path.isfile(path) and name.lower().endswith('.pdf'):
+                roles['exam' if 'exam' in name.lower() else 'lecture'].append(path)
+        return roles
+
+    courses = {}
+    top_level = classify(input_dir)
+    if top_level['lecture'] or top_level['exam']:
+        courses[os.path.basename(os.path.abspath(input_dir))] = top_level
+    for name in sorted(os.listdir(input_dir)):
+        path = os.path.join(input_dir, name)
+        if os.path.isdir(path):
+            roles = classify(path)
+            if roles['lecture'] or roles['exam']:
+                courses[name] = roles
+    return courses
+
+
+def study_job_params(engine, lecture_paths, exam_paths, text_only=False):
+    """
+    Job params and cache key for PDFs already on disk (used in place, not copied)
+    """
+    # Text-only results must not be reused once an API key is configured
+    text_only = text_only_mode({'text_only': text_only})
+    files = {}
+    documents = {}
+    hashes = {}
+    for role, paths in (('lecture', lecture_paths), ('exam', exam_paths)):
+        documents[role] = []
+        hashes[role] = []
+        for i, path in enumerate(paths):
+            file_name = f"{role}_{i:03d}.pdf"
+            document_hash = hash_file(path)
+            files[file_name] = os.path.abspath(path)
+            documents[role].append({'name': os.path.basename(path), 'file': file_name, 'hash': document_hash})
+            hashes[role].append(document_hash)
+
+    params = {
+        'engine': engine,
+        'files': files,
+        'documents': documents,
+        'text_only': text_only,
+        'include_text': True,
+    }
+    return params, study_job_key(engine, hashes['lecture'], hashes['exam'], text_only)
+
+
+def submit_or_reuse(queue, params, cache_key):
+    """
+    Id of a finished or running job with the same inputs and settings, else of a new job
+    """
+    existing = queue.find_job(STUDY_JOB, cache_key)
+    if existing:
+        return existing['id']
+    return queue.submit(STUDY_JOB, params, cache_key=cache_key)
+
+
+def create_queue(state_dir, concurrency):
+    os.makedirs(state_dir, exist_ok=True)
+    queue = JobQueue(
+        db_path=os.path.join(state_dir, 'jobs.db'),
+        job_dir=os.path.join(state_dir, 'job_files'),
+        workers=concurrency,
+    )
+    queue.register(STUDY_JOB, run_study_job)
+    queue.resume()
+    return queue
+
+
+def run_batch(input_dir, output_dir, engine='tesseract', concurrency=2, text_only=False, poll_interval=2.0):
+    """
+    Process every course in input_dir, writing <output_dir>/<course>.json. Returns the
+    number of courses that failed.
+    """
+    courses = find_courses(input_dir)
+    if not courses:
+        print(f"❌ No PDFs found in {input_dir}")
+        return 0
+
+    queue = create_queue(output_dir, concurrency)
+    pending = {}
+    for course, roles in courses.items():
+        if not (roles['lecture'] and roles['exam']):
+            print(f"⚠️  Skipping {course}: needs both lecture notes and exam PDFs")
+            continue
+        params, cache_key = study_job_params(engine, roles['lecture'], roles['exam'], text_only)
+        output_path = os.path.join(output_dir, f"{course}.json")
+        if os.path.exists(output_path):
+            with open(output_path, 'r', encoding='utf-8') as f:
+                if json.load(f).get('cache_key') == cache_key:
+                    print(f"✅ {course}: already done")
+                    continue
+        pending[course] = (submit_or_reuse(queue, params, cache_key), output_path)
+
+    print(f"🔄 Processing {len(pending)} courses with {concurrency} workers...")
+    failed = 0
+    while pending:
+        for course, (job_id, output_path) in list(pending.items()):
+            job = queue.get(job_id)
+            if job['status'] in ACTIVE_STATUSES:
+                continue
+            del pending[course]
+            if job['status'] == 'failed':
+                failed += 1
+                print(f"❌ {course}: {job['error']}")
+                continue
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump({'course': course, 'cache_key': job['cache_key'], **job['result']}, f, indent=2)
+            print(f"✅ {course}: {output_path}")
+        if pending:
+            time.sleep(poll_interval)
+    return failed
+
+
+class _APIHandler(BaseHTTPRequestHandler):
+    queue = None
+    checkpoints = None
+    default_engine = 'tesseract'
+
+    def do_GET(self):
+        if self.path == '/health':
+            status = health()
+            self._send_json(200 if status['ready'] else 503, status)
+        elif self.path == '/jobs':
+            self._send_json(200, self.queue.list_jobs())
+        elif self.path.startswith('/jobs/'):
+            job = self.queue.get(self.path[len('/jobs/'):])
+            if job is None:
+                self._send_json(404, {'error': 'Unknown job'})
+            else:
+                self._send_json(200, job)
+        elif self.path.startswith('/documents/') and self.checkpoints:
+            self._send_json(200, self.checkpoints.partial_results(self.path[len('/documents/'):]))
+        else:
+            self._send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        if self.path != '/jobs':
+            self._send_json(404, {'error': 'Not found'})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            engine = request.get('engine', self.default_engine)
+            if engine not in OCR_ENGINES:
+                raise ValueError(f"Unknown OCR engine: {engine}")
+            if not (request.get('lecture') and request.get('exam')):
+                raise ValueError("Both 'lecture' and 'exam' PDF paths are required")
+            params, cache_key = study_job_params(
+                engine, request['lecture'], request['exam'], bool(request.get('text_only'))
+            )
+        except (ValueError, OSError) as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        job_id = submit_or_reuse(self.queue, params, cache_key)
+        self._send_json(202, {'id': job_id, 'text_only': text_only_mode(params)})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info(format % args)
+
+
+def serve(state_dir, host='127.0.0.1', port=8765, engine='tesseract', concurrency=2, ocr_workers=0):
+    """
+    Serve the job API until interrupted
+    """
+    if ocr_workers:
+        # Engines load in the background while the server starts; /health tells when they are ready
+        start_ocr_pool(ocr_workers)
+    handler = type('APIHandler', (_APIHandler,), {
+        'queue': create_queue(state_dir, concurrency),
+        'checkpoints': CheckpointStore.from_env(),
+        'default_engine': engine,
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"🚀 Study Buddy API listening on http://{host}:{port}/jobs")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main():
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subcommands = parser.add_subparsers(dest='command', required=True)
+
+    run = subcommands.add_parser('run', help="Process a directory of courses")
+    run.add_argument('input_dir')
+    run.add_argument('--output', default='batch_results', help="Results and job state directory")
+
+    api = subcommands.add_parser('serve', help="Run the local HTTP API")
+    api.add_argument('--state-dir', default='batch_results', help="Job state directory")
+    api.add_argument('--host', default='127.0.0.1')
+    api.add_argument('--port', type=int, default=8765)
+    api.add_argument('--ocr-workers', type=int, default=0,
+                     help="OCR worker processes to start and warm up for the multi_engine pipeline")
+
+    for subcommand in (run, api):
+        subcommand.add_argument('--engine', default='tesseract', choices=OCR_ENGINES)
+        subcommand.add_argument('--concurrency', type=int, default=2, help="Courses processed at once")
+    run.add_argument('--text-only', action='store_true', help="Only extract text, even with an API key")
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        serve(args.state_dir, args.host, args.port, args.engine, args.concurrency, args.ocr_workers)
+        return
+
+    if text_only_mode({'text_only': args.text_only}):
+        print("ℹ️  Text-only mode: study materials will not be generated")
+    failed = run_batch(args.input_dir, args.output, args.engine, args.concurrency, args.text_only)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
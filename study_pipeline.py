@@ -0,0 +1,490 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from upload_cache import TextCache, make_cache_key
+
+logger = logging.getLogger(__name__)
+
+# OCR pipelines, matching the three Streamlit apps
+OCR_ENGINES = ('multi_engine', 'tesseract', 'simple')
+
+# Job kind of run_study_job in the job queue
+STUDY_JOB = 'study_materials'
+
+# Processors are expensive to create and not safe to share between threads,
+# so every worker thread keeps its own
+_thread_local = threading.local()
+
+# Extracted text shared by all workers, keyed by document hash and engine
+text_cache = TextCache()
+
+# Documents are extracted concurrently on one pool shared by all jobs, so a
+# batch of uploads is limited by the number of cores rather than the number of files
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+# Without an OCR worker pool the multi-engine pipeline shares a few in-process
+# OCRProcessors between the extraction threads: each one holds a full set of models
+_ocr_processors = []
+_ocr_processor_slots = None
+_ocr_processor_lock = threading.Lock()
+
+
+def extraction_workers():
+    """
+    Size of the extraction pool: STUDY_BUDDY_EXTRACT_WORKERS (default: one worker per core).
+    Multi-engine OCR without a worker pool is further limited by ocr_processor_limit.
+    """
+    return int(os.getenv('STUDY_BUDDY_EXTRACT_WORKERS') or os.cpu_count() or 1)
+
+
+def extraction_pool():
+    """
+    The shared document extraction pool (see extraction_workers)
+    """
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            _extraction_pool = ThreadPoolExecutor(max_workers=extraction_workers(), thread_name_prefix='extract-worker')
+        return _extraction_pool
+
+
+def ocr_processor_limit():
+    """
+    In-process multi-engine processors allowed at once: as many as ocr_worker_pool's
+    default_workers fits in the cores and memory, and no more than the extraction threads
+    """
+    from ocr_worker_pool import default_workers
+    return max(1, min(extraction_workers(), default_workers()))
+
+
+@contextmanager
+def borrow_ocr_processor():
+    """
+    An idle in-process OCRProcessor for the duration of the block, waiting while all
+    ocr_processor_limit() of them are busy; created on first use, kept afterwards
+    """
+    global _ocr_processor_slots
+    with _ocr_processor_lock:
+        if _ocr_processor_slots is None:
+            limit = ocr_processor_limit()
+            _ocr_processor_slots = (threading.BoundedSemaphore(limit), limit)
+    slots, limit = _ocr_processor_slots
+    with slots:
+        with _ocr_processor_lock:
+            processor = _ocr_processors.pop() if _ocr_processors else None
+        if processor is None:
+            from ocr_processor import OCRProcessor
+            from cpu_budget import CPUBudget
+            # Split the cores between the processors so their native thread pools
+            # do not oversubscribe the machine
+            processor = OCRProcessor(cpu_budget=CPUBudget(limit))
+        try:
+            yield processor
+        finally:
+            with _ocr_processor_lock:
+                _ocr_processors.append(processor)
+
+
+def get_component(name, factory):
+    """
+    Return this thread's instance of a processor, creating it on first use
+    """
+    components = getattr(_thread_local, 'components', None)
+    if components is None:
+        components = _thread_local.components = {}
+    if name not in components:
+        components[name] = factory()
+    return components[name]
+
+
+def _multi_engine_settings():
+    """
+    Checkpoint key of the multi-engine pipeline: the installed engines and the options
+    every OCRProcessor reads from the environment
+    """
+    from capabilities import capabilities
+    routing = os.getenv('STUDY_BUDDY_PAGE_ROUTING', '1') != '0'
+    text_regions = os.getenv('STUDY_BUDDY_TEXT_REGIONS', '1') != '0'
+    return f"multi_engine engines={','.join(capabilities().ocr_engines())} routing={routing} text_regions={text_regions}"
+
+
+def _extract_multi_engine(pdf_path, progress_callback, document_hash=None, report=None, pages=None):
+    """
+    Every page is checkpointed as soon as it is OCR'd, like in the other pipelines, so
+    an interrupted extraction resumes at the first missing page and the pages of a
+    preview sample are not OCR'd again by the full extraction
+    """
+    from page_checkpoints import CheckpointStore, open_checkpoint
+    from ocr_results import format_pages
+    store = get_component('checkpoints', CheckpointStore.from_env)
+    checkpoint = open_checkpoint(store, pdf_path, _multi_engine_settings(), document_hash, pages=pages)
+    if checkpoint.total_pages is None:
+        from pdf2image import pdfinfo_from_path
+        checkpoint.begin(pdfinfo_from_path(pdf_path)['Pages'])
+    wanted = pages if pages is not None else list(range(1, checkpoint.total_pages + 1))
+    missing = [page for page in wanted if page not in checkpoint.pages]
+
+    def report_progress(done, total):
+        if progress_callback:
+            progress_callback(len(wanted) - len(missing) + done, len(wanted))
+
+    if not missing:
+        report_progress(0, 0)
+    else:
+        def save_page(page, text, degraded):
+            # Pages that lost engines to the time budget are not worth resuming from
+            checkpoint.save_page(page, text, durable=not degraded)
+
+        page_texts, degraded_pages = _ocr_multi_engine(pdf_path, report_progress, missing, save_page)
+        degraded = {entry['page'] for entry in degraded_pages}
+        for page, text in page_texts.items():
+            if page not in checkpoint.pages:
+                # A page event still in flight when the extraction returned
+                save_page(page, text, page in degraded)
+        if report is not None:
+            report['degraded_pages'] = degraded_pages
+
+    if pages is not None:
+        return format_pages({page: checkpoint.pages[page] for page in pages if page in checkpoint.pages})
+    return checkpoint.finish()
+
+
+def _ocr_multi_engine(pdf_path, progress_callback, pages, page_callback):
+    """
+    OCR some pages with the multi-engine processor, calling page_callback(page, text,
+    degraded) as each one finishes. Returns ({page: text}, degraded_pages).
+    """
+    from ocr_worker_pool import running_pool
+    pool = running_pool()
+    if pool:
+        # Engines already loaded and warmed up in the worker processes
+        return pool.extract_pdf_pages(pdf_path, progress_callback, pages, page_callback)
+
+    from pdf_handler import PDFHandler
+    from page_classifier import text_layers
+    pdf_handler = get_component('pdf_handler', PDFHandler)
+    images = pdf_handler.convert_pdf_to_images(pdf_path, pages)
+    progress_callback(0, len(images))
+    # Engines are not per thread: a 32-core host must not load 32 sets of models
+    with borrow_ocr_processor() as ocr_processor:
+        # The text layer tells the page classifier which pages are typed
+        layers = text_layers(pdf_path, pages) if ocr_processor.routing else None
+        results = ocr_processor.extract_page_results(
+            images, progress_callback=progress_callback, page_numbers=pages, text_layers=layers,
+            page_callback=lambda result, degraded: page_callback(result.page, result.text(), degraded)
+        )
+        return {result.page: result.text() for result in results}, ocr_processor.degraded_pages
+
+
+def _extract_tesseract(pdf_path, progress_callback, document_hash=None, report=None, pages=None):
+    from tesseract_only_processor import TesseractOnlyProcessor
+    processor = get_component('tesseract_only_processor', TesseractOnlyProcessor)
+    return processor.extract_text_from_pdf(pdf_path, progress_callback=progress_callback,
+                                           document_hash=document_hash, pages=pages)
+
+
+def _extract_simple(pdf_path, progress_callback, document_hash=None, report=None, pages=None):
+    from simple_ocr_processor import SimpleOCRProcessor
+    processor = get_component('simple_ocr_processor', SimpleOCRProcessor)
+    return processor.extract_text_from_pdf(pdf_path, progress_callback=progress_callback,
+                                           document_hash=document_hash, pages=pages)
+
+
+EXTRACTORS = {
+    'multi_engine': _extract_multi_engine,
+    'tesseract': _extract_tesseract,
+    'simple': _extract_simple,
+}
+
+
+def extract_pdf_text(engine, pdf_path, progress_callback=None, document_hash=None, report=None, pages=None):
+    """
+    Extract text from a PDF with one of the OCR pipelines; document_hash (if known)
+    keys the page checkpoints of the pipelines that keep them. Pipelines that schedule
+    engines against a time budget add 'degraded_pages' to the report dict. pages limits
+    the extraction to some 1-based pages (e.g. a preview sample).
+    """
+    if engine not in EXTRACTORS:
+        raise ValueError(f"Unknown OCR engine: {engine}")
+    return EXTRACTORS[engine](pdf_path, progress_callback, document_hash, report, pages)
+
+
+def extract_cached(engine, pdf_path, document_hash=None, progress_callback=None, report=None):
+    """
+    Extract text from a PDF, reusing an earlier extraction of the same document
+    """
+    if document_hash:
+        cached = text_cache.get(document_hash, engine)
+        if cached is not None:
+            logger.info(f"Reusing extracted text for document {document_hash[:12]}")
+            return cached
+
+    text = extract_pdf_text(engine, pdf_path, progress_callback, document_hash, report)
+    # Text from pages that lost engines to the time budget is not worth keeping
+    if document_hash and not (report and report.get('degraded_pages')):
+        text_cache.put(document_hash, engine, text)
+    return text
+
+
+class _BatchProgress:
+    """
+    Combine the (pages_done, total) callbacks of documents extracted in parallel
+    into one progress report over a slice of the job's progress
+    """
+    def __init__(self, progress, start, end, documents, label="📄 Extracting text"):
+        self.progress = progress
+        self.start = start
+        self.end = end
+        self.documents = documents
+        self.label = label
+        self.pages = {}
+        self.finished = set()
+        self._lock = threading.Lock()
+
+    def callback(self, index):
+        def report(done, total):
+            with self._lock:
+                self.pages[index] = (done, total)
+                self._report()
+        return report
+
+    def document_done(self, index):
+        with self._lock:
+            self.finished.add(index)
+            self._report()
+
+    def _report(self):
+        # Finished documents count in full, even when they came from the cache and never
+        # reported a page; documents not yet rasterized count as one unfinished unit each
+        fraction = len(self.finished) + sum(
+            done / total for index, (done, total) in self.pages.items() if total and index not in self.finished
+        )
+        pages_done = sum(done for done, _ in self.pages.values())
+        pages_total = sum(total for _, total in self.pages.values())
+        self.progress(
+            self.start + (self.end - self.start) * fraction / self.documents,
+            f"{self.label}: {len(self.finished)}/{self.documents} documents, page {pages_done}/{pages_total}..."
+        )
+
+
+def combine_documents(documents, texts):
+    """
+    Concatenate the text of several documents in upload order, each under a marker
+    naming its file
+    """
+    return "\n".join(f"=== Document: {document['name']} ===\n{text}" for document, text in zip(documents, texts))
+
+
+def _job_documents(params):
+    """
+    The job's documents per role: {'lecture': [{'name', 'path', 'hash'}, ...], 'exam': [...]}
+    """
+    files = params['files']
+    if 'documents' not in params:
+        # Jobs queued before multi-file uploads have one file per role
+        hashes = params.get('hashes', {})
+        return {
+            role: [{'name': os.path.basename(files[role]), 'path': files[role], 'hash': hashes.get(role)}]
+            for role in ('lecture', 'exam')
+        }
+    return {
+        role: [dict(document, path=files[document['file']]) for document in documents]
+        for role, documents in params['documents'].items()
+    }
+
+
+def study_job_key(engine, lecture_hashes, exam_hashes, text_only=False):
+    """
+    Cache key of a study materials job: every document hash (in order) plus the
+    settings affecting the output
+    """
+    settings = {'engine': engine}
+    if text_only:
+        settings['text_only'] = True
+    return make_cache_key({'lecture': list(lecture_hashes), 'exam': list(exam_hashes)}, settings)
+
+
+def text_only_mode(params):
+    """
+    Whether a job stops after text extraction: requested, or no Gemini API key is configured
+    """
+    return bool(params.get('text_only')) or not os.getenv('GEMINI_API_KEY')
+
+
+def preview_mode(params):
+    """
+    Whether a job starts with a preview: params['preview'] if given, otherwise
+    STUDY_BUDDY_PREVIEW (off unless '1'); previews need the AI, so never in text-only mode
+    """
+    if text_only_mode(params):
+        return False
+    if params.get('preview') is not None:
+        return bool(params['preview'])
+    return os.getenv('STUDY_BUDDY_PREVIEW', '0') == '1'
+
+
+class _JobProgress:
+    """
+    A job's progress callback remembering the last fraction reported, so a preview
+    finished on another thread can be posted without moving the progress bar
+    """
+    def __init__(self, progress):
+        self.progress = progress
+        self.fraction = 0.0
+
+    def __call__(self, fraction, message=None, preview=None):
+        self.fraction = fraction
+        self.progress(fraction, message, preview)
+
+    def post_preview(self, preview):
+        self.progress(self.fraction, None, preview)
+
+
+def run_preview(engine, documents, progress, end=0.2):
+    """
+    OCR a stratified sample of every document's pages (contents, section titles and evenly
+    spaced content pages), then generate preliminary areas of concentration from it on a
+    background thread, posted as the job's preview once ready, so the full extraction
+    does not wait for the AI. Sampled pages are checkpointed, so the full extraction does
+    not OCR them again. Returns the preview thread, or None when the documents are too
+    short to be worth a preview. A preview is only a head start: any failure (sampling,
+    OCR or AI) is logged and gives no preview.
+    """
+    try:
+        sample = _read_sample(engine, documents, progress, end)
+    except Exception as e:
+        logger.warning(f"Preview failed, continuing with the full extraction: {e}")
+        return None
+    if sample is None:
+        return None
+    thread = threading.Thread(target=_post_preview, args=(documents, *sample, progress), name='preview', daemon=True)
+    thread.start()
+    return thread
+
+
+def _read_sample(engine, documents, progress, end):
+    """
+    OCR the preview sample of every document. Returns (samples, texts), or None when
+    the documents are too short for a preview.
+    """
+    from page_sampling import sample_pages, PREVIEW_MIN_PAGES
+    batch = documents['lecture'] + documents['exam']
+    samples = list(extraction_pool().map(lambda document: sample_pages(document['path']), batch))
+    total_pages = sum(sample['total_pages'] for sample in samples)
+    if total_pages < PREVIEW_MIN_PAGES:
+        return None
+
+    sampled = sum(len(sample['pages']) for sample in samples)
+    progress(0.0, f"🔎 Preview: reading {sampled} of {total_pages} pages...")
+    tracker = _BatchProgress(progress, 0.0, end, len(batch), label="🔎 Preview")
+
+    def extract(index, document, sample):
+        if len(sample['pages']) == sample['total_pages']:
+            # Short document: extract it in full now; the full extraction reuses the text
+            text = extract_cached(engine, document['path'], document.get('hash'), tracker.callback(index))
+        else:
+            text = extract_pdf_text(engine, document['path'], tracker.callback(index), document.get('hash'),
+                                    pages=sample['pages'])
+        tracker.document_done(index)
+        return text
+
+    futures = [extraction_pool().submit(extract, i, document, sample)
+               for i, (document, sample) in enumerate(zip(batch, samples))]
+    return samples, [future.result() for future in futures]
+
+
+def _post_preview(documents, samples, texts, progress):
+    """
+    Generate the preview's areas of concentration from the sampled text and post it
+    """
+    from ai_processor import AIProcessor
+    batch = documents['lecture'] + documents['exam']
+    lecture_count = len(documents['lecture'])
+    try:
+        areas = get_component('ai_processor', AIProcessor).generate_areas_of_concentration(
+            combine_documents(documents['lecture'], texts[:lecture_count]),
+            combine_documents(documents['exam'], texts[lecture_count:]),
+        )
+    except Exception as e:
+        logger.warning(f"Preview failed, the full results will follow: {e}")
+        return
+    progress.post_preview({
+        'areas_of_concentration': areas,
+        'sampled_pages': {
+            document['name']: {'pages': sample['pages'], 'total_pages': sample['total_pages']}
+            for document, sample in zip(batch, samples)
+        },
+    })
+
+
+def run_study_job(params, progress):
+    """
+    Job handler: extract text from every lecture notes and past exam PDF in parallel,
+    then generate study materials. params: {'engine': ..., 'files': {file: path},
+    'documents': {'lecture': [{'name': ..., 'file': ..., 'hash': ...}], 'exam': [...]},
+    'text_only': bool, 'include_text': bool, 'preview': bool}. Without a Gemini API
+    key only the text is extracted and study_materials is None. In preview mode, long
+    documents first get preliminary areas of concentration from a sample of their pages,
+    generated while every page is extracted.
+    """
+    engine = params['engine']
+    documents = _job_documents(params)
+    batch = documents['lecture'] + documents['exam']
+    progress = _JobProgress(progress)
+
+    start = 0.0
+    preview = run_preview(engine, documents, progress) if preview_mode(params) else None
+    if preview:
+        start = 0.2
+        progress(start, "📄 Extracting every page while the preview is generated...")
+    else:
+        progress(0.0, f"📄 Extracting text from {len(batch)} documents...")
+    tracker = _BatchProgress(progress, start, 0.9, len(batch))
+
+    reports = [{} for _ in batch]
+
+    def extract(index, document):
+        text = extract_cached(engine, document['path'], document.get('hash'), tracker.callback(index), reports[index])
+        tracker.document_done(index)
+        return text
+
+    futures = [extraction_pool().submit(extract, i, document) for i, document in enumerate(batch)]
+    texts = [future.result() for future in futures]
+    degraded = {
+        document['name']: report['degraded_pages']
+        for document, report in zip(batch, reports) if report.get('degraded_pages')
+    }
+    lecture_count = len(documents['lecture'])
+    lecture_text = combine_documents(documents['lecture'], texts[:lecture_count])
+    exam_text = combine_documents(documents['exam'], texts[lecture_count:])
+
+    result = {
+        'lecture_documents': len(documents['lecture']),
+        'exam_documents': len(documents['exam']),
+        'lecture_characters': len(lecture_text),
+        'exam_characters': len(exam_text),
+        'study_materials': None,
+    }
+    if degraded:
+        result['degraded_pages'] = degraded
+
+    text_only = text_only_mode(params)
+    if text_only or params.get('include_text'):
+        result['lecture_text'] = lecture_text
+        result['exam_text'] = exam_text
+    if text_only:
+        logger.info("Text-only job: skipping study materials generation")
+        return result
+
+    if preview:
+        # Posted before the final results, never after
+        preview.join()
+
+    from ai_processor import AIProcessor
+    progress(0.9, "🤖 Generating study materials with AI...")
+    ai_processor = get_component('ai_processor', AIProcessor)
+    result['study_materials'] = ai_processor.generate_study_materials(lecture_text, exam_text)
+    return result
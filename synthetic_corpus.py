@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic PDF corpus with ground truth text for benchmarking:
+text-layer slides, noisy scanned pages and mixed documents of up to 500 pages
+"""
+import argparse
+import io
+import json
+import os
+import random
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+VOCABULARY = (
+    "processor memory cache register instruction pipeline operand address bus "
+    "interrupt cycle binary decimal hexadecimal complement parity storage "
+    "controller latency throughput bandwidth architecture organization system "
+    "program compiler kernel process thread scheduler queue stack heap array "
+    "function variable algorithm complexity recursion sorting searching graph "
+    "network protocol packet router switch layer transport session data the of "
+    "and to in is for with on as by an which are be this that from each all"
+).split()
+
+# (name, page kind, page count); 'mixed' alternates slides and scans
+DOCUMENTS = [
+    ("slides_text_layer_20", 'slide', 20),
+    ("scanned_noisy_20", 'scan', 20),
+    ("mixed_5", 'mixed', 5),
+    ("mixed_50", 'mixed', 50),
+    ("mixed_500", 'mixed', 500),
+]
+
+SLIDE_SIZE = (792, 612)   # US letter landscape, in points
+SCAN_SIZE = (595, 842)    # A4 portrait, in points
+SCAN_DPI = 150
+
+class PDFWriter:
+    """
+    Minimal streaming PDF writer: Helvetica text pages and JPEG image pages,
+    written one page at a time so 500-page documents never sit in memory
+    """
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = 4  # 1: catalog, 2: page tree, 3: font
+        self.file.write(b"%PDF-1.4\n")
+        self._write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        self._write_object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    def _allocate(self):
+        object_id = self.next_id
+        self.next_id += 1
+        return object_id
+
+    def _write_object(self, object_id, body, stream=None):
+        self.offsets[object_id] = self.file.tell()
+        self.file.write(f"{object_id} 0 obj\n".encode())
+        self.file.write(body)
+        if stream is not None:
+            self.file.write(b"\nstream\n")
+            self.file.write(stream)
+            self.file.write(b"\nendstream")
+        self.file.write(b"\nendobj\n")
+
+    def _write_page(self, size, content, resources):
+        content_id = self._allocate()
+        self._write_object(content_id, f"<< /Length {len(content)} >>".encode(), content)
+        page_id = self._allocate()
+        self._write_object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {size[0]} {size[1]}] "
+            f"/Contents {content_id} 0 R /Resources {resources} >>"
+        ).encode())
+        self.page_ids.append(page_id)
+
+    def add_text_page(self, lines, size, font_size, title_size=None, margin=54):
+        """
+        Add a page with a real text layer; the first line is set as a title if title_size is given
+        """
+        commands = []
+        y = size[1] - margin
+        for i, line in enumerate(lines):
+            line_size = title_size if (i == 0 and title_size) else font_size
+            y -= line_size * 1.4
+            escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+            commands.append(f"BT /F1 {line_size} Tf {margin} {y:.1f} Td ({escaped}) Tj ET")
+        self._write_page(size, "\n".join(commands).encode('latin-1'), "<< /Font << /F1 3 0 R >> >>")
+
+    def add_image_page(self, image, size, quality=75):
+        """
+        Add a page that is just a greyscale JPEG scan
+        """
+        buffer = io.BytesIO()
+        image.convert('L').save(buffer, 'JPEG', quality=quality)
+        data = buffer.getvalue()
+        image_id = self._allocate()
+        self._write_object(image_id, (
+            f"<< /Type /XObject /Subtype /Image /Width {image.width} /Height {image.height} "
+            f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /DCTDecode /Length {len(data)} >>"
+        ).encode(), data)
+        content = f"q {size[0]} 0 0 {size[1]} 0 0 cm /Im0 Do Q".encode()
+        self._write_page(size, content, f"<< /XObject << /Im0 {image_id} 0 R >> >>")
+
+    def close(self):
+        kids = " ".join(f"{page_id} 0 R" for page_id in self.page_ids)
+        self._write_object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self.page_ids)} >>".encode())
+
+        xref_offset = self.file.tell()
+        count = self.next_id
+        self.file.write(f"xref\n0 {count}\n0000000000 65535 f \n".encode())
+        for object_id in range(1, count):
+            self.file.write(f"{self.offsets[object_id]:010d} 00000 n \n".encode())
+        self.file.write(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+        self.file.close()
+
+def _load_font(size):
+    for name in ("DejaVuSans.ttf", "arial.ttf", "Arial.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 only has the fixed-size bitmap font
+        return ImageFont.load_default()
+
+def _sentence(rng, min_words, max_words):
+    words = [rng.choice(VOCABULARY) for _ in range(rng.randint(min_words, max_words))]
+    words[0] = words[0].capitalize()
+    return " ".join(words)
+
+def slide_lines(rng, page_number):
+    title = f"Lecture {page_number}: {_sentence(rng, 2, 4)}"
+    return [title] + [_sentence(rng, 4, 8) for _ in range(rng.randint(4, 7))]
+
+def scan_lines(rng):
+    return [_sentence(rng, 8, 12) for _ in range(rng.randint(25, 35))]
+
+def render_scan(lines, rng, size=SCAN_SIZE, dpi=SCAN_DPI):
+    """
+    Render text like a photocopied page: off-white paper, slight skew, blur and noise
+    """
+    width, height = int(size[0] * dpi / 72), int(size[1] * dpi / 72)
+    image = Image.new('L', (width, height), rng.randint(225, 245))
+    draw = ImageDraw.Draw(image)
+    font = _load_font(int(11 * dpi / 72))
+    margin = int(0.75 * dpi)
+    line_height = int(16 * dpi / 72)
+    for i, line in enumerate(lines):
+        draw.text((margin, margin + i * line_height), line, fill=rng.randint(10, 50), font=font)
+
+    image = image.rotate(rng.uniform(-1.5, 1.5), resample=Image.BILINEAR, fillcolor=235)
+    image = image.filter(ImageFilter.GaussianBlur(rng.uniform(0.3, 0.8)))
+
+    # Salt-and-pepper speckle
+    noise = Image.effect_noise((width, height), 40)
+    return Image.blend(image, noise, 0.08)
+
+def write_document(path, kind, page_count, rng):
+    """
+    Write one document and return its ground truth page texts
+    """
+    writer = PDFWriter(path)
+    pages = []
+    for page_number in range(1, page_count + 1):
+        page_kind = kind if kind != 'mixed' else ('slide' if page_number % 2 else 'scan')
+        if page_kind == 'slide':
+            lines = slide_lines(rng, page_number)
+            writer.add_text_page(lines, SLIDE_SIZE, font_size=20, title_size=30)
+        else:
+            lines = scan_lines(rng)
+            writer.add_image_page(render_scan(lines, rng), SCAN_SIZE)
+        pages.append({'kind': page_kind, 'text': "\n".join(lines)})
+    writer.close()
+    return pages
+
+def generate_corpus(output_dir, max_pages=500, seed=0):
+    """
+    Generate the benchmark corpus into output_dir and return its manifest
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = []
+    for name, kind, page_count in DOCUMENTS:
+        if page_count > max_pages:
+            continue
+        rng = random.Random(f"{seed}-{name}")
+        pdf_path = os.path.join(output_dir, f"{name}.pdf")
+        truth_path = os.path.join(output_dir, f"{name}.json")
+        pages = write_document(pdf_path, kind, page_count, rng)
+        with open(truth_path, 'w', encoding='utf-8') as f:
+            json.dump({'name': name, 'kind': kind, 'pages': pages}, f, indent=1)
+        manifest.append({'name': name, 'kind': kind, 'pages': page_count, 'pdf': pdf_path, 'truth': truth_path})
+        print(f"  ✅ {name}.pdf ({page_count} pages)")
+
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump({'seed': seed, 'max_pages': max_pages, 'documents': manifest}, f, indent=2)
+    return manifest
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('output_dir', nargs='?', default='benchmark_corpus')
+    parser.add_argument('--max-pages', type=int, default=500, help="Skip documents longer than this")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"📄 Generating synthetic corpus in {args.output_dir}")
+    generate_corpus(args.output_dir, args.max_pages, args.seed)
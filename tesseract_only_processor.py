@@ -1,89 +1,172 @@
 import os
 import subprocess
-import tempfile
 import logging
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+from adaptive_dpi import convert_pdf_adaptive
+from image_binarizer import binarize, save_for_tesseract, log_handoff_stats
+from profiling import resolve_profiler, maybe_profile
+from scratch_space import default_scratch
+from page_checkpoints import resolve_checkpoints, open_checkpoint, page_ranges
+from ocr_results import format_pages
+from capabilities import capabilities
 
 logger = logging.getLogger(__name__)
 
 class TesseractOnlyProcessor:
-    def __init__(self):
+    def __init__(self, adaptive_dpi=False, dpi=200, binarization=None, handoff_format='png', profile=None,
+                 checkpoints=None):
         """
         Ultra-simple OCR processor using only Tesseract
+        
+        binarization: optional 'otsu' or 'sauvola' to hand Tesseract 1-bit pages
+        handoff_format: temp file format for Tesseract ('png', 'pnm' or 'tiff_g4')
+        profile: Profiler, True or False; None enables profiling from STUDY_BUDDY_PROFILE_DIR
+        checkpoints: CheckpointStore, True or False; None uses STUDY_BUDDY_CHECKPOINT_DB
         """
-        # Verify Tesseract is available
-        try:
-            result = subprocess.run(['tesseract', '--version'], capture_output=True, text=True)
-            if result.returncode != 0:
-                raise Exception("Tesseract command failed")
-            logger.info("Tesseract is available")
-        except Exception as e:
-            raise Exception(f"Tesseract not available: {e}")
+        self.profiler = resolve_profiler(profile)
+        self.checkpoints = resolve_checkpoints(checkpoints)
+        self.adaptive_dpi = adaptive_dpi
+        self.dpi = dpi
+        self.binarization = binarization
+        self.handoff_format = handoff_format
+        self.handoff_stats = []
+        
+        # Verify Tesseract is available (probed once per process)
+        capabilities().require_tool('tesseract', 'Tesseract')
+        logger.info("Tesseract is available")
     
-    def extract_text_from_pdf(self, pdf_path):
+    def extract_text_from_pdf(self, pdf_path, progress_callback=None, document_hash=None, pages=None):
         """
         Extract text from PDF using pdf2image + Tesseract
+        
+        progress_callback: optional callable(pages_done, total_pages), called once
+        the PDF is rasterized and after each page
+        document_hash: SHA-256 of the PDF if already known (used for checkpoints)
+        pages: only extract (and return the text of) these 1-based pages, e.g. a preview
+        sample; they are checkpointed like any other, so the full extraction skips them
+        
+        Every page is checkpointed, so a restarted extraction only OCRs the pages
+        missing from an earlier attempt. Pages whose fingerprint matches a page
+        extracted before (e.g. an edited re-upload) are reused as well.
         """
         logger.info(f"Processing PDF: {pdf_path}")
         
         try:
+            checkpoint = open_checkpoint(self.checkpoints, pdf_path, self.checkpoint_settings(), document_hash,
+                                         pages=pages)
+            requested = pages
+            if requested is not None and checkpoint.total_pages is None:
+                checkpoint.begin(pdfinfo_from_path(pdf_path)['Pages'])
+            pages = checkpoint.missing_pages()
+            if requested is not None:
+                pages = [page for page in requested if page in pages]
+            
             # Convert PDF to images using pdf2image (more reliable than ImageMagick in Python)
             logger.info("Converting PDF to images...")
-            images = convert_from_path(pdf_path, dpi=200)  # Lower DPI for speed
+            images = self._rasterize(pdf_path, pages)
+            if pages is None:
+                pages = list(range(1, len(images) + 1))
+                checkpoint.begin(len(images))
             logger.info(f"Generated {len(images)} images")
             
-            # Extract text from each image
-            all_text = []
-            for i, image in enumerate(images):
-                try:
-                    logger.info(f"Processing page {i+1}/{len(images)}")
-                    
-                    # Save image temporarily
-                    with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as temp_image:
-                        image.save(temp_image.name, 'PNG')
-                        temp_image_path = temp_image.name
-                    
-                    # Run Tesseract
-                    with tempfile.NamedTemporaryFile(suffix='', delete=False) as temp_text:
-                        temp_text_path = temp_text.name
-                    
-                    subprocess.run([
-                        'tesseract', temp_image_path, temp_text_path,
-                        '--oem', '3',     # Use LSTM OCR Engine Mode
-                        '--psm', '6',     # Assume uniform block of text
-                        '-l', 'eng'       # English language
-                    ], check=True, capture_output=True)
-                    
-                    # Read extracted text
-                    with open(f"{temp_text_path}.txt", 'r', encoding='utf-8') as f:
-                        page_text = f.read().strip()
-                    
-                    if page_text:
-                        all_text.append(f"--- Page {i + 1} ---\n{page_text}\n")
-                    
-                    # Clean up temp files
-                    os.unlink(temp_image_path)
-                    os.unlink(f"{temp_text_path}.txt")
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to process page {i+1}: {e}")
-                    continue
+            def report_progress():
+                if not progress_callback:
+                    return
+                if requested is None:
+                    progress_callback(len(checkpoint.pages), checkpoint.total_pages)
+                else:
+                    progress_callback(sum(page in checkpoint.pages for page in requested), len(requested))
+            report_progress()
+            
+            # Extract text from each image; temp files live in one work directory
+            # that is removed even if a page or the whole document fails
+            self.handoff_stats = []
+            profiled = self.profiler.sample_request() if self.profiler else False
+            with default_scratch().work_dir('tesseract') as work_dir:
+                for page, image in zip(pages, images):
+                    try:
+                        with maybe_profile(self.profiler, 'tesseract', page=page, enabled=profiled):
+                            logger.info(f"Processing page {page}/{checkpoint.total_pages}")
+                            page_text = self._ocr_page(image, os.path.join(work_dir, f"page_{page:03d}"), page)
+                        checkpoint.save_page(page, page_text)
+                        
+                    except Exception as e:
+                        logger.warning(f"Failed to process page {page}: {e}")
+                        continue
+                    finally:
+                        report_progress()
             
-            result_text = "\n".join(all_text)
+            if requested is not None:
+                return format_pages({page: checkpoint.pages[page] for page in requested if page in checkpoint.pages})
+            result_text = checkpoint.finish()
             logger.info(f"Extracted {len(result_text)} characters total")
+            log_handoff_stats(self.handoff_stats, f"Tesseract handoff ({self.handoff_format})")
             return result_text
             
         except Exception as e:
             logger.error(f"OCR processing error: {e}")
             raise Exception(f"OCR processing failed: {e}")
     
+    def checkpoint_settings(self):
+        """
+        Settings that change the pixels or options Tesseract sees, part of the checkpoint
+        key; the handoff format counts too, since tiff_g4 binarizes the page with Otsu
+        """
+        dpi = 'adaptive' if self.adaptive_dpi else self.dpi
+        return (f"tesseract dpi={dpi} binarization={self.binarization} "
+                f"handoff={self.handoff_format} oem=3 psm=6 lang=eng")
+    
+    def _rasterize(self, pdf_path, pages=None):
+        """
+        Render the given 1-based pages (default: all) to images
+        """
+        if pages == []:
+            return []
+        if self.adaptive_dpi:
+            return convert_pdf_adaptive(pdf_path, default_dpi=self.dpi, pages=pages)
+        if pages is None:
+            return convert_from_path(pdf_path, dpi=self.dpi)  # Lower DPI for speed
+        images = []
+        for first_page, last_page in page_ranges(pages):
+            images.extend(convert_from_path(pdf_path, dpi=self.dpi, first_page=first_page, last_page=last_page))
+        return images
+    
+    def _ocr_page(self, image, path_base, page_number):
+        """
+        Run Tesseract on one page image, using path_base for the temp files
+        """
+        if self.binarization:
+            image = binarize(image, self.binarization)
+        
+        # Save image temporarily
+        image_path, encode_seconds, size = save_for_tesseract(image, path_base, self.handoff_format)
+        self.handoff_stats.append({'page': page_number, 'encode_seconds': encode_seconds, 'bytes': size})
+        
+        try:
+            # Run Tesseract
+            text_path = f"{path_base}_text"
+            subprocess.run([
+                'tesseract', image_path, text_path,
+                '--oem', '3',     # Use LSTM OCR Engine Mode
+                '--psm', '6',     # Assume uniform block of text
+                '-l', 'eng'       # English language
+            ], check=True, capture_output=True)
+            
+            # Read extracted text
+            with open(f"{text_path}.txt", 'r', encoding='utf-8') as f:
+                return f.read().strip()
+        finally:
+            # Keep the work directory small on long documents
+            for path in (image_path, f"{path_base}_text.txt"):
+                if os.path.exists(path):
+                    os.unlink(path)
+    
     def validate_setup(self):
         """
         Validate that Tesseract is working
         """
         try:
-            # Test Tesseract  
-            subprocess.run(['tesseract', '--version'], capture_output=True, check=True)
+            capabilities().require_tool('tesseract', 'Tesseract')
             
             logger.info("Tesseract-only processor validated successfully")
             return True
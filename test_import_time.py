@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Import-time regression test: the modules the apps import at startup must not pull in
+the OCR engines or their numeric stacks, and must import within a time budget.
+Measured like `python -X importtime`, in a fresh interpreter per run.
+"""
+import os
+import subprocess
+import sys
+
+# Modules imported when the apps and the batch entry point start
+STARTUP_MODULES = (
+    'ocr_processor', 'ai_processor', 'pdf_handler', 'study_pipeline',
+    'job_queue', 'ocr_worker_pool', 'instrumentation',
+)
+
+# Only imported once an engine is actually used
+HEAVY_MODULES = ('paddleocr', 'paddle', 'easyocr', 'torch', 'cv2', 'numpy', 'google.generativeai')
+
+# Cumulative import time of STARTUP_MODULES, in milliseconds (generous for slow CI machines;
+# importing the engines takes seconds)
+IMPORT_BUDGET_MS = int(os.getenv('STUDY_BUDDY_IMPORT_BUDGET_MS', '500'))
+
+
+def measure_imports(modules=STARTUP_MODULES):
+    """
+    Import modules in a fresh interpreter with -X importtime; returns
+    {module: cumulative microseconds} for every module imported
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f"import {', '.join(modules)}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    if result.returncode != 0:
+        raise Exception(f"Import failed:\n{result.stderr[-2000:]}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def heavy_imports(timings):
+    return [name for name in timings
+            if any(name == heavy or name.startswith(heavy + '.') for heavy in HEAVY_MODULES)]
+
+
+def test_no_heavy_imports():
+    loaded = heavy_imports(measure_imports())
+    assert not loaded, f"Heavy modules imported at startup: {', '.join(loaded)}"
+
+
+def test_import_budget():
+    timings = measure_imports()
+    total_ms = sum(timings.get(module, 0) for module in STARTUP_MODULES) / 1000
+    assert total_ms < IMPORT_BUDGET_MS, f"Startup imports took {total_ms:.0f} ms (budget {IMPORT_BUDGET_MS} ms)"
+
+
+if __name__ == "__main__":
+    print("🧪 Testing startup import time")
+    print("=" * 50)
+
+    timings = measure_imports()
+    for module in STARTUP_MODULES:
+        print(f"{module:<20}{timings.get(module, 0) / 1000:>8.1f} ms")
+    total_ms = sum(timings.get(module, 0) for module in STARTUP_MODULES) / 1000
+    print(f"{'total':<20}{total_ms:>8.1f} ms (budget {IMPORT_BUDGET_MS} ms)")
+
+    heavy = heavy_imports(timings)
+    if heavy:
+        print(f"❌ Heavy modules imported at startup: {', '.join(heavy)}")
+    else:
+        print("✅ No OCR engine or numeric library imported at startup")
+    sys.exit(1 if heavy or total_ms >= IMPORT_BUDGET_MS else 0)
@@ -0,0 +1,138 @@
+import logging
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Regions are proposed on a copy reduced to about this width
+DETECT_WIDTH = 900
+
+# Close gaps between characters of a line (width, height at detection scale)
+LINE_KERNEL = (9, 1)
+
+# A closed line blob is text when it fills at least this share of its box: a straight
+# line fills most of it, a skewed scanned line about a third; outlines, rules and the
+# rims of filled shapes fill far less
+MIN_LINE_FILL = 0.25
+# Smallest candidate at detection scale
+MIN_REGION_SIZE = (8, 5)
+
+# Margin kept around every region (full resolution pixels); regions closer than this merge
+REGION_PADDING = 16
+# Regions side by side also merge across gaps up to this many times their height (words)
+MERGE_GAP_HEIGHTS = 1.5
+
+# Pages whose regions cover more than this share are OCR'd whole: cropping saves nothing
+MAX_REGION_COVERAGE = 0.6
+
+# White space between regions in the batched image
+MOSAIC_GAP = 32
+
+
+def find_text_regions(image):
+    """
+    Boxes (x0, y0, x1, y1) of the text-bearing regions of a page image, in reading order.
+    Stroke edges from a morphological gradient are closed into line blobs; blobs too
+    sparse for text (outlines, rules, the rims of filled shapes) are dropped and the rest
+    merged into padded blocks. Needs OpenCV.
+    """
+    import cv2
+    width, height = image.size
+    factor = max(1, round(width / DETECT_WIDTH))
+    small = image.reduce(factor) if factor > 1 else image
+    gray = np.asarray(small.convert('L'), dtype=np.uint8)
+
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, edges = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    lines = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, LINE_KERNEL))
+    # Components rather than outer contours: a label inside a box is its own candidate
+    _, _, stats, _ = cv2.connectedComponentsWithStats(lines, connectivity=8)
+
+    boxes = []
+    for x, y, w, h, area in stats[1:]:
+        if w < MIN_REGION_SIZE[0] or h < MIN_REGION_SIZE[1]:
+            continue
+        if area < MIN_LINE_FILL * w * h:
+            continue
+        boxes.append([
+            max(x * factor - REGION_PADDING, 0), max(y * factor - REGION_PADDING, 0),
+            min((x + w) * factor + REGION_PADDING, width), min((y + h) * factor + REGION_PADDING, height),
+        ])
+    return merge_boxes(boxes)
+
+
+def merge_boxes(boxes):
+    """
+    Union overlapping boxes, and boxes on the same line less than MERGE_GAP_HEIGHTS
+    apart, until none are left to merge; returned top to bottom, left to right
+    """
+    boxes = [list(box) for box in boxes]
+    merged = True
+    while merged:
+        merged = False
+        result = []
+        for box in sorted(boxes, key=lambda box: (box[1], box[0])):
+            for other in result:
+                gap = MERGE_GAP_HEIGHTS * min(box[3] - box[1], other[3] - other[1])
+                if box[0] < other[2] + gap and other[0] < box[2] + gap and box[1] < other[3] and other[1] < box[3]:
+                    other[:] = [min(box[0], other[0]), min(box[1], other[1]),
+                                max(box[2], other[2]), max(box[3], other[3])]
+                    merged = True
+                    break
+            else:
+                result.append(box)
+        boxes = result
+    return [tuple(int(v) for v in box) for box in sorted(boxes, key=lambda box: (box[1], box[0]))]
+
+
+def coverage(regions, size):
+    """
+    Share of the page area inside the (non-overlapping) regions
+    """
+    area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in regions)
+    return area / (size[0] * size[1]) if size[0] and size[1] else 0.0
+
+
+def stack_crops(crops, mode='RGB'):
+    """
+    Stack images top to bottom on a white background, MOSAIC_GAP apart and from the
+    edges. Returns (mosaic, tops) with the y offset of every crop; each crop is at x
+    MOSAIC_GAP.
+    """
+    mosaic_width = max(crop.size[0] for crop in crops) + 2 * MOSAIC_GAP
+    mosaic_height = sum(crop.size[1] for crop in crops) + (len(crops) + 1) * MOSAIC_GAP
+    mosaic = Image.new(mode, (mosaic_width, mosaic_height), 'white')
+
+    tops = []
+    top = MOSAIC_GAP
+    for crop in crops:
+        mosaic.paste(crop.convert(mode), (MOSAIC_GAP, top))
+        tops.append(top)
+        top += crop.size[1] + MOSAIC_GAP
+    return mosaic, tops
+
+
+def compose_regions(image, regions):
+    """
+    Stack the crops of the regions into one image, so each engine OCRs all of a page's
+    text in a single call. Returns (mosaic, placements) with a (top, height, x0, y0)
+    placement per region for split_regions.
+    """
+    mode = image.mode if image.mode in ('RGB', 'L') else 'RGB'
+    mosaic, tops = stack_crops([image.crop(region) for region in regions], mode)
+    return mosaic, [(top, y1 - y0, x0, y0) for top, (x0, y0, x1, y1) in zip(tops, regions)]
+
+
+def split_regions(result, placements, size):
+    """
+    Map a PageResult of a mosaic back to page coordinates: every line goes to the region
+    holding its centre
+    """
+    from ocr_results import PageResult
+    centres = (result.lines['y0'] + result.lines['y1']) / 2
+    parts = []
+    for top, height, x0, y0 in placements:
+        inside = (centres >= top - MOSAIC_GAP / 2) & (centres < top + height + MOSAIC_GAP / 2)
+        if inside.any():
+            parts.append(result.select(inside).translated(x0 - MOSAIC_GAP, y0 - top))
+    return PageResult.concatenate(result.page, parts, size).sorted_by_position()
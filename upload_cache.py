@@ -0,0 +1,60 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+# Bumped whenever extraction or generation output changes, so old cache entries are not reused
+CACHE_VERSION = 1
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """
+    SHA-256 of a file on disk, read in chunks
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_cache_key(document_hashes, settings):
+    """
+    Key a pipeline run by its input documents and the settings that affect its output
+    """
+    payload = json.dumps({
+        'version': CACHE_VERSION,
+        'documents': document_hashes,
+        'settings': settings,
+    }, sort_keys=True)
+    return hash_bytes(payload.encode('utf-8'))
+
+
+class TextCache:
+    def __init__(self, max_entries=64):
+        """
+        In-process LRU cache of extracted document text keyed by (document hash, engine),
+        so a document is OCR'd once even when it is paired with different files
+        """
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, document_hash, engine):
+        with self._lock:
+            key = (document_hash, engine)
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, document_hash, engine, text):
+        with self._lock:
+            self._entries[(document_hash, engine)] = text
+            self._entries.move_to_end((document_hash, engine))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
@@ -1,7 +1,7 @@
 import sys
 import os
-import subprocess
 from dotenv import load_dotenv
+from capabilities import capabilities
 
 def verify_setup():
     print("🔍 Verifying Enhanced Study Buddy setup...\n")
@@ -11,6 +11,11 @@ def verify_setup():
     
     success = True
     
+    # Probe every package and tool at once (in parallel, without importing the packages);
+    # the components tested below reuse these results
+    registry = capabilities()
+    found = registry.probe(refresh=True)
+    
     # Check Python packages
     print("📦 Checking Python packages...")
     required_packages = [
@@ -21,62 +26,35 @@ def verify_setup():
         'numpy',
         'google-generativeai',
         'pdf2image',
-        'PIL',
+        'Pillow',
         'python-dotenv',
         'pytesseract',
         'easyocr'
     ]
     
     for package in required_packages:
-        try:
-            if package == 'PIL':
-                import PIL
-            elif package == 'opencv-python':
-                import cv2
-            elif package == 'python-dotenv':
-                import dotenv
-            else:
-                __import__(package.replace('-', '_'))
-            print(f"  ✅ {package}")
-        except ImportError:
+        result = found['packages'][package]
+        if result['available']:
+            print(f"  ✅ {package}" + (f" ({result['version']})" if result['version'] else ""))
+        else:
             print(f"  ❌ {package} - Not installed")
             success = False
     
     # Check external tools
     print("\n🛠️ Checking external tools...")
-    
-    # Check Tesseract
-    try:
-        import pytesseract
-        version = pytesseract.get_tesseract_version()
-        print(f"  ✅ Tesseract (v{version})")
-    except Exception as e:
-        print(f"  ⚠️ Tesseract - {str(e)}")
-        print("    💡 Install from: https://github.com/tesseract-ocr/tesseract")
-    
-    # Check ImageMagick
-    try:
-        result = subprocess.run(['magick', '--version'], capture_output=True, text=True)
-        if result.returncode == 0:
-            version_line = result.stdout.split('\n')[0]
-            print(f"  ✅ ImageMagick ({version_line.split()[1]})")
-        else:
-            raise Exception("Command failed")
-    except Exception as e:
-        print(f"  ⚠️ ImageMagick - Not available")
-        print("    💡 Install from: https://imagemagick.org/")
-    
-    # Check Ghostscript
-    try:
-        result = subprocess.run(['gswin64c', '-version'], capture_output=True, text=True)
-        if result.returncode == 0:
-            version_line = result.stdout.split('\n')[0]
-            print(f"  ✅ Ghostscript ({version_line.split()[2]})")
+    install_hints = {
+        'tesseract': ("Tesseract", "https://github.com/tesseract-ocr/tesseract"),
+        'magick': ("ImageMagick", "https://imagemagick.org/"),
+        'ghostscript': ("Ghostscript", "https://www.ghostscript.com/"),
+        'pdftoppm': ("Poppler", "https://poppler.freedesktop.org/"),
+    }
+    for tool, (label, url) in install_hints.items():
+        result = found['tools'][tool]
+        if result['available']:
+            print(f"  ✅ {label}" + (f" (v{result['version']})" if result['version'] else ""))
         else:
-            raise Exception("Command failed")
-    except Exception as e:
-        print(f"  ⚠️ Ghostscript - Not available")
-        print("    💡 Install from: https://www.ghostscript.com/")
+            print(f"  ⚠️ {label} - Not available")
+            print(f"    💡 Install from: {url}")
     
     # Check environment variables
     print("\n🔑 Checking environment variables...")